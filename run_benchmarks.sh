@@ -0,0 +1,10 @@
+#!/bin/bash
+# Замеры производительности отдельно от проверки корректности run_tests.sh.
+# Размер наборов: NEWS_BENCH_SIZE, NOTES_BENCH_SIZE; порог регрессии:
+# BENCH_THRESHOLD; обновить базовые линии: BENCH_UPDATE_BASELINES=1.
+set -e
+
+cd ya_news
+DJANGO_SETTINGS_MODULE=yanews.settings pytest -m benchmark -s "$@"
+cd ../ya_note
+DJANGO_SETTINGS_MODULE=yanote.settings pytest -m benchmark -s "$@"
@@ -23,12 +23,12 @@ then
     then
         cd ya_news
         export DJANGO_SETTINGS_MODULE="${DJANGO_SETTINGS_MODULE:="yanews.settings"}"
-        if pytest --tb=line 1>&2;
+        if pytest --tb=line -n "${PYTEST_WORKERS:-auto}" 1>&2;
         then
             cd ../ya_note
             unset DJANGO_SETTINGS_MODULE
             export DJANGO_SETTINGS_MODULE="${DJANGO_SETTINGS_MODULE:="yanote.settings"}"
-            if pytest --tb=line 1>&2;
+            if pytest --tb=line -n "${PYTEST_WORKERS:-auto}" 1>&2;
             then
                 exit 0
             else
@@ -1,6 +1,7 @@
 from django.contrib import admin
+from django.db.models import F
 
-from .models import Comment, News
+from .models import Comment, News, NewsDailyStats
 
 
 class CommentInline(admin.StackedInline):
@@ -8,8 +9,38 @@ class CommentInline(admin.StackedInline):
     extra = 0
 
 
+class NewsDailyStatsInline(admin.TabularInline):
+    model = NewsDailyStats
+    fields = ('day', 'comment_count')
+    readonly_fields = fields
+    extra = 0
+    max_num = 0
+    can_delete = False
+
+
 @admin.register(News)
 class NewsAdmin(admin.ModelAdmin):
+    list_display = (
+        'title', 'date', 'comment_count', 'commenter_count', 'last_comment'
+    )
     inlines = [
+        NewsDailyStatsInline,
         CommentInline,
     ]
+
+    def get_queryset(self, request):
+        """Статистика берётся из NewsStats, без агрегации комментариев."""
+        return super().get_queryset(request).annotate(
+            commenter_count=F('stats__commenter_count'),
+            last_comment=F('stats__last_comment'),
+        )
+
+    @admin.display(description='Комментаторов', ordering='commenter_count')
+    def commenter_count(self, news):
+        return news.commenter_count or 0
+
+    @admin.display(
+        description='Последний комментарий', ordering='last_comment'
+    )
+    def last_comment(self, news):
+        return news.last_comment
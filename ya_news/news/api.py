@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views import generic
+
+from .ingest import ingest_comments
+from .models import Comment, News
+from .pagination import seek
+
+NEWS_FIELDS = ('id', 'title', 'text', 'date', 'comment_count')
+COMMENT_FIELDS = ('id', 'text', 'created', 'author__username')
+
+
+def get_comment_chunks(news_id, chunk_size):
+    """
+    Опубликованные комментарии новости кусками по chunk_size строк.
+
+    Каждый кусок - отдельный запрос по индексу (news, created, id),
+    начиная с последней строки предыдущего куска.
+    """
+    comments = Comment.objects.published().filter(
+        news_id=news_id
+    ).order_by('created', 'pk').values(*COMMENT_FIELDS)
+    chunk = list(comments[:chunk_size])
+    while chunk:
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1]
+        chunk = list(seek(comments, last['created'], last['id'])[:chunk_size])
+
+
+def stream_json_array(chunks):
+    """
+    Отдаёт JSON-массив по куску строк за раз.
+
+    В памяти одновременно только один кусок строк, сколько бы их ни было.
+    """
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    separator = '['
+    for chunk in chunks:
+        yield separator + ','.join(encoder.encode(row) for row in chunk)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+class NewsListApi(generic.View):
+    """Последние новости, как на главной странице."""
+
+    def get(self, request, *args, **kwargs):
+        news = News.objects.values(*NEWS_FIELDS)[
+            :settings.NEWS_COUNT_ON_HOME_PAGE
+        ]
+        return JsonResponse(list(news), safe=False)
+
+
+class NewsDetailApi(generic.View):
+    """Новость без комментариев, их отдаёт CommentListApi."""
+
+    def get(self, request, *args, **kwargs):
+        news = News.objects.filter(pk=kwargs['pk']).values(
+            *NEWS_FIELDS
+        ).first()
+        if news is None:
+            raise Http404('Новость не найдена.')
+        news['comments_url'] = reverse(
+            'news:api_comments', kwargs={'pk': news['id']}
+        )
+        return JsonResponse(news)
+
+
+class CommentListApi(generic.View):
+    """
+    Все опубликованные комментарии новости.
+
+    Строки читаются через values() кусками по ключу и сразу пишутся в
+    потоковый ответ, поэтому выгрузка обсуждения любой длины не
+    создаёт объектов моделей и занимает постоянный объём памяти.
+    Под ASGI Django 3.2 перебирает потоковый ответ в цикле событий, где
+    ORM недоступен, поэтому там куски читаются ещё в представлении.
+    """
+
+    def get(self, request, *args, **kwargs):
+        if not News.objects.filter(pk=kwargs['pk']).exists():
+            raise Http404('Новость не найдена.')
+        content = stream_json_array(get_comment_chunks(
+            kwargs['pk'], settings.NEWS_API_CHUNK_SIZE
+        ))
+        if isinstance(request, ASGIRequest):
+            content = list(content)
+        return StreamingHttpResponse(
+            content, content_type='application/json'
+        )
+
+
+class CommentImport(LoginRequiredMixin, UserPassesTestMixin, generic.View):
+    """
+    Загрузка комментариев партнёров.
+
+    Тело запроса - JSON Lines, по одному комментарию в строке.
+    """
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def post(self, request, *args, **kwargs):
+        report = ingest_comments(request)
+        return JsonResponse({
+            'created': report.created,
+            'errors': [error._asdict() for error in report.errors],
+        })
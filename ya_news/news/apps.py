@@ -1,7 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
 
 
 class NewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'news'
     verbose_name = 'Новости'
+
+    def ready(self):
+        from yanews.auth import forget_user
+        from . import signals  # noqa: F401
+
+        post_save.connect(forget_user, sender=settings.AUTH_USER_MODEL)
+        post_delete.connect(forget_user, sender=settings.AUTH_USER_MODEL)
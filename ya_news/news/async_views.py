@@ -0,0 +1,78 @@
+"""
+Асинхронные страницы чтения новостей для запуска под ASGI.
+
+В Django 3.2 нет асинхронных представлений-классов и асинхронного ORM,
+поэтому здесь функции, а обращения к базе идут через sync_to_async в
+потоке, за которым закреплены соединения. Главная страница для анонимов
+отдаётся из кэша без этого потока. Включаются настройкой NEWS_ASYNC_VIEWS.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+
+from . import cache
+from .forms import CommentForm
+from .models import News
+from .pagination import get_comment_page
+from .views import (
+    NewsComment, NewsList, get_news_validators, not_modified, set_validators
+)
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+async def is_authenticated(request):
+    """Без cookie сессии пользователь анонимный, база не нужна."""
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return False
+    return await sync_to_async(lambda: request.user.is_authenticated)()
+
+
+def get_cached_home():
+    """Закэшированная главная страница или None."""
+    return cache.get_cache().get(cache.make_key('home'))
+
+
+def get_detail_context(request, news):
+    """Контекст страницы новости, как у NewsDetail."""
+    context = {'news': news, 'object': news}
+    context['comments'], context['next_cursor'] = get_comment_page(news.pk)
+    if request.user.is_authenticated:
+        context['form'] = CommentForm()
+    return context
+
+
+async def news_list(request):
+    """Список новостей."""
+    if request.method not in SAFE_METHODS:
+        return HttpResponseNotAllowed(SAFE_METHODS)
+    if not await is_authenticated(request):
+        # Кэш не использует соединения с базой, поэтому читается
+        # в общем пуле потоков, а не в очереди к потоку базы.
+        content = await sync_to_async(
+            get_cached_home, thread_sensitive=False
+        )()
+        if content is not None:
+            return HttpResponse(content)
+    # Промах кэша и страницу пользователя строит обычное представление,
+    # в том числе с защитой от одновременной пересборки кэша.
+    return await sync_to_async(NewsList.as_view())(request)
+
+
+async def news_detail(request, pk):
+    """Новость с комментариями; новый комментарий принимает NewsComment."""
+    if request.method == 'POST':
+        return await sync_to_async(NewsComment.as_view())(request, pk=pk)
+    if request.method not in SAFE_METHODS:
+        return HttpResponseNotAllowed(SAFE_METHODS + ('POST',))
+    news = await sync_to_async(get_object_or_404)(News, pk=pk)
+    etag, last_modified = await sync_to_async(get_news_validators)(
+        request, news
+    )
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        context = await sync_to_async(get_detail_context)(request, news)
+        response = TemplateResponse(request, 'news/detail.html', context)
+    return set_validators(response, etag, last_modified)
@@ -0,0 +1,131 @@
+"""
+Групповая запись комментариев.
+
+В режиме NEWS_BUFFERED_COMMENTS запрос не открывает свою транзакцию, а
+кладёт комментарий в очередь процесса и ждёт. Поток-писатель забирает
+всё, что пришло за NEWS_BUFFER_WINDOW_MS миллисекунд (не больше
+NEWS_BUFFER_MAX_BATCH), и сохраняет одной транзакцией через
+Comment.objects.bulk_create. Запрос получает ответ только после
+фиксации этой транзакции, так что всплеск комментариев стоит базе
+одной блокировки записи на пачку, а не на каждый комментарий.
+
+Комментарий, не дождавшийся писателя за NEWS_BUFFER_TIMEOUT секунд,
+отменяется и уже не будет записан, поэтому повтор запроса после ошибки
+не создаёт дубль. Если писатель успел взять его в пачку, запрос ждёт
+фиксации до конца.
+"""
+import queue
+import threading
+import time
+from itertools import groupby
+
+from django.conf import settings
+from django.db import close_old_connections, router, transaction
+
+from .models import Comment
+
+_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+# Под ним писатель забирает комментарии в пачку, а запрос их отменяет.
+_pending_lock = threading.Lock()
+
+
+class BufferTimeout(Exception):
+    """Комментарий не записан за NEWS_BUFFER_TIMEOUT секунд."""
+
+
+class PendingComment:
+    """Комментарий в очереди и событие о его записи."""
+
+    def __init__(self, comment, using):
+        self.comment = comment
+        self.using = using
+        self.error = None
+        self.done = threading.Event()
+        self.taken = False
+        self.cancelled = False
+
+
+def start_writer():
+    """Поток-писатель, создаётся при первом обращении."""
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(
+                target=run_writer, name='comment-buffer', daemon=True
+            )
+            _writer.start()
+
+
+def save(comment, using=None):
+    """Сохраняет комментарий в ближайшей пачке и ждёт фиксации."""
+    pending = PendingComment(
+        comment, using or router.db_for_write(Comment, instance=comment)
+    )
+    start_writer()
+    _queue.put(pending)
+    timeout = settings.NEWS_BUFFER_TIMEOUT
+    if not pending.done.wait(timeout):
+        with _pending_lock:
+            if not pending.taken:
+                pending.cancelled = True
+                raise BufferTimeout(f'Комментарий не записан за {timeout} с')
+        pending.done.wait()
+    if pending.error is not None:
+        raise pending.error
+
+
+def collect_batch():
+    """Первый комментарий очереди и всё, что успело прийти за окно."""
+    batch = [_queue.get()]
+    deadline = time.monotonic() + settings.NEWS_BUFFER_WINDOW_MS / 1000
+    while len(batch) < settings.NEWS_BUFFER_MAX_BATCH:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def write_batch(batch):
+    """
+    Записывает пачку одной транзакцией на каждую базу.
+
+    Отменённые по таймауту комментарии пропускаются. Если пачка не
+    записалась, комментарии сохраняются по одному, чтобы ошибку получил
+    только запрос с плохим комментарием.
+    """
+    with _pending_lock:
+        batch = [pending for pending in batch if not pending.cancelled]
+        for pending in batch:
+            pending.taken = True
+    batch = sorted(batch, key=lambda pending: pending.using)
+    for using, group in groupby(batch, key=lambda pending: pending.using):
+        group = list(group)
+        try:
+            with transaction.atomic(using=using):
+                Comment.objects.using(using).bulk_create(
+                    pending.comment for pending in group
+                )
+        except Exception:
+            for pending in group:
+                try:
+                    pending.comment.save(using=using)
+                except Exception as error:
+                    pending.error = error
+        for pending in group:
+            pending.done.set()
+
+
+def run_writer():
+    """Цикл потока-писателя со своим подключением к базе."""
+    while True:
+        batch = collect_batch()
+        try:
+            write_batch(batch)
+        finally:
+            close_old_connections()
@@ -0,0 +1,48 @@
+"""Изменение строк-счётчиков пачкой постоянным числом запросов."""
+from collections import defaultdict
+
+# Столько первичных ключей передаётся в одном UPDATE ... WHERE pk IN.
+PKS_PER_QUERY = 900
+
+
+def upsert_many(model, using, key_fields, values, changes, defaults):
+    """
+    Меняет строки model по ключам из values, недостающие создаёт.
+
+    Ключ - кортеж значений key_fields, values[key] - хешируемое значение
+    для строки (например, прибавка к счётчику). changes(value) - новые
+    значения полей существующей строки (можно выражения от её же полей),
+    defaults(key, value) - поля новой строки. Существующие строки
+    читаются одним запросом и меняются одним UPDATE на каждое различное
+    value, новые вставляются одним bulk_create. Вызывается в транзакции
+    пачки: на SQLite она уже держит блокировку записи, и между чтением
+    и записью строку никто не вставит. Возвращает ключи созданных строк.
+    """
+    if not values:
+        return []
+    rows = model.objects.using(using)
+    # Фильтр по каждому полю ключа отдельно шире нужного: лишние
+    # сочетания отбрасываются ниже.
+    found = rows.filter(**{
+        f'{field}__in': {key[index] for key in values}
+        for index, field in enumerate(key_fields)
+    }).values_list('pk', *key_fields)
+    existing = {
+        tuple(key): pk for pk, *key in found if tuple(key) in values
+    }
+    # Строки с одинаковым value меняются одним UPDATE: bulk_update
+    # с CASE на каждую строку медленнее.
+    groups = defaultdict(list)
+    for key, pk in existing.items():
+        groups[values[key]].append(pk)
+    for value, pks in groups.items():
+        for start in range(0, len(pks), PKS_PER_QUERY):
+            rows.filter(pk__in=pks[start:start + PKS_PER_QUERY]).update(
+                **changes(value)
+            )
+    created = [key for key in values if key not in existing]
+    rows.bulk_create(
+        model(**dict(zip(key_fields, key)), **defaults(key, values[key]))
+        for key in created
+    )
+    return created
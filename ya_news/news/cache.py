@@ -0,0 +1,76 @@
+"""
+Кэш главной страницы и фрагментов новостей.
+
+Ключи содержат номер версии, который увеличивается при любом изменении
+новостей или комментариев, поэтому старые записи просто перестают
+читаться и вытесняются сами.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+VERSION_KEY = 'news:version'
+LOCK_POLL_INTERVAL = 0.05
+
+
+def get_cache():
+    """Кэш, выбранный для приложения в настройках."""
+    return caches[settings.NEWS_CACHE_ALIAS]
+
+
+def get_version():
+    """Текущая версия данных новостей."""
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Начинаем со времени, чтобы после вытеснения счётчика
+        # не вернуться к уже использованному номеру.
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Делает недействительными все закэшированные страницы."""
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+
+
+def make_key(name):
+    """Ключ записи для текущей версии данных."""
+    return f'news:{name}:{get_version()}'
+
+
+def get_or_build(key, build, timeout=None):
+    """
+    Возвращает значение из кэша или строит его.
+
+    При промахе значение строит только тот, кто захватил блокировку,
+    остальные ждут его результата не дольше NEWS_CACHE_LOCK_TIMEOUT.
+    """
+    cache = get_cache()
+    value = cache.get(key)
+    if value is not None:
+        return value
+    if timeout is None:
+        timeout = settings.NEWS_CACHE_TIMEOUT
+    lock_key = f'{key}:lock'
+    lock_timeout = settings.NEWS_CACHE_LOCK_TIMEOUT
+    if cache.add(lock_key, 1, lock_timeout):
+        try:
+            value = build()
+            cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return build()
@@ -1,5 +1,7 @@
+from django.conf import settings
 from django.forms import ModelForm
 from django.core.exceptions import ValidationError
+from django.utils.module_loading import import_string
 
 from .models import Comment
 
@@ -10,6 +12,16 @@ BAD_WORDS = (
 )
 WARNING = 'Не ругайтесь!'
 
+bad_words_filter = import_string(settings.NEWS_BAD_WORDS_ENGINE)(
+    BAD_WORDS, path=settings.NEWS_BAD_WORDS_FILE
+)
+
+
+def validate_comment_text(text):
+    """Не позволяем ругаться в комментариях."""
+    if bad_words_filter.search(text):
+        raise ValidationError(WARNING)
+
 
 class CommentForm(ModelForm):
 
@@ -17,11 +29,14 @@ class CommentForm(ModelForm):
         model = Comment
         fields = ('text',)
 
+    def __init__(self, *args, moderate=True, **kwargs):
+        """При moderate=False проверка текста откладывается до модерации."""
+        super().__init__(*args, **kwargs)
+        self.moderate = moderate
+
     def clean_text(self):
         """Не позволяем ругаться в комментариях."""
         text = self.cleaned_data['text']
-        lowered_text = text.lower()
-        for word in BAD_WORDS:
-            if word in lowered_text:
-                raise ValidationError(WARNING)
+        if self.moderate:
+            validate_comment_text(text)
         return text
@@ -0,0 +1,100 @@
+"""Пакетная загрузка комментариев из потока JSON Lines."""
+import json
+from collections import namedtuple
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+
+from .forms import validate_comment_text
+from .models import Comment, News
+
+IngestReport = namedtuple('IngestReport', ('created', 'errors'))
+RowError = namedtuple('RowError', ('line', 'error'))
+
+NOT_AN_OBJECT = 'Ожидается JSON-объект с полями news, author и text.'
+BAD_JSON = 'Некорректный JSON: {error}'
+EMPTY_TEXT = 'Пустой текст комментария.'
+UNKNOWN_NEWS = 'Новость {pk} не найдена.'
+UNKNOWN_AUTHOR = 'Пользователь {pk} не найден.'
+
+
+def parse_row(line):
+    """Разбирает одну строку потока в (news_id, author_id, text)."""
+    try:
+        row = json.loads(line)
+    except ValueError as error:
+        raise ValidationError(BAD_JSON.format(error=error))
+    if not isinstance(row, dict):
+        raise ValidationError(NOT_AN_OBJECT)
+    try:
+        news_id, author_id, text = (
+            int(row['news']), int(row['author']), str(row['text'])
+        )
+    except (KeyError, TypeError, ValueError):
+        raise ValidationError(NOT_AN_OBJECT)
+    if not text.strip():
+        raise ValidationError(EMPTY_TEXT)
+    validate_comment_text(text)
+    return news_id, author_id, text
+
+
+def validate_batch(rows):
+    """
+    Проверяет пачку разобранных строк.
+
+    Существование новостей и авторов проверяется двумя запросами на
+    пачку, а не отдельным запросом на строку.
+    """
+    news_ids = set(News.objects.filter(
+        pk__in={news_id for _, (news_id, _, _) in rows}
+    ).values_list('pk', flat=True))
+    author_ids = set(get_user_model().objects.filter(
+        pk__in={author_id for _, (_, author_id, _) in rows}
+    ).values_list('pk', flat=True))
+    comments, errors = [], []
+    for number, (news_id, author_id, text) in rows:
+        if news_id not in news_ids:
+            errors.append(RowError(number, UNKNOWN_NEWS.format(pk=news_id)))
+        elif author_id not in author_ids:
+            errors.append(
+                RowError(number, UNKNOWN_AUTHOR.format(pk=author_id))
+            )
+        else:
+            comments.append(
+                Comment(news_id=news_id, author_id=author_id, text=text)
+            )
+    return comments, errors
+
+
+def ingest_comments(lines, batch_size=None):
+    """
+    Загружает комментарии из итерируемого набора строк JSON Lines.
+
+    Каждая пачка из batch_size строк проверяется и записывается одной
+    транзакцией. Ошибочные строки пропускаются и попадают в отчёт
+    с номером строки.
+    """
+    batch_size = batch_size or settings.COMMENT_INGEST_BATCH_SIZE
+    numbered_lines = enumerate(lines, start=1)
+    created, errors = 0, []
+    while True:
+        batch = list(islice(numbered_lines, batch_size))
+        if not batch:
+            break
+        rows = []
+        for number, line in batch:
+            if not line.strip():
+                continue
+            try:
+                rows.append((number, parse_row(line)))
+            except ValidationError as error:
+                errors.append(RowError(number, ' '.join(error.messages)))
+        if not rows:
+            continue
+        comments, batch_errors = validate_batch(rows)
+        errors.extend(batch_errors)
+        Comment.objects.bulk_create(comments)
+        created += len(comments)
+    return IngestReport(created, sorted(errors))
@@ -0,0 +1,26 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from news.ingest import ingest_comments
+
+
+class Command(BaseCommand):
+    help = 'Загружает комментарии из файла JSON Lines (или stdin).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу или "-" для stdin.')
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, path, batch_size, **options):
+        if path == '-':
+            report = ingest_comments(sys.stdin, batch_size)
+        else:
+            with open(path, encoding='utf-8') as lines:
+                report = ingest_comments(lines, batch_size)
+        for error in report.errors:
+            self.stderr.write(f'Строка {error.line}: {error.error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено комментариев: {report.created}, '
+            f'ошибок: {len(report.errors)}'
+        ))
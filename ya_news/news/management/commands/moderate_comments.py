@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from news.moderation import process_pending
+
+
+class Command(BaseCommand):
+    help = 'Проверяет комментарии, ожидающие модерации.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а проверять очередь периодически.'
+        )
+        parser.add_argument('--interval', type=float, default=5)
+
+    def handle(self, *args, loop, interval, **options):
+        while True:
+            processed = process_pending()
+            if processed:
+                self.stdout.write(f'Проверено комментариев: {processed}')
+            if not loop:
+                break
+            time.sleep(interval)
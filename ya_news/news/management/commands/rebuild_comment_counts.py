@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from news import cache
+from news.models import Comment, News
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики комментариев у всех новостей.'
+
+    def handle(self, *args, **options):
+        comment_count = Comment.objects.published().filter(
+            news=OuterRef('pk')
+        ).order_by().values('news').annotate(
+            total=Count('pk')
+        ).values('total')
+        updated = News.objects.update(
+            comment_count=Coalesce(Subquery(comment_count), 0)
+        )
+        # Главная показывает счётчики из кэша.
+        cache.bump_version()
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлено новостей: {updated}')
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from news import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс новостей и комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, database, **options):
+        search.rebuild(database)
+        self.stdout.write(self.style.SUCCESS('Индекс перестроен.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from news import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает статистику комментариев по новостям.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--chunk-size', type=int, default=stats.STATS_CHUNK_SIZE
+        )
+
+    def handle(self, *args, database, chunk_size, **options):
+        total = stats.rebuild(database, chunk_size)
+        self.stdout.write(
+            self.style.SUCCESS(f'Новостей со статистикой: {total}.')
+        )
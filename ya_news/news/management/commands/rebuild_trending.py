@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from news import cache, trending
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинг обсуждаемых новостей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, database, **options):
+        total = trending.rebuild(database)
+        cache.bump_version()
+        self.stdout.write(
+            self.style.SUCCESS(f'Новостей в рейтинге: {total}.')
+        )
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.15 on 2026-10-18 17:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0003_comment_news_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='status',
+            field=models.CharField(choices=[('published', 'Опубликован'), ('pending', 'На модерации'), ('rejected', 'Отклонён')], default='published', max_length=9),
+        ),
+        migrations.CreateModel(
+            name='ModerationTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('comment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='news.comment')),
+            ],
+            options={
+                'ordering': ('created',),
+            },
+        ),
+    ]
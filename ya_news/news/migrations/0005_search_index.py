@@ -0,0 +1,58 @@
+# Generated by Django 3.2.15 on 2026-10-18 17:30
+
+from django.db import migrations
+
+NEWS_TABLE = 'news_news_fts'
+COMMENT_TABLE = 'news_comment_fts'
+
+
+def get_tokenizer(connection):
+    """Токенизатор FTS5 или None, если FTS5 недоступен."""
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        if ('ENABLE_FTS5',) not in cursor.fetchall():
+            return None
+    if connection.Database.sqlite_version_info >= (3, 34):
+        return 'trigram'
+    return 'unicode61 remove_diacritics 2'
+
+
+def create_search_tables(apps, schema_editor):
+    tokenizer = get_tokenizer(schema_editor.connection)
+    if tokenizer is None:
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE {NEWS_TABLE} USING fts5('
+        f"title, text, tokenize = '{tokenizer}')"
+    )
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE {COMMENT_TABLE} USING fts5('
+        f"text, news_id UNINDEXED, tokenize = '{tokenizer}')"
+    )
+    schema_editor.execute(
+        f'INSERT INTO {NEWS_TABLE} (rowid, title, text) '
+        'SELECT id, title, text FROM news_news'
+    )
+    schema_editor.execute(
+        f'INSERT INTO {COMMENT_TABLE} (rowid, text, news_id) '
+        "SELECT id, text, news_id FROM news_comment WHERE status = 'published'"
+    )
+
+
+def drop_search_tables(apps, schema_editor):
+    if get_tokenizer(schema_editor.connection) is not None:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {NEWS_TABLE}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {COMMENT_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_comment_moderation'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.15 on 2026-10-18 17:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_news_modified'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsTrend',
+            fields=[
+                ('news', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend', serialize=False, to='news.news')),
+                ('score', models.FloatField(db_index=True)),
+            ],
+            options={
+                'ordering': ('-score',),
+            },
+        ),
+    ]
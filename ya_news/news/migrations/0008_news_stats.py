@@ -0,0 +1,55 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('news', '0007_news_trend'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsStats',
+            fields=[
+                ('news', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='news.news')),
+                ('commenter_count', models.PositiveIntegerField(default=0)),
+                ('last_comment', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NewsDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('news', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='news.news')),
+            ],
+            options={
+                'verbose_name': 'Комментарии за день',
+                'verbose_name_plural': 'Комментарии по дням',
+                'ordering': ('-day',),
+            },
+        ),
+        migrations.CreateModel(
+            name='NewsCommenter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('news', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='news.news')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='newsdailystats',
+            constraint=models.UniqueConstraint(fields=('news', 'day'), name='news_daily_stats_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='newscommenter',
+            constraint=models.UniqueConstraint(fields=('news', 'author'), name='news_commenter_unique'),
+        ),
+    ]
@@ -1,13 +1,37 @@
 from datetime import datetime
 
 from django.conf import settings
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.models import Count, F, Q
+
+
+class NewsQuerySet(models.QuerySet):
+
+    def with_comment_count(self):
+        """
+        Добавляет к новостям количество комментариев в `comment_total`.
+
+        По умолчанию берём денормализованный счётчик, агрегация по
+        комментариям остаётся запасным вариантом.
+        """
+        if settings.NEWS_COMMENT_COUNT_DENORMALIZED:
+            return self.annotate(comment_total=F('comment_count'))
+        return self.annotate(comment_total=Count(
+            'comment',
+            filter=Q(comment__status=Comment.Status.PUBLISHED)
+        ))
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
     date = models.DateField(default=datetime.today)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    modified = models.DateTimeField(auto_now=True)
+    # Когда последний раз менялись опубликованные комментарии новости.
+    comments_modified = models.DateTimeField(null=True, editable=False)
+
+    objects = NewsQuerySet.as_manager()
 
     class Meta:
         ordering = ('-date',)
@@ -17,8 +41,165 @@ class News(models.Model):
     def __str__(self):
         return self.title
 
+    @property
+    def last_modified(self):
+        """Время последнего изменения страницы новости."""
+        return max(filter(None, (self.modified, self.comments_modified)))
+
+
+class NewsTrend(models.Model):
+    """
+    Место новости в рейтинге обсуждаемых.
+
+    Рейтинг пересчитывается в news.trending, чтобы главная "Обсуждаемое"
+    читала k строк по индексу, а не сортировала комментарии.
+    """
+    news = models.OneToOneField(
+        News,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trend',
+    )
+    score = models.FloatField(db_index=True)
+
+    class Meta:
+        ordering = ('-score',)
+
+
+class NewsStats(models.Model):
+    """
+    Статистика комментариев новости.
+
+    Поддерживается сигналами в news.stats, чтобы админка не агрегировала
+    комментарии.
+    """
+    news = models.OneToOneField(
+        News,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    commenter_count = models.PositiveIntegerField(default=0)
+    last_comment = models.DateTimeField(null=True)
+
+
+class NewsDailyStats(models.Model):
+    """Число опубликованных комментариев новости за день."""
+    news = models.ForeignKey(
+        News,
+        on_delete=models.CASCADE,
+        related_name='daily_stats',
+    )
+    day = models.DateField()
+    comment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ('-day',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('news', 'day'), name='news_daily_stats_unique'
+            ),
+        )
+        verbose_name_plural = 'Комментарии по дням'
+        verbose_name = 'Комментарии за день'
+
+
+class NewsCommenter(models.Model):
+    """
+    Сколько опубликованных комментариев автор оставил к новости.
+
+    По этим строкам считается число уникальных комментаторов: оно
+    меняется, только когда строка появляется или исчезает.
+    """
+    news = models.ForeignKey(News, on_delete=models.CASCADE)
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    comment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('news', 'author'), name='news_commenter_unique'
+            ),
+        )
+
+
+class CommentQuerySet(models.QuerySet):
+
+    def published(self):
+        """Комментарии, прошедшие модерацию."""
+        return self.filter(status=Comment.Status.PUBLISHED)
+
+    def bulk_create(self, objs, batch_size=None, ignore_conflicts=False):
+        """
+        Массовое создание комментариев с сигналом comments_bulk_created.
+
+        Обычный bulk_create не отправляет post_save, поэтому счётчики,
+        индекс и кэш обновляются получателями этого сигнала по самим
+        объектам, без повторного чтения строк. SQLite не возвращает
+        первичные ключи вставленных строк, поэтому пачка пишется
+        отдельными INSERT, и ключи каждого берутся из last_insert_rowid():
+        внутри одного INSERT строки получают ключи подряд, чужие вставки
+        между ними невозможны. В сигнал попадают только строки, вставка
+        которых подтверждена: если ignore_conflicts пропустил часть
+        строк INSERT, неизвестно какие, и весь он в сигнал не попадает.
+        """
+        from .signals import comments_bulk_created
+
+        objs = list(objs)
+        connection = connections[self.db]
+        with transaction.atomic(using=self.db):
+            if connection.features.can_return_rows_from_bulk_insert:
+                objs = super().bulk_create(
+                    objs, batch_size, ignore_conflicts
+                )
+                created = [obj for obj in objs if obj.pk is not None]
+            else:
+                created = self._bulk_create_with_rowids(
+                    objs, batch_size, ignore_conflicts
+                )
+            comments_bulk_created.send(
+                sender=self.model, comments=created, using=self.db
+            )
+        return objs
+
+    def _bulk_create_with_rowids(self, objs, batch_size, ignore_conflicts):
+        """Вставляет objs по одному INSERT и проставляет им ключи."""
+        connection = connections[self.db]
+        created = []
+        for has_pk in (True, False):
+            group = [obj for obj in objs if (obj.pk is not None) == has_pk]
+            fields = [
+                field for field in self.model._meta.concrete_fields
+                if has_pk or not field.primary_key
+            ]
+            size = max(connection.ops.bulk_batch_size(fields, group), 1)
+            size = min(batch_size, size) if batch_size else size
+            for start in range(0, len(group), size):
+                chunk = group[start:start + size]
+                super().bulk_create(chunk, ignore_conflicts=ignore_conflicts)
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT last_insert_rowid(), changes()')
+                    last_pk, inserted = cursor.fetchone()
+                if inserted != len(chunk):
+                    continue
+                if not has_pk:
+                    first_pk = last_pk - inserted + 1
+                    for pk, obj in enumerate(chunk, start=first_pk):
+                        obj.pk = pk
+                created.extend(chunk)
+        return created
+
 
 class Comment(models.Model):
+
+    class Status(models.TextChoices):
+        PUBLISHED = 'published', 'Опубликован'
+        PENDING = 'pending', 'На модерации'
+        REJECTED = 'rejected', 'Отклонён'
+
     news = models.ForeignKey(
         News,
         on_delete=models.CASCADE
@@ -29,9 +210,44 @@ class Comment(models.Model):
     )
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(
+        max_length=9,
+        choices=Status.choices,
+        default=Status.PUBLISHED,
+    )
+
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_news_created_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
+
+    def save(self, *args, **kwargs):
+        """Комментарий и счётчик новости сохраняются в одной транзакции."""
+        using = kwargs.get('using') or router.db_for_write(
+            Comment, instance=self
+        )
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
+class ModerationTask(models.Model):
+    """
+    Очередь отложенной модерации.
+
+    Задача живёт в базе, пока комментарий не проверен, поэтому очередь
+    переживает перезапуск сервера.
+    """
+    comment = models.OneToOneField(Comment, on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('created',)
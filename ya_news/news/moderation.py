@@ -0,0 +1,100 @@
+"""
+Отложенная модерация комментариев.
+
+В режиме NEWS_ASYNC_MODERATION комментарий сохраняется со статусом
+"на модерации", а проверки из NEWS_MODERATION_CHECKS выполняет пул
+потоков уже после ответа пользователю. Очередь хранится в таблице
+ModerationTask; то, что не успели проверить до перезапуска, добирает
+команда moderate_comments.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, router, transaction
+from django.utils.module_loading import import_string
+
+from .models import Comment, ModerationTask
+from .signals import comment_published
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Пул потоков модерации, создаётся при первом обращении."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.NEWS_MODERATION_WORKERS,
+                thread_name_prefix='moderation',
+            )
+    return _executor
+
+
+def enqueue(comment):
+    """Ставит сохранённый комментарий в очередь модерации."""
+    task = ModerationTask.objects.create(comment=comment)
+    transaction.on_commit(
+        lambda: get_executor().submit(run_task, task.pk)
+    )
+    return task
+
+
+def is_acceptable(text):
+    """Проходит ли текст все проверки модерации."""
+    for check in settings.NEWS_MODERATION_CHECKS:
+        try:
+            import_string(check)(text)
+        except ValidationError:
+            return False
+    return True
+
+
+def process_task(task_id):
+    """Проверяет комментарий из задачи и публикует или отклоняет его."""
+    # Очередь читается из основной базы: реплика может не успеть
+    # получить только что поставленную задачу.
+    using = router.db_for_write(ModerationTask)
+    task = ModerationTask.objects.using(using).select_related(
+        'comment'
+    ).filter(pk=task_id).first()
+    if task is None:
+        return
+    comment = task.comment
+    status = (
+        Comment.Status.PUBLISHED if is_acceptable(comment.text)
+        else Comment.Status.REJECTED
+    )
+    with transaction.atomic(using=using):
+        # Задачу могли уже обработать параллельно, тогда статус
+        # не меняется и комментарий не публикуется второй раз.
+        updated = Comment.objects.using(using).filter(
+            pk=comment.pk, status=Comment.Status.PENDING
+        ).update(status=status)
+        task.delete()
+        if updated and status == Comment.Status.PUBLISHED:
+            comment.status = status
+            comment_published.send(sender=Comment, comment=comment)
+
+
+def run_task(task_id):
+    """Обработка задачи в потоке пула со своим подключением к базе."""
+    try:
+        process_task(task_id)
+    finally:
+        close_old_connections()
+
+
+def process_pending():
+    """Обрабатывает все задачи очереди, возвращает их количество."""
+    task_ids = list(
+        ModerationTask.objects.using(
+            router.db_for_write(ModerationTask)
+        ).values_list('pk', flat=True)
+    )
+    for task_id in task_ids:
+        process_task(task_id)
+    return len(task_ids)
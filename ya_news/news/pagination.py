@@ -0,0 +1,56 @@
+"""Постраничный вывод комментариев по ключу (created, id)."""
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from django.db.models import Q
+
+from .models import Comment
+
+
+def encode_cursor(comment):
+    """Курсор, указывающий на последний показанный комментарий."""
+    raw = f'{comment.created.isoformat()}|{comment.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор обратно в пару (created, id)."""
+    try:
+        raw = base64.urlsafe_b64decode(
+            cursor + '=' * (-len(cursor) % 4)
+        ).decode()
+        created, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created), int(pk)
+    except (ValueError, UnicodeDecodeError) as error:
+        raise BadRequest('Некорректный курсор.') from error
+
+
+def seek(comments, created, pk):
+    """Комментарии после пары (created, id) при порядке ('created', 'pk')."""
+    # Лишнее условие created >= created даёт SQLite переход по
+    # индексу сразу к курсору: по одному OR он читает ветку с начала.
+    return comments.filter(
+        Q(created__gt=created) | Q(created=created, pk__gt=pk),
+        created__gte=created,
+    )
+
+
+def get_comment_page(news_id, cursor=None):
+    """
+    Возвращает страницу комментариев новости и курсор следующей страницы.
+
+    Выборка идёт по индексу (news, created, id), поэтому стоимость
+    запроса не зависит от того, насколько далеко пролистана ветка.
+    """
+    size = settings.COMMENT_COUNT_ON_DETAIL_PAGE
+    comments = Comment.objects.published().filter(
+        news_id=news_id
+    ).select_related('author').order_by('created', 'pk')
+    if cursor:
+        comments = seek(comments, *decode_cursor(cursor))
+    comments = list(comments[:size + 1])
+    if len(comments) > size:
+        return comments[:size], encode_cursor(comments[size - 1])
+    return comments, None
@@ -0,0 +1,99 @@
+"""
+Движки поиска запрещённых слов в комментариях.
+
+Список слов складывается из BAD_WORDS и, если задан
+NEWS_BAD_WORDS_FILE, из файла с одним словом в строке. Файл
+перечитывается при изменении, перезапуск сервера не нужен.
+"""
+import os
+import re
+import threading
+
+
+class SubstringFilter:
+    """Проверка каждого слова по очереди через `in`."""
+
+    def __init__(self, words=(), path=None):
+        self.base_words = tuple(words)
+        self.path = path
+        self._mtime = None
+        self._lock = threading.Lock()
+        self.load(self.base_words)
+
+    def load(self, words):
+        """Заменяет список слов."""
+        self.words = frozenset(
+            word.strip().lower() for word in words if word.strip()
+        )
+
+    def reload_if_changed(self):
+        """Перечитывает файл со словами, если он изменился."""
+        if not self.path:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with open(self.path, encoding='utf-8') as lines:
+                self.load(self.base_words + tuple(
+                    line for line in lines if not line.startswith('#')
+                ))
+            self._mtime = mtime
+
+    def search(self, text):
+        """Есть ли в тексте хотя бы одно запрещённое слово."""
+        self.reload_if_changed()
+        lowered_text = text.lower()
+        return any(word in lowered_text for word in self.words)
+
+
+class RegexFilter(SubstringFilter):
+    """
+    Поиск всех слов одним регулярным выражением.
+
+    Выражение собирается из префиксного дерева слов, поэтому на каждой
+    позиции текста движок идёт по дереву, а не перебирает все слова.
+    """
+
+    def load(self, words):
+        super().load(words)
+        self.pattern = build_pattern(self.words)
+
+    def search(self, text):
+        self.reload_if_changed()
+        pattern = self.pattern
+        if pattern is None:
+            return False
+        return pattern.search(text.lower()) is not None
+
+
+def build_pattern(words):
+    """Компилирует регулярное выражение, находящее любое из слов."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    if not trie:
+        return None
+    return re.compile(trie_to_regex(trie))
+
+
+def trie_to_regex(node):
+    """Выражение для поддерева префиксного дерева."""
+    if '' in node:
+        # Слово закончилось: для поиска вхождения продолжения не нужны.
+        return ''
+    branches = [
+        re.escape(char) + trie_to_regex(child)
+        for char, child in sorted(node.items())
+    ]
+    if len(branches) == 1:
+        return branches[0]
+    return '(?:' + '|'.join(branches) + ')'
@@ -0,0 +1,91 @@
+"""Одновременная запись комментариев из нескольких потоков."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connections
+
+from news import buffer
+from news.models import Comment, News
+from ..conftest import create_database
+
+# Пути записи одного комментария: обычное сохранение и групповая запись.
+WRITE_PATHS = {
+    'save': lambda comment, alias: comment.save(using=alias),
+    'buffer': lambda comment, alias: buffer.save(comment, using=alias),
+}
+
+
+@pytest.fixture
+def writer_database(tmp_path):
+    """
+    Подключает отдельный файл SQLite для писателей.
+
+    Возвращает функцию add(alias, **settings): общая база тестов в памяти
+    не выдерживает записи из потоков. Базы отключаются после теста.
+    """
+    aliases = []
+
+    def add(alias, **settings):
+        create_database(alias, tmp_path / f'{alias}.sqlite3')
+        connections.databases[alias].update(settings)
+        aliases.append(alias)
+
+    yield add
+    for alias in aliases:
+        connections[alias].close()
+        del connections[alias]
+        del connections.databases[alias]
+
+
+@pytest.fixture
+def write_comments():
+    """
+    Всплеск комментариев к одной новости.
+
+    Возвращает функцию write(alias, path, writers, comments_per_writer):
+    писатели стартуют разом и пишут комментарии путём WRITE_PATHS[path],
+    каждый комментарий - как отдельный запрос. Результат - (комментариев
+    в секунду, число ошибок OperationalError).
+    """
+    def write(alias, path, writers, comments_per_writer):
+        save = WRITE_PATHS[path]
+        author = get_user_model().objects.db_manager(alias).create(
+            username=f'Автор {alias}'
+        )
+        news = News.objects.db_manager(alias).create(title='Заголовок')
+        barrier = Barrier(writers)
+
+        def writer(number):
+            errors = 0
+            barrier.wait()
+            try:
+                for index in range(comments_per_writer):
+                    try:
+                        save(
+                            Comment(
+                                news=news,
+                                author=author,
+                                text=f'{number} {index}',
+                            ),
+                            alias,
+                        )
+                    except OperationalError:
+                        errors += 1
+                    # Конец запроса: соединение закрывается или остаётся
+                    # жить по правилам профиля, как в close_old_connections.
+                    connections[alias].close_if_unusable_or_obsolete()
+            finally:
+                connections[alias].close()
+            return errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=writers) as executor:
+            errors = sum(executor.map(writer, range(writers)))
+        elapsed = time.perf_counter() - started
+        created = Comment.objects.using(alias).count()
+        return created / elapsed, errors
+
+    return write
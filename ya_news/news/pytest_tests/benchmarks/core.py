@@ -0,0 +1,137 @@
+"""
+Генераторы больших наборов данных и замеры адресов с базовой линией.
+
+Размер набора задаёт NEWS_BENCH_SIZE (число комментариев, новостей в
+десять раз меньше). Базовая линия хранится в baselines.json рядом и
+перезаписывается при BENCH_UPDATE_BASELINES=1; замер хуже базовой линии
+больше чем на BENCH_THRESHOLD считается регрессией.
+"""
+import json
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.db import DEFAULT_DB_ALIAS
+
+from news import search, trending
+from news.models import Comment, News
+
+NEWS_BENCH_SIZE = int(os.getenv('NEWS_BENCH_SIZE', 100000))
+BATCH_SIZE = 5000
+# Доля комментариев, которые приходятся на одну обсуждаемую новость.
+HOT_SHARE = 0.1
+
+BASELINES = Path(__file__).with_name('baselines.json')
+REQUESTS = int(os.getenv('BENCH_REQUESTS', 200))
+WARMUP = 10
+THRESHOLD = float(os.getenv('BENCH_THRESHOLD', 0.25))
+UPDATE_BASELINES = os.getenv('BENCH_UPDATE_BASELINES') == '1'
+
+
+def create_news(count):
+    """Массово создаёт count новостей за последние count дней."""
+    today = datetime.today()
+    for start in range(0, count, BATCH_SIZE):
+        News.objects.bulk_create(
+            News(
+                title=f'Новость {index}',
+                text=f'Текст новости {index}',
+                date=today - timedelta(days=index),
+            )
+            for index in range(start, min(start + BATCH_SIZE, count))
+        )
+
+
+def create_comments(hot_news, author, count):
+    """
+    Массово создаёт count комментариев.
+
+    Доля HOT_SHARE достаётся hot_news, остальные расходятся по всем
+    новостям по кругу.
+    """
+    news_ids = list(News.objects.values_list('pk', flat=True))
+    hot_every = round(1 / HOT_SHARE)
+    for start in range(0, count, BATCH_SIZE):
+        Comment.objects.bulk_create(
+            Comment(
+                news_id=(
+                    hot_news.pk if index % hot_every == 0
+                    else news_ids[index % len(news_ids)]
+                ),
+                author=author,
+                text=f'Комментарий {index}',
+            )
+            for index in range(start, min(start + BATCH_SIZE, count))
+        )
+
+
+def create_dataset(hot_news, author, size=NEWS_BENCH_SIZE):
+    """Новости, комментарии и поисковый индекс для замеров."""
+    create_news(size // 10)
+    create_comments(hot_news, author, size)
+    search.rebuild(DEFAULT_DB_ALIAS)
+    trending.rebuild(DEFAULT_DB_ALIAS)
+
+
+def measure(send, requests=REQUESTS):
+    """Запросов в секунду, медиана и p99 задержки последовательных вызовов."""
+    for _ in range(WARMUP):
+        send()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        sent = time.perf_counter()
+        send()
+        latencies.append(time.perf_counter() - sent)
+    total = time.perf_counter() - start
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        'rps': round(requests / total, 1),
+        'p50_ms': round(quantiles[49] * 1000, 2),
+        'p99_ms': round(quantiles[98] * 1000, 2),
+    }
+
+
+def check_baselines(size, results):
+    """
+    Сравнивает замеры с базовой линией и возвращает регрессии.
+
+    Сравниваются запросы в секунду и медиана: p99 на сотнях запросов
+    слишком шумный. Базовая линия другого размера набора не сравнивается.
+    """
+    if UPDATE_BASELINES:
+        BASELINES.write_text(
+            json.dumps(
+                {'size': size, 'urls': results}, indent=2, ensure_ascii=False
+            ) + '\n',
+            encoding='utf-8'
+        )
+        return []
+    if not BASELINES.exists():
+        return []
+    baselines = json.loads(BASELINES.read_text(encoding='utf-8'))
+    if baselines['size'] != size:
+        return []
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines['urls'].get(name)
+        if baseline is None:
+            continue
+        if (
+            result['p50_ms'] > baseline['p50_ms'] * (1 + THRESHOLD)
+            or result['rps'] < baseline['rps'] / (1 + THRESHOLD)
+        ):
+            regressions.append(f'{name}: {result}, было {baseline}')
+    return regressions
+
+
+def report(size, results):
+    """Таблица замеров в вывод теста."""
+    print(f'\n{size} записей, {REQUESTS} запросов на адрес')
+    for name, result in results.items():
+        print(
+            f'{name:<24} {result["rps"]:>8} rps  '
+            f'p50 {result["p50_ms"]:>8} мс  p99 {result["p99_ms"]:>8} мс'
+        )
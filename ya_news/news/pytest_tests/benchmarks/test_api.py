@@ -0,0 +1,41 @@
+"""Память, которую занимает потоковая выгрузка комментариев."""
+import tracemalloc
+
+import pytest
+from django.urls import reverse
+
+from news.models import Comment
+
+pytestmark = pytest.mark.benchmark
+
+COMMENT_COUNTS = (10_000, 100_000)
+
+
+def export_peak(client, news):
+    """Пик выделенной памяти при чтении выгрузки целиком, в байтах."""
+    url = reverse('news:api_comments', args=(news.pk,))
+    tracemalloc.start()
+    try:
+        size = sum(
+            len(chunk) for chunk in client.get(url).streaming_content
+        )
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert size
+    return peak
+
+
+def test_export_memory_is_constant(client, news, author):
+    """Пик памяти не растёт вместе с длиной обсуждения."""
+    peaks = {}
+    created = 0
+    for count in COMMENT_COUNTS:
+        Comment.objects.bulk_create(
+            Comment(news=news, author=author, text=f'Комментарий {index}')
+            for index in range(created, count)
+        )
+        created = count
+        peaks[count] = export_peak(client, news)
+    print(f'\nпик памяти, байт: {peaks}')
+    assert peaks[COMMENT_COUNTS[-1]] < 2 * peaks[COMMENT_COUNTS[0]]
@@ -0,0 +1,81 @@
+"""Задержка главной страницы под WSGI и ASGI при большом числе клиентов."""
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, Client
+
+pytestmark = pytest.mark.benchmark
+
+# Одновременных клиентов и потоков WSGI-сервера, как у gunicorn --threads.
+CONCURRENCY = 64
+WSGI_THREADS = 4
+REQUESTS = 512
+
+
+def percentiles(latencies):
+    """Медиана и 95-й перцентиль задержки в миллисекундах."""
+    quantiles = statistics.quantiles(latencies, n=20)
+    return round(quantiles[9] * 1000, 2), round(quantiles[18] * 1000, 2)
+
+
+def wsgi_latencies(url):
+    """Задержки запросов, обслуживаемых пулом потоков."""
+    def get(submitted):
+        assert Client().get(url).status_code == HTTPStatus.OK
+        return time.perf_counter() - submitted
+
+    with ThreadPoolExecutor(max_workers=WSGI_THREADS) as executor:
+        latencies = []
+        for start in range(0, REQUESTS, CONCURRENCY):
+            futures = [
+                executor.submit(get, time.perf_counter())
+                for _ in range(start, min(start + CONCURRENCY, REQUESTS))
+            ]
+            latencies += [future.result() for future in futures]
+    return latencies
+
+
+def asgi_latencies(url):
+    """Задержки запросов, обслуживаемых циклом событий."""
+    async def get():
+        submitted = time.perf_counter()
+        response = await AsyncClient().get(url)
+        assert response.status_code == HTTPStatus.OK
+        return time.perf_counter() - submitted
+
+    async def run():
+        latencies = []
+        for start in range(0, REQUESTS, CONCURRENCY):
+            latencies += await asyncio.gather(*(
+                get() for _ in range(start, min(start + CONCURRENCY, REQUESTS))
+            ))
+        return latencies
+
+    return async_to_sync(run)()
+
+
+@pytest.mark.parametrize('async_enabled', (False, True))
+def test_home_page_latency(news_home_url, news_list, async_enabled, request):
+    """
+    Задержка WSGI и ASGI на закэшированной главной странице.
+
+    Только отчёт: в Django 3.2 встроенные middleware под ASGI выполняются
+    в одном потоке через sync_to_async, и эти переходы, а не
+    представление, определяют задержку.
+    """
+    if async_enabled:
+        request.getfixturevalue('async_views')
+    Client().get(news_home_url)
+    results = {
+        'wsgi': percentiles(wsgi_latencies(news_home_url)),
+        'asgi': percentiles(asgi_latencies(news_home_url)),
+    }
+    print(
+        f'\nNEWS_ASYNC_VIEWS={async_enabled}, '
+        f'мс (медиана, p95): {results}'
+    )
@@ -0,0 +1,23 @@
+"""Всплеск комментариев к одной новости: по одному и пачками."""
+import pytest
+
+pytestmark = pytest.mark.benchmark
+
+WRITERS = 32
+COMMENTS_PER_WRITER = 20
+PATHS = ('save', 'buffer')
+
+
+def test_buffered_writes_faster(settings, writer_database, write_comments):
+    """Групповая запись быстрее и без "database is locked"."""
+    settings.NEWS_BUFFER_WINDOW_MS = 5
+    results = {}
+    for path in PATHS:
+        writer_database(path)
+        results[path] = write_comments(
+            path, path, WRITERS, COMMENTS_PER_WRITER
+        )
+    print(f'\nкомментариев в секунду, ошибок: {results}')
+    throughput, errors = results['buffer']
+    assert errors == 0
+    assert throughput > results['save'][0]
@@ -0,0 +1,54 @@
+"""Пропускная способность пакетной загрузки комментариев."""
+import json
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from news.ingest import ingest_comments
+from news.models import Comment, News, NewsCommenter, NewsDailyStats
+
+pytestmark = pytest.mark.benchmark
+
+ROWS = 50_000
+NEWS_COUNT = 50
+AUTHOR_COUNT = 100
+# Строк в секунду, ниже которых загрузка считается регрессией. Сама
+# вставка через bulk_create идёт около 17 тысяч строк в секунду, с
+# проверкой строк и сигналами - около 8 тысяч; счётчики по строке
+# давали 5 тысяч.
+MIN_ROWS_PER_SECOND = 6_000
+
+
+def test_ingest_throughput():
+    """Счётчики пачки не замедляют загрузку запросом на строку."""
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст')
+        for index in range(NEWS_COUNT)
+    )
+    User = get_user_model()
+    User.objects.bulk_create(
+        User(username=f'Автор {index}') for index in range(AUTHOR_COUNT)
+    )
+    news_ids = list(News.objects.values_list('pk', flat=True))
+    author_ids = list(User.objects.values_list('pk', flat=True))
+    lines = [
+        json.dumps({
+            'news': news_ids[index % NEWS_COUNT],
+            'author': author_ids[index % AUTHOR_COUNT],
+            'text': f'Комментарий {index} к новости',
+        })
+        for index in range(ROWS)
+    ]
+    started = time.perf_counter()
+    report = ingest_comments(lines)
+    rows_per_second = ROWS / (time.perf_counter() - started)
+    print(f'\n{ROWS} строк: {rows_per_second:.0f} в секунду')
+    assert report.created == ROWS
+    assert sum(
+        NewsDailyStats.objects.values_list('comment_count', flat=True)
+    ) == Comment.objects.count()
+    assert NewsCommenter.objects.count() == len(
+        {(index % NEWS_COUNT, index % AUTHOR_COUNT) for index in range(ROWS)}
+    )
+    assert rows_per_second > MIN_ROWS_PER_SECOND
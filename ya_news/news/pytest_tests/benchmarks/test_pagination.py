@@ -0,0 +1,41 @@
+"""Стоимость страницы комментариев в начале и в конце длинной ветки."""
+import timeit
+
+import pytest
+
+from news.models import Comment
+from news.pagination import encode_cursor, get_comment_page
+from .core import BATCH_SIZE
+
+pytestmark = pytest.mark.benchmark
+
+COMMENT_COUNT = 200_000
+REPEAT = 20
+# Во сколько раз глубокая страница может быть дороже первой.
+DEEP_PAGE_TOLERANCE = 2
+
+
+def test_deep_page_costs_like_first(news, author):
+    """Стоимость страницы не растёт с глубиной пролистывания."""
+    for start in range(0, COMMENT_COUNT, BATCH_SIZE):
+        Comment.objects.bulk_create(
+            Comment(news=news, author=author, text=f'Комментарий {index}')
+            for index in range(start, start + BATCH_SIZE)
+        )
+    deep_cursor = encode_cursor(
+        Comment.objects.filter(news=news).order_by('created', 'pk')[
+            COMMENT_COUNT - 100
+        ]
+    )
+    first_page = min(timeit.repeat(
+        lambda: get_comment_page(news.pk), number=1, repeat=REPEAT
+    ))
+    deep_page = min(timeit.repeat(
+        lambda: get_comment_page(news.pk, deep_cursor),
+        number=1, repeat=REPEAT
+    ))
+    print(
+        f'\n{COMMENT_COUNT} комментариев: первая страница '
+        f'{first_page * 1000:.2f} мс, глубокая {deep_page * 1000:.2f} мс'
+    )
+    assert deep_page < first_page * DEEP_PAGE_TOLERANCE
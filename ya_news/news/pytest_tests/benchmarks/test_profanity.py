@@ -0,0 +1,40 @@
+"""Сравнение движков поиска запрещённых слов."""
+import random
+import timeit
+
+import pytest
+
+from news.profanity import RegexFilter, SubstringFilter
+
+pytestmark = pytest.mark.benchmark
+
+ALPHABET = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя'
+WORD_COUNTS = (1000, 5000, 20000)
+TEXT_LENGTH = 20000
+REPEAT = 5
+
+
+def random_words(count, rng):
+    """Случайные слова длиной от 6 до 10 букв."""
+    return [
+        ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(6, 10)))
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize('word_count', WORD_COUNTS)
+def test_regex_filter_is_faster(word_count):
+    """Скомпилированное выражение быстрее перебора слов."""
+    rng = random.Random(word_count)
+    words = random_words(word_count, rng)
+    # Текст без запрещённых слов - худший случай для обоих движков.
+    text = ' '.join(random_words(TEXT_LENGTH // 9, rng))
+    timings = {}
+    for engine in (SubstringFilter, RegexFilter):
+        bad_words_filter = engine(words)
+        assert not bad_words_filter.search(text)
+        timings[engine.__name__] = min(timeit.repeat(
+            lambda: bad_words_filter.search(text), number=1, repeat=REPEAT
+        ))
+    print(f'\n{len(words)} слов, {len(text)} символов: {timings}')
+    assert timings['RegexFilter'] < timings['SubstringFilter']
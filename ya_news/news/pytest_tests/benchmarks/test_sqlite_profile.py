@@ -0,0 +1,27 @@
+"""Нагрузочный тест записи комментариев в файл SQLite из нескольких потоков."""
+import pytest
+
+from yanews.settings_production import SQLITE_PROFILE
+
+pytestmark = pytest.mark.benchmark
+
+WRITERS = 8
+COMMENTS_PER_WRITER = 100
+PROFILES = {
+    'stock': {'ENGINE': 'django.db.backends.sqlite3'},
+    'tuned': SQLITE_PROFILE,
+}
+
+
+def test_tuned_profile_writes_faster(writer_database, write_comments):
+    """Профиль для продакшена пишет быстрее и без "database is locked"."""
+    results = {}
+    for alias, profile in PROFILES.items():
+        writer_database(alias, **profile)
+        results[alias] = write_comments(
+            alias, 'save', WRITERS, COMMENTS_PER_WRITER
+        )
+    print(f'\nкомментариев в секунду, ошибок: {results}')
+    throughput, errors = results['tuned']
+    assert errors == 0
+    assert throughput > results['stock'][0]
@@ -0,0 +1,79 @@
+"""Отрисовка страницы новости с длинным списком комментариев."""
+import timeit
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from news.forms import CommentForm
+from news.models import Comment, News
+from yanews.settings_production import TEMPLATES
+from yanews.warmup import warm_up_templates
+
+pytestmark = pytest.mark.benchmark
+
+COMMENT_COUNTS = (50, 500, 5000)
+REPEAT = 5
+# Разбор шаблонов заметен на коротких списках, на длинных - только отчёт.
+COMPARED_COUNT = COMMENT_COUNTS[0]
+
+
+def render_detail(user, news, comments):
+    """Отрисовка news/detail.html так, как её делает NewsDetail."""
+    request = RequestFactory().get('/')
+    request.user = user
+    return render_to_string('news/detail.html', {
+        'news': news,
+        'object': news,
+        'comments': comments,
+        'next_cursor': None,
+        'form': CommentForm() if user.is_authenticated else None,
+    }, request)
+
+
+def measure(user, news, comments):
+    return min(timeit.repeat(
+        lambda: render_detail(user, news, comments), number=1, repeat=REPEAT
+    ))
+
+
+@pytest.mark.parametrize('count', COMMENT_COUNTS)
+def test_detail_render_time(settings, author, count):
+    """
+    Отрисовка с разбором шаблонов на каждый вызов и из кэша.
+
+    Под pytest DEBUG = False, и Django сам включает кэширующий загрузчик,
+    поэтому профиль по умолчанию - как при разработке, с debug.
+    """
+    development = [{
+        **settings.TEMPLATES[0],
+        'OPTIONS': {**settings.TEMPLATES[0]['OPTIONS'], 'debug': True},
+    }]
+    news = News(pk=1, title='Заголовок', text='Текст')
+    now = timezone.now()
+    comments = [
+        Comment(
+            pk=index, news=news, author=author, created=now,
+            text=f'Комментарий {index}\nвторая строка'
+        )
+        for index in range(count)
+    ]
+    results = {}
+    for profile, templates in (
+        ('по умолчанию', development), ('продакшен', TEMPLATES)
+    ):
+        with override_settings(TEMPLATES=templates):
+            warm_up_templates()
+            results[profile] = {
+                'аноним': measure(AnonymousUser(), news, comments),
+                'автор': measure(author, news, comments),
+            }
+    print(f'\n{count} комментариев, с: {results}')
+    if count != COMPARED_COUNT:
+        return
+    for user in ('аноним', 'автор'):
+        assert (
+            results['продакшен'][user] < results['по умолчанию'][user]
+        )
@@ -0,0 +1,73 @@
+"""Пропускная способность и задержка всех адресов news.urls."""
+import json
+from http import HTTPStatus
+
+import pytest
+from django.urls import reverse
+
+from news.urls import app_name, urlpatterns
+from .core import (
+    NEWS_BENCH_SIZE, check_baselines, create_dataset, measure, report
+)
+
+pytestmark = pytest.mark.benchmark
+
+
+def get_requests(client, author_client, admin_client, news, comment):
+    """Запрос к каждому адресу: клиент, метод, адрес и параметры."""
+    import_line = json.dumps(
+        {'news': news.pk, 'author': comment.author_id, 'text': 'Загружен'}
+    )
+    return {
+        'home': (client.get, reverse('news:home'), {}),
+        'trending': (client.get, reverse('news:trending'), {}),
+        'detail': (
+            client.get, reverse('news:detail', args=(news.pk,)), {}
+        ),
+        'comments': (
+            client.get, reverse('news:comments', args=(news.pk,)), {}
+        ),
+        'edit': (
+            author_client.get, reverse('news:edit', args=(comment.pk,)), {}
+        ),
+        'delete': (
+            author_client.get, reverse('news:delete', args=(comment.pk,)), {}
+        ),
+        'search': (
+            client.get, reverse('news:search'), {'data': {'q': 'новость'}}
+        ),
+        'api_news_list': (client.get, reverse('news:api_news_list'), {}),
+        'api_news_detail': (
+            client.get, reverse('news:api_news_detail', args=(news.pk,)), {}
+        ),
+        'api_comments': (
+            client.get, reverse('news:api_comments', args=(news.pk,)), {}
+        ),
+        'comments_import': (
+            admin_client.post, reverse('news:comments_import'),
+            {'data': import_line, 'content_type': 'application/x-ndjson'}
+        ),
+    }
+
+
+def test_urls_throughput(
+        client, author_client, admin_client, news, author, comment
+):
+    """Каждый адрес на большом наборе не хуже базовой линии."""
+    create_dataset(news, author)
+    requests = get_requests(client, author_client, admin_client, news, comment)
+    assert set(requests) == {pattern.name for pattern in urlpatterns}, (
+        f'У каждого адреса {app_name}.urls должен быть замер'
+    )
+
+    results = {}
+    for name, (method, url, kwargs) in requests.items():
+        def send():
+            response = method(url, **kwargs)
+            assert response.status_code == HTTPStatus.OK, name
+            if response.streaming:
+                b''.join(response.streaming_content)
+        results[f'{app_name}:{name}'] = measure(send)
+    report(NEWS_BENCH_SIZE, results)
+    regressions = check_baselines(NEWS_BENCH_SIZE, results)
+    assert not regressions, '\n'.join(regressions)
@@ -1,16 +1,121 @@
 """Модуль с фикстурами для тестов."""
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
 import pytest
 from datetime import datetime, timedelta
+from importlib import import_module, reload
+from pathlib import Path
 
+import django
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
 from django.conf import settings
+from django.core.management import call_command
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
 from django.test import Client
-from django.urls import reverse
+from django.test.utils import override_settings
+from django.urls import clear_url_caches, reverse
 from django.utils import timezone
 
+from news.cache import get_cache
 from news.models import Comment, News
 
 
 COMMENT_COUNT = 10
+TEMPLATE_ALIAS = 'test_template'
+
+# Продакшен-настройки без ключа не загружаются, а тесты их импортируют.
+os.environ.setdefault('DJANGO_SECRET_KEY', 'test-secret-key')
+
+
+def get_template_path():
+    """
+    Файл шаблона тестовой базы.
+
+    Имя зависит от миграций проекта и версий Django и SQLite, поэтому
+    новая миграция сама приводит к новому шаблону.
+    """
+    digest = hashlib.sha256(
+        f'{django.get_version()} {sqlite3.sqlite_version}'.encode()
+    )
+    for path in sorted(Path(settings.BASE_DIR).glob('*/migrations/*.py')):
+        digest.update(path.read_bytes())
+    return Path(tempfile.gettempdir()) / (
+        f'yanews-test-{digest.hexdigest()[:16]}.sqlite3'
+    )
+
+
+def build_template(path):
+    """Применяет миграции к отдельному файлу и атомарно кладёт его в path."""
+    building = path.with_suffix(f'.{os.getpid()}.tmp')
+    connections.databases[TEMPLATE_ALIAS] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': building,
+    }
+    try:
+        call_command('migrate', database=TEMPLATE_ALIAS, verbosity=0)
+    finally:
+        connections[TEMPLATE_ALIAS].close()
+        del connections[TEMPLATE_ALIAS]
+        del connections.databases[TEMPLATE_ALIAS]
+    os.replace(building, path)
+
+
+def create_database(alias, path):
+    """Подключает под alias новую базу в файле path, копию шаблона."""
+    shutil.copyfile(get_template_path(), path)
+    connections.databases[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+    }
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(request, django_test_environment, django_db_blocker):
+    """
+    Тестовая база в памяти, скопированная из шаблона.
+
+    Миграции применяются один раз к файлу шаблона, который переживает
+    запуски и общий у процессов pytest-xdist, а каждый процесс только
+    копирует его в свою базу в памяти через backup SQLite.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    template = get_template_path()
+    with django_db_blocker.unblock():
+        if not template.exists():
+            build_template(template)
+        old_name = connection.settings_dict['NAME']
+        old_settings_name = settings.DATABASES[DEFAULT_DB_ALIAS]['NAME']
+        test_name = connection.creation._get_test_db_name()
+        connection.close()
+        settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'] = test_name
+        connection.settings_dict['NAME'] = test_name
+        connection.ensure_connection()
+        source = sqlite3.connect(template)
+        try:
+            source.backup(connection.connection)
+        finally:
+            source.close()
+    yield
+    with django_db_blocker.unblock():
+        connection.close()
+        connection.creation._destroy_test_db(test_name, verbosity=0)
+        # Имя базы меняли вручную в двух местах - в обоих и возвращаем.
+        settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'] = old_settings_name
+        connection.settings_dict['NAME'] = old_name
+
+
+@pytest.fixture(scope='session', autouse=True)
+def fast_password_hasher():
+    """Быстрый хэш паролей: admin_client создаёт пользователя с паролем."""
+    with override_settings(
+        PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']
+    ):
+        yield
 
 
 @pytest.fixture
@@ -61,15 +166,21 @@ def news_list():
 
 @pytest.fixture
 def comment_list(news, author):
-    """Создание списка комментариев."""
-    for i in range(COMMENT_COUNT):
-        comment = Comment.objects.create(
-            author=author,
-            news=news,
-            text=f'Текст комментария {i}',
-        )
-        comment.created = timezone.now() + timedelta(days=i)
-        comment.save()
+    """
+    Создание списка комментариев.
+
+    auto_now_add перезаписывает created при вставке, поэтому даты
+    проставляются вторым запросом.
+    """
+    Comment.objects.bulk_create(
+        Comment(author=author, news=news, text=f'Текст комментария {i}')
+        for i in range(COMMENT_COUNT)
+    )
+    now = timezone.now()
+    comments = list(Comment.objects.filter(news=news).order_by('pk'))
+    for i, comment in enumerate(comments):
+        comment.created = now + timedelta(days=i)
+    Comment.objects.bulk_update(comments, ['created'])
 
 
 @pytest.fixture
@@ -96,12 +207,30 @@ def news_home_url(news):
     return reverse('news:home')
 
 
+@pytest.fixture
+def news_trending_url():
+    """Возврат ссылки 'news:trending'."""
+    return reverse('news:trending')
+
+
 @pytest.fixture
 def news_detail_url(news):
     """Возврат ссылки 'news:detail'."""
     return reverse('news:detail', args=(news.pk,))
 
 
+@pytest.fixture
+def news_search_url():
+    """Возврат ссылки 'news:search'."""
+    return reverse('news:search')
+
+
+@pytest.fixture
+def news_comments_url(news):
+    """Возврат ссылки 'news:comments'."""
+    return reverse('news:comments', args=(news.pk,))
+
+
 @pytest.fixture
 def news_edit_url(comment):
     """Возврат ссылки 'news:edit'."""
@@ -114,6 +243,36 @@ def news_delete_url(comment):
     return reverse('news:delete', args=(comment.pk,))
 
 
+@pytest.fixture
+def api_news_list_url():
+    """Возврат ссылки 'news:api_news_list'."""
+    return reverse('news:api_news_list')
+
+
+@pytest.fixture
+def api_news_detail_url(news):
+    """Возврат ссылки 'news:api_news_detail'."""
+    return reverse('news:api_news_detail', args=(news.pk,))
+
+
+@pytest.fixture
+def api_comments_url(news):
+    """Возврат ссылки 'news:api_comments'."""
+    return reverse('news:api_comments', args=(news.pk,))
+
+
+@pytest.fixture
+def comments_import_url():
+    """Возврат ссылки 'news:comments_import'."""
+    return reverse('news:comments_import')
+
+
+@pytest.fixture
+def metrics_url():
+    """Возврат ссылки 'metrics'."""
+    return reverse('metrics')
+
+
 @pytest.fixture
 def news_detail_redirect_url(users_login_url, news_detail_url):
     """Возврат редиректа для логина и перехода к 'news:detail'."""
@@ -138,8 +297,80 @@ def delete_redirect_url(users_login_url, news_delete_url):
     return f'{users_login_url}?next={news_delete_url}'
 
 
+@pytest.fixture
+def replica(settings, tmp_path):
+    """
+    Реплика в отдельном файле SQLite.
+
+    Реплика пуста и изображает сильно отставшую копию основной базы.
+    """
+    create_database('replica', tmp_path / 'replica.sqlite3')
+    settings.DATABASE_REPLICAS = ['replica']
+    yield 'replica'
+    connections['replica'].close()
+    del connections['replica']
+    del connections.databases['replica']
+
+
+def reload_urlconf():
+    """Перечитывает маршруты после смены NEWS_ASYNC_VIEWS."""
+    reload(import_module('news.urls'))
+    reload(import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+@pytest.fixture
+def async_views(settings):
+    """Главная и страница новости обслуживаются асинхронными функциями."""
+    settings.NEWS_ASYNC_VIEWS = True
+    reload_urlconf()
+    yield
+    settings.NEWS_ASYNC_VIEWS = False
+    reload_urlconf()
+
+
 @pytest.fixture(autouse=True)
 def enable_db_access_for_all_tests(
     db,  # noqa
 ):
     """Автоматический доступ к базе данных."""
+
+
+@pytest.fixture(autouse=True)
+def clear_news_cache():
+    """Очистка кэша новостей перед каждым тестом."""
+    get_cache().clear()
+
+
+@pytest.fixture
+def asgi_get():
+    """
+    GET через ASGI-приложение проекта: статус и тело ответа.
+
+    Как и тестовый клиент, не даёт сигналам запроса закрыть соединение
+    с базой, в транзакции которой идёт тест.
+    """
+    from yanews.asgi import application
+
+    async def get(path):
+        communicator = ApplicationCommunicator(application, {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'testserver')],
+        })
+        await communicator.send_input({'type': 'http.request'})
+        start = await communicator.receive_output()
+        body = []
+        while True:
+            message = await communicator.receive_output()
+            body.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return start['status'], b''.join(body)
+
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    yield async_to_sync(get)
+    request_started.connect(close_old_connections)
+    request_finished.connect(close_old_connections)
@@ -1,7 +1,21 @@
 """Модуль с тестами проверки контента приложения."""
+import json
+from asyncio import iscoroutinefunction
+from http import HTTPStatus
+from unittest.mock import patch
+
+import pytest
+from asgiref.sync import async_to_sync
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
 
+from news import trending
 from news.forms import CommentForm
+from news.models import Comment, News
+from news.pagination import encode_cursor, get_comment_page
+from .conftest import COMMENT_COUNT
 
 
 def test_news_page(client, news_home_url, news_list):
@@ -21,6 +35,61 @@ def test_news_order(client, news_home_url, news_list):
     assert news_dates == sorted(news_dates, reverse=True)
 
 
+@pytest.mark.parametrize('denormalized', (True, False))
+def test_news_comment_count(
+        client, settings, news_home_url, comment_list, denormalized
+):
+    """Проверка количества комментариев на главной странице."""
+    settings.NEWS_COMMENT_COUNT_DENORMALIZED = denormalized
+    news = client.get(news_home_url).context['object_list'][0]
+    assert news.comment_total == COMMENT_COUNT
+
+
+def test_trending_order(client, news_trending_url, news_list, author):
+    """Обсуждаемые новости идут по числу свежих комментариев."""
+    news = list(News.objects.order_by('pk')[:3])
+    for item, count in zip(news, (1, 3, 2)):
+        Comment.objects.bulk_create(
+            Comment(author=author, news=item, text='Текст')
+            for _ in range(count)
+        )
+    object_list = client.get(news_trending_url).context['object_list']
+    assert list(object_list) == [news[1], news[2], news[0]]
+
+
+def test_trending_reads_score_index():
+    """Рейтинг читается по индексу score, без сортировки комментариев."""
+    plan = News.objects.filter(
+        trend__score__gte=trending.get_threshold()
+    ).order_by('-trend__score')[:settings.NEWS_COUNT_ON_HOME_PAGE].explain()
+    assert 'USING INDEX news_newstrend_score' in plan
+    assert 'news_comment' not in plan
+
+
+def test_home_page_is_cached_for_anonymous(
+        client, news_home_url, news_list, django_assert_num_queries
+):
+    """Повторный запрос главной страницы не обращается к базе."""
+    content = client.get(news_home_url).content
+    with django_assert_num_queries(0):
+        assert client.get(news_home_url).content == content
+
+
+def test_home_page_cache_invalidation(
+        client,
+        author_client,
+        news_home_url,
+        news_detail_url,
+        django_capture_on_commit_callbacks
+):
+    """Новый комментарий сбрасывает кэш главной страницы."""
+    client.get(news_home_url)
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.post(news_detail_url, data={'text': 'Текст'})
+    news = client.get(news_home_url).context['object_list'][0]
+    assert news.comment_total == 1
+
+
 def test_comments_order(client, news_detail_url, comment_list):
     """Проверка сортировки комментариев по времени."""
     comment_dates = [
@@ -30,6 +99,208 @@ def test_comments_order(client, news_detail_url, comment_list):
     assert comment_dates == sorted(comment_dates)
 
 
+def test_comments_are_paginated(
+        client, settings, news_detail_url, news_comments_url, comment_list
+):
+    """Комментарии выводятся страницами, курсор ведёт к следующей."""
+    settings.COMMENT_COUNT_ON_DETAIL_PAGE = 3
+    context = client.get(news_detail_url).context
+    comments = list(context['comments'])
+    assert len(comments) == settings.COMMENT_COUNT_ON_DETAIL_PAGE
+    while context['next_cursor']:
+        context = client.get(
+            news_comments_url, {'cursor': context['next_cursor']}
+        ).context
+        comments += context['comments']
+    assert len(comments) == COMMENT_COUNT
+    assert comments == sorted(comments, key=lambda comment: comment.created)
+
+
+def test_comment_page_without_script(
+        client, settings, news, news_comments_url, comment_list
+):
+    """Переход по "Показать ещё" без скрипта открывает целую страницу."""
+    settings.COMMENT_COUNT_ON_DETAIL_PAGE = 3
+    response = client.get(news_comments_url)
+    assert 'base.html' in [template.name for template in response.templates]
+    assert news.title in response.content.decode()
+    assert 'X-Requested-With' in response['Vary']
+    fragment = client.get(
+        news_comments_url, HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+    )
+    assert [template.name for template in fragment.templates] == [
+        'news/comments.html'
+    ]
+    assert 'Показать ещё' in fragment.content.decode()
+
+
+def test_comment_page_seeks_to_cursor(news, comment):
+    """Страница по курсору начинается переходом по индексу к курсору."""
+    with CaptureQueriesContext(connection) as context:
+        get_comment_page(news.pk, encode_cursor(comment))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'EXPLAIN QUERY PLAN {context.captured_queries[-1]["sql"]}'
+        )
+        plan = ' '.join(row[-1] for row in cursor.fetchall())
+    assert 'comment_news_created_idx (news_id=? AND created>?)' in plan
+
+
+def test_bad_cursor(client, news_comments_url):
+    """Испорченный курсор не ломает страницу комментариев."""
+    response = client.get(news_comments_url, {'cursor': 'испорчен'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_search_highlights_matches(client, news_search_url, comment):
+    """Поиск находит новость и комментарий и подсвечивает совпадения."""
+    context = client.get(news_search_url, {'q': 'заголовок'}).context
+    assert [hit.pk for hit in context['news_hits']] == [comment.news_id]
+    assert '<mark>Заголовок</mark>' in context['news_hits'][0].title
+    context = client.get(news_search_url, {'q': 'комментария'}).context
+    assert [hit.pk for hit in context['comment_hits']] == [comment.pk]
+    assert '<mark>комментария</mark>' in context['comment_hits'][0].snippet
+
+
+def test_search_skips_unpublished_comments(
+        client, news_search_url, comment
+):
+    """Неопубликованные комментарии пропадают из поиска."""
+    comment.status = comment.Status.PENDING
+    comment.save()
+    context = client.get(news_search_url, {'q': 'комментария'}).context
+    assert context['comment_hits'] == []
+
+
+def test_search_without_index(client, news_search_url, comment):
+    """Без FTS5 поиск работает подстрокой."""
+    with patch('news.search.get_features', return_value=(False, False)):
+        context = client.get(news_search_url, {'q': 'комментар'}).context
+    assert [hit.pk for hit in context['comment_hits']] == [comment.pk]
+
+
+def async_get(client, url, **headers):
+    """GET асинхронного клиента из синхронного теста."""
+    async def get():
+        return await client.get(url, **headers)
+    return async_to_sync(get)()
+
+
+def test_async_home_page(
+        async_views, async_client, news_home_url, news_list,
+        django_assert_num_queries
+):
+    """Асинхронная главная страница отдаёт анонимам кэш без запросов."""
+    assert iscoroutinefunction(resolve(news_home_url).func)
+    response = async_get(async_client, news_home_url)
+    assert len(response.context['object_list']) == (
+        settings.NEWS_COUNT_ON_HOME_PAGE
+    )
+    with django_assert_num_queries(0):
+        cached = async_get(async_client, news_home_url)
+    assert cached.content == response.content
+
+
+def test_async_news_detail(
+        async_views, async_client, author, news_detail_url, comment_list
+):
+    """Асинхронная страница новости показывает комментарии и форму."""
+    async_client.force_login(author)
+    response = async_get(async_client, news_detail_url)
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.context['comments']) == COMMENT_COUNT
+    assert isinstance(response.context['form'], CommentForm)
+    response = async_get(
+        async_client, news_detail_url, **{'If-None-Match': response['ETag']}
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_detail_not_modified(
+        client, news_detail_url, comment_list, django_assert_num_queries
+):
+    """Клиенту с актуальной страницей новости - 304 без комментариев."""
+    etag = client.get(news_detail_url)['ETag']
+    with django_assert_num_queries(1):
+        response = client.get(news_detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response['ETag'] == etag
+
+
+def test_detail_etag_follows_comments(
+        client, author_client, news_detail_url, news_delete_url
+):
+    """Новый или удалённый комментарий меняет ETag страницы новости."""
+    etags = [client.get(news_detail_url)['ETag']]
+    author_client.post(news_detail_url, data={'text': 'Текст'})
+    etags.append(client.get(news_detail_url)['ETag'])
+    author_client.post(news_delete_url)
+    response = client.get(news_detail_url, HTTP_IF_NONE_MATCH=etags[-1])
+    assert response.status_code == HTTPStatus.OK
+    assert len(set(etags + [response['ETag']])) == 3
+
+
+def test_detail_etag_follows_login(client, author, news, news_detail_url):
+    """После повторного входа страница с формой отдаётся заново."""
+    author.set_password('password')
+    author.save()
+    credentials = {'username': author.username, 'password': 'password'}
+    client.post(reverse('users:login'), credentials)
+    etag = client.get(news_detail_url)['ETag']
+    client.post(reverse('users:logout'))
+    client.post(reverse('users:login'), credentials)
+    response = client.get(news_detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+
+
+def test_api_news_list(client, api_news_list_url, news_list):
+    """API отдаёт последние новости в порядке главной страницы."""
+    news = client.get(api_news_list_url).json()
+    assert len(news) == settings.NEWS_COUNT_ON_HOME_PAGE
+    assert news == sorted(news, key=lambda item: item['date'], reverse=True)
+
+
+def test_api_news_detail(client, api_news_detail_url, api_comments_url, news):
+    """API новости ссылается на выгрузку комментариев."""
+    data = client.get(api_news_detail_url).json()
+    assert data['title'] == news.title
+    assert data['comments_url'] == api_comments_url
+
+
+@pytest.mark.parametrize('chunk_size', (3, 1000))
+def test_api_comments_stream(
+        settings, client, api_comments_url, comment_list, chunk_size,
+        django_assert_num_queries
+):
+    """Опубликованные комментарии выгружаются потоком по порядку."""
+    settings.NEWS_API_CHUNK_SIZE = chunk_size
+    pending, *published = Comment.objects.order_by('created')
+    pending.status = Comment.Status.PENDING
+    pending.save()
+    # Проверка новости и запрос на каждый кусок, последний - пустой
+    # или неполный.
+    with django_assert_num_queries(2 + len(published) // chunk_size):
+        response = client.get(api_comments_url)
+        comments = json.loads(b''.join(response.streaming_content))
+    assert [comment['id'] for comment in comments] == [
+        comment.pk for comment in published
+    ]
+    assert comments[0]['author__username'] == pending.author.username
+
+
+def test_api_comments_stream_under_asgi(
+        settings, asgi_get, api_comments_url, comment_list
+):
+    """Выгрузка комментариев работает и под ASGI-приложением."""
+    settings.NEWS_API_CHUNK_SIZE = 3
+    status, body = asgi_get(api_comments_url)
+    assert status == HTTPStatus.OK
+    assert [comment['id'] for comment in json.loads(body)] == [
+        comment.pk for comment in Comment.objects.order_by('created', 'pk')
+    ]
+
+
 def test_anonymous_client_has_no_form(client, news_detail_url):
     """Проверка дуступности формы не авторизованному пользователю."""
     assert 'form' not in client.get(news_detail_url).context
@@ -1,12 +1,43 @@
 """Модуль с тестами проверки логики приложения."""
+from concurrent.futures import ThreadPoolExecutor
+from importlib import reload
 from http import HTTPStatus
+from io import StringIO
+from queue import Queue
 from random import choice
+from threading import Lock
+from time import sleep
+
+import json
+import os
+import subprocess
+import sys
 
 import pytest
-from pytest_django.asserts import assertFormError
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.db import connections
+from django.db.models import QuerySet
+from django.template import engines
+from django.urls import reverse
+from pytest_django.asserts import assertFormError, assertRedirects
 
-from news.models import Comment
-from news.forms import BAD_WORDS, WARNING
+from news import buffer, cache, search, trending
+from news.models import (
+    Comment, ModerationTask, News, NewsCommenter, NewsDailyStats, NewsStats,
+    NewsTrend
+)
+from news.moderation import process_pending
+from news.forms import BAD_WORDS, WARNING, CommentForm
+from news.profanity import RegexFilter, SubstringFilter
+from yanews.auth import CachedModelBackend
+from yanews.metrics import registry
+from yanews.routers import PIN_COOKIE
+from yanews import settings_production
+from yanews.settings_production import SQLITE_PROFILE, TEMPLATES
+from yanews.warmup import warm_up_templates
 
 
 FORM_DATA = {'text': 'Текст комментария'}
@@ -39,6 +70,193 @@ def test_authorised_client_can_create_comment(
     assert new_comment.news == news
 
 
+def test_comment_count_follows_comments(
+        author_client,
+        news,
+        news_detail_url,
+        news_delete_url
+):
+    """Счётчик комментариев меняется при создании и удалении."""
+    assert News.objects.get(pk=news.pk).comment_count == 1
+    author_client.post(news_detail_url, data=FORM_DATA)
+    assert News.objects.get(pk=news.pk).comment_count == 2
+    author_client.post(news_delete_url)
+    assert News.objects.get(pk=news.pk).comment_count == 1
+
+
+def test_bulk_create_counts_only_its_comments(monkeypatch, news, author):
+    """Комментарий, вставленный рядом с пачкой, не считается дважды."""
+    original = QuerySet.bulk_create
+
+    def bulk_create_after_other(queryset, objs, *args, **kwargs):
+        if queryset.model is Comment:
+            Comment.objects.create(news=news, author=author, text='Соседний')
+        return original(queryset, objs, *args, **kwargs)
+
+    monkeypatch.setattr(QuerySet, 'bulk_create', bulk_create_after_other)
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Текст {index}')
+        for index in range(3)
+    )
+    news.refresh_from_db()
+    assert news.comment_count == Comment.objects.count() == 4
+    assert NewsStats.objects.get(news=news).commenter_count == 1
+    assert NewsDailyStats.objects.get(news=news).comment_count == 4
+
+
+def test_bulk_create_sets_pks_of_its_rows(news, author, comment_list):
+    """Ключи пачки берутся из её INSERT, даже если они идут не подряд."""
+    freed = Comment.objects.first()
+    freed.delete()
+    comments = Comment.objects.bulk_create([
+        Comment(pk=freed.pk, news=news, author=author, text='Пачка старая'),
+        Comment(news=news, author=author, text='Пачка 1'),
+        Comment(news=news, author=author, text='Пачка 2'),
+    ])
+    assert [
+        Comment.objects.get(pk=comment.pk).text for comment in comments
+    ] == [comment.text for comment in comments]
+    _, comment_hits = search.search('Пачка')
+    assert {hit.pk for hit in comment_hits} == {
+        comment.pk for comment in comments
+    }
+
+
+def test_bulk_create_skips_ignored_conflicts(news, comment, author):
+    """Строки, пропущенные ignore_conflicts, не попадают в счётчики."""
+    Comment.objects.bulk_create(
+        [Comment(pk=comment.pk, news=news, author=author, text='Дубль')],
+        ignore_conflicts=True,
+    )
+    news.refresh_from_db()
+    assert news.comment_count == Comment.objects.count() == 1
+
+
+def test_rebuild_comment_counts(news, comment_list):
+    """Команда пересчитывает счётчики комментариев."""
+    News.objects.update(comment_count=0)
+    version = cache.get_version()
+    call_command('rebuild_comment_counts', stdout=StringIO())
+    news.refresh_from_db()
+    assert news.comment_count == Comment.objects.count()
+    assert cache.get_version() != version
+
+
+def test_rebuild_news_index(news_list):
+    """Команда индексирует новости, созданные в обход сигналов."""
+    assert search.search('Заголовок')[0] == []
+    call_command('rebuild_news_index', stdout=StringIO())
+    news_hits, _ = search.search('Заголовок')
+    assert len(news_hits) == News.objects.count()
+
+
+def test_rebuild_trending(settings, news_list, news, comment):
+    """Команда пересчитывает рейтинг и убирает новости без обсуждений."""
+    score = NewsTrend.objects.get().score
+    stale = News.objects.exclude(pk=news.pk).first()
+    NewsTrend.objects.create(news=stale, score=trending.get_threshold())
+    call_command('rebuild_trending', stdout=StringIO())
+    trend = NewsTrend.objects.get()
+    assert trend.news_id == news.pk
+    # Комментарий попал в середину своего часа - вес отличается не больше.
+    half_hour = 0.5 / settings.NEWS_TRENDING_HALF_LIFE_HOURS
+    assert abs(trend.score - score) <= half_hour
+
+
+def test_news_stats_follow_comments(
+        author_client, admin_client, news, comment, news_detail_url
+):
+    """Статистика новости меняется при создании и удалении комментариев."""
+    admin_client.post(news_detail_url, data=FORM_DATA)
+    author_client.post(news_detail_url, data=FORM_DATA)
+    last = Comment.objects.latest('created')
+    stats = NewsStats.objects.get(news=news)
+    assert stats.commenter_count == 2
+    assert stats.last_comment == last.created
+    assert NewsDailyStats.objects.get(news=news).comment_count == 3
+    author_client.post(reverse('news:delete', args=(last.pk,)))
+    admin_client.post(reverse('news:delete', args=(
+        Comment.objects.exclude(author=comment.author).get().pk,
+    )))
+    stats.refresh_from_db()
+    assert stats.commenter_count == 1
+    assert stats.last_comment == comment.created
+    assert NewsDailyStats.objects.get(news=news).comment_count == 1
+    assert NewsCommenter.objects.get().comment_count == 1
+
+
+def test_bulk_create_adds_to_existing_stats(admin_user, news, comment):
+    """Пачка прибавляется к готовым строкам статистики и рейтинга."""
+    score = NewsTrend.objects.get(news=news).score
+    Comment.objects.bulk_create([
+        Comment(news=news, author=comment.author, text='Пачка 1'),
+        Comment(news=news, author=comment.author, text='Пачка 2'),
+        Comment(news=news, author=admin_user, text='Пачка 3'),
+    ])
+    news.refresh_from_db()
+    assert news.comment_count == 4
+    stats = NewsStats.objects.get(news=news)
+    assert stats.commenter_count == 2
+    assert stats.last_comment == Comment.objects.latest('created').created
+    assert NewsDailyStats.objects.get(news=news).comment_count == 4
+    assert NewsCommenter.objects.get(author=comment.author).comment_count == 3
+    assert NewsTrend.objects.get(news=news).score > score
+
+
+def test_news_delete_skips_per_comment_stats(news, comment_list):
+    """Удаление новости не пересчитывает статистику по комментарию."""
+    with CaptureQueriesContext(connections['default']) as context:
+        news.delete()
+    stats_queries = [
+        query['sql'] for query in context.captured_queries
+        if 'stats' in query['sql'] or 'newscommenter' in query['sql']
+        or 'UPDATE "news_news"' in query['sql']
+    ]
+    # По одному каскадному DELETE на каждую таблицу статистики.
+    assert len(stats_queries) == 3
+    assert not NewsStats.objects.exists()
+    assert not NewsDailyStats.objects.exists()
+    assert not NewsCommenter.objects.exists()
+
+
+def test_comment_delete_after_news_delete_updates_stats(
+        author_client, news, comment, news_list, news_delete_url
+):
+    """Удаление другой новости не отключает статистику комментариев."""
+    News.objects.exclude(pk=news.pk).first().delete()
+    author_client.post(news_delete_url)
+    assert NewsStats.objects.get(news=news).commenter_count == 0
+    assert NewsDailyStats.objects.get(news=news).comment_count == 0
+
+
+def test_rebuild_news_stats(news, author, comment_list):
+    """Команда пересчитывает статистику, читая комментарии кусками."""
+    call_command('rebuild_news_stats', '--chunk-size', '3', stdout=StringIO())
+    stats = NewsStats.objects.get(news=news)
+    assert stats.commenter_count == 1
+    assert stats.last_comment == Comment.objects.latest('created').created
+    assert NewsDailyStats.objects.filter(
+        news=news, comment_count=1
+    ).count() == Comment.objects.count()
+    assert NewsCommenter.objects.get(author=author).comment_count == (
+        Comment.objects.count()
+    )
+
+
+def test_news_admin_reads_stats(admin_client, news, comment_list):
+    """Список новостей в админке не агрегирует комментарии."""
+    with CaptureQueriesContext(connections['default']) as context:
+        response = admin_client.get(reverse('admin:news_news_changelist'))
+    assert response.status_code == HTTPStatus.OK
+    assert not any(
+        'news_comment' in query['sql'] for query in context.captured_queries
+    )
+    assert response.context['cl'].result_list[0].commenter_count == 1
+    assert admin_client.get(
+        reverse('admin:news_news_change', args=(news.pk,))
+    ).status_code == HTTPStatus.OK
+
+
 @pytest.mark.parametrize('bad_word', BAD_WORDS)
 def test_client_cant_use_bad_words(author_client, news_detail_url, bad_word):
     """Проверка запрещенных слов."""
@@ -50,6 +268,56 @@ def test_client_cant_use_bad_words(author_client, news_detail_url, bad_word):
     assert Comment.objects.count() == 0
 
 
+@pytest.mark.parametrize(
+    'data, status', (
+        (FORM_DATA, Comment.Status.PUBLISHED),
+        (BAD_WORDS_DATA, Comment.Status.REJECTED),
+    )
+)
+def test_async_moderation(
+        author_client,
+        settings,
+        news,
+        news_detail_url,
+        news_comment_redirect,
+        django_capture_on_commit_callbacks,
+        data,
+        status
+):
+    """Отложенная модерация публикует или отклоняет комментарий."""
+    settings.NEWS_ASYNC_MODERATION = True
+    with django_capture_on_commit_callbacks():
+        response = author_client.post(news_detail_url, data=data)
+    assertRedirects(response, news_comment_redirect)
+    comment = Comment.objects.get()
+    assert comment.status == Comment.Status.PENDING
+    assert not author_client.get(news_detail_url).context['comments']
+    assert process_pending() == 1
+    comment.refresh_from_db()
+    news.refresh_from_db()
+    assert comment.status == status
+    assert not ModerationTask.objects.exists()
+    published = status == Comment.Status.PUBLISHED
+    assert news.comment_count == int(published)
+    assert (
+        comment in author_client.get(news_detail_url).context['comments']
+    ) == published
+
+
+@pytest.mark.parametrize('engine', (SubstringFilter, RegexFilter))
+def test_bad_words_file_is_reloaded(tmp_path, engine):
+    """Слова из файла подхватываются без перезапуска."""
+    path = tmp_path / 'bad_words.txt'
+    path.write_text('# Список слов\n', encoding='utf-8')
+    bad_words_filter = engine(BAD_WORDS, path=path)
+    assert bad_words_filter.search(BAD_WORDS_DATA['text'])
+    assert not bad_words_filter.search('Ну ты и ПЛОХИШ!')
+    path.write_text('# Список слов\nплохиш\n', encoding='utf-8')
+    os.utime(path, ns=(1, 1))
+    assert bad_words_filter.search('Ну ты и ПЛОХИШ!')
+    assert bad_words_filter.search(BAD_WORDS_DATA['text'])
+
+
 def test_author_can_edit_comment(
         author_client,
         comment,
@@ -63,6 +331,30 @@ def test_author_can_edit_comment(
     assert comment.author == updated_comment.author
 
 
+def test_edit_keeps_status_set_by_moderation(
+        monkeypatch, author_client, comment, news_edit_url
+):
+    """Правка во время модерации не возвращает статус "на модерации"."""
+    Comment.objects.filter(pk=comment.pk).update(
+        status=Comment.Status.PENDING
+    )
+    search.remove_comment(comment.pk, 'default')
+    ModerationTask.objects.create(comment=comment)
+    clean_text = CommentForm.clean_text
+
+    def moderate_during_edit(form):
+        # Комментарий уже загружен правкой, задачу обрабатывают сейчас.
+        process_pending()
+        return clean_text(form)
+
+    monkeypatch.setattr(CommentForm, 'clean_text', moderate_during_edit)
+    author_client.post(news_edit_url, data=FORM_DATA)
+    comment.refresh_from_db()
+    assert comment.status == Comment.Status.PUBLISHED
+    assert comment.text == FORM_DATA['text']
+    assert search.search('комментария')[1][0].pk == comment.pk
+
+
 def test_author_can_delete_comment(
         author_client,
         comment,
@@ -102,3 +394,256 @@ def test_author_cant_delete_comment_of_another_user(
     response = admin_client.post(news_delete_url)
     assert response.status_code == HTTPStatus.NOT_FOUND
     assert comments == set(Comment.objects.all())
+
+
+def test_only_one_worker_builds_cached_page():
+    """При промахе кэша страницу строит только один поток."""
+    builds = []
+    lock = Lock()
+
+    def build():
+        with lock:
+            builds.append(1)
+        sleep(0.2)
+        return 'страница'
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        pages = list(executor.map(
+            lambda _: cache.get_or_build('stampede', build), range(8)
+        ))
+    assert pages == ['страница'] * 8
+    assert len(builds) == 1
+
+
+def ingest_lines(news, author):
+    """Строки JSON Lines: две корректные и три с ошибками."""
+    return [
+        json.dumps({'news': news.pk, 'author': author.pk, 'text': 'Первый'}),
+        json.dumps({'news': news.pk, 'author': author.pk, 'text': 'Второй'}),
+        json.dumps({'news': news.pk, 'author': author.pk,
+                    'text': BAD_WORDS_DATA['text']}),
+        json.dumps({'news': news.pk + 1, 'author': author.pk, 'text': 'Т'}),
+        '{не json',
+    ]
+
+
+def test_staff_can_ingest_comments(
+        admin_client, news, author, comments_import_url
+):
+    """Массовая загрузка сохраняет корректные строки и сообщает об ошибках."""
+    response = admin_client.post(
+        comments_import_url,
+        '\n'.join(ingest_lines(news, author)),
+        content_type='application/x-ndjson',
+    )
+    report = response.json()
+    assert report['created'] == 2
+    assert [error['line'] for error in report['errors']] == [3, 4, 5]
+    assert report['errors'][0]['error'] == WARNING
+    assert Comment.objects.count() == 2
+    news.refresh_from_db()
+    assert news.comment_count == 2
+
+
+def test_user_cant_ingest_comments(author_client, news, comments_import_url):
+    """Загружать комментарии могут только сотрудники."""
+    response = author_client.post(
+        comments_import_url, '', content_type='application/x-ndjson'
+    )
+    assert response.status_code == HTTPStatus.FORBIDDEN
+
+
+def test_ingest_comments_command(tmp_path, news, author):
+    """Команда загружает комментарии из файла пачками."""
+    path = tmp_path / 'comments.jsonl'
+    path.write_text('\n'.join(ingest_lines(news, author)), encoding='utf-8')
+    call_command(
+        'ingest_comments', str(path), batch_size=2,
+        stdout=StringIO(), stderr=StringIO()
+    )
+    assert Comment.objects.count() == 2
+    news.refresh_from_db()
+    assert news.comment_count == 2
+
+
+def test_reads_go_to_replica(client, news_detail_url, replica):
+    """Чтение новостей идёт с реплики, где новости ещё нет."""
+    assert client.get(news_detail_url).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_author_reads_own_writes(
+        client, author_client, news_detail_url, replica
+):
+    """После записи автор читает из основной базы, остальные - с реплики."""
+    response = author_client.post(news_detail_url, data=FORM_DATA)
+    assert PIN_COOKIE in response.cookies
+    assert Comment.objects.using(replica).count() == 0
+    response = author_client.get(news_detail_url)
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.context['comments']) == 1
+    assert client.get(news_detail_url).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_production_sqlite_profile(tmp_path):
+    """Прагмы применяются к соединению, сломанное соединение заменяется."""
+    connections.databases['tuned'] = {
+        **SQLITE_PROFILE, 'NAME': tmp_path / 'tuned.sqlite3'
+    }
+    connection = connections['tuned']
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            assert cursor.fetchone() == ('wal',)
+        broken = connection.connection
+        broken.close()
+        connection.close_if_unusable_or_obsolete()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        assert connection.connection is not broken
+    finally:
+        connection.close()
+        del connections['tuned']
+        del connections.databases['tuned']
+
+
+def test_production_requires_secret_key(monkeypatch):
+    """Без DJANGO_SECRET_KEY продакшен-настройки не загружаются."""
+    monkeypatch.delenv('DJANGO_SECRET_KEY')
+    with pytest.raises(ImproperlyConfigured):
+        reload(settings_production)
+    monkeypatch.undo()
+    reload(settings_production)
+
+
+def test_production_template_profile(settings):
+    """Прогрев кладёт все шаблоны проекта в кэширующий загрузчик."""
+    settings.TEMPLATES = TEMPLATES
+    templates = settings.BASE_DIR / 'templates'
+    assert warm_up_templates() == len(list(templates.rglob('*.html')))
+    loader = engines.all()[0].engine.template_loaders[0]
+    assert 'news/detail.html' in loader.get_template_cache
+    assert 'includes/header.html' in loader.get_template_cache
+
+
+def test_user_cache_forgets_saved_user(
+        settings, author, django_assert_num_queries
+):
+    """Пользователь берётся из кэша, пока его не сохранят."""
+    settings.USER_CACHE_SECONDS = 30
+    backend = CachedModelBackend()
+    backend.get_user(author.pk)
+    with django_assert_num_queries(0):
+        assert backend.get_user(author.pk) == author
+    author.username = 'Новое имя'
+    author.save()
+    assert backend.get_user(author.pk).username == 'Новое имя'
+    author.is_active = False
+    author.save()
+    assert backend.get_user(author.pk) is None
+
+
+def test_user_cache_receivers_connect_on_setup(settings):
+    """Снимок сбрасывается и в процессе, где ещё никто не входил."""
+    # Свежий интерпретатор: модуль бэкенда ещё не импортирован.
+    script = (
+        'import django; django.setup(); '
+        'from django.contrib.auth import get_user_model; '
+        'from django.db.models.signals import post_delete, post_save; '
+        'user = get_user_model(); '
+        'print(all(any(getattr(receiver, "__module__", None) == '
+        '"yanews.auth" for receiver in signal._live_receivers(user)) '
+        'for signal in (post_save, post_delete)))'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', script], cwd=settings.BASE_DIR,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'yanews.settings'},
+        capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == 'True'
+
+
+def test_old_sessions_stay_valid(client, author, news_home_url):
+    """Сессии, созданные с ModelBackend, не сбрасываются."""
+    client.force_login(
+        author, backend='django.contrib.auth.backends.ModelBackend'
+    )
+    assert client.get(news_home_url).context['user'] == author
+
+
+def test_buffered_comments_are_written_in_one_batch(
+        settings, monkeypatch, transactional_db, author, news,
+        news_detail_url, news_comment_redirect
+):
+    """Одновременные комментарии записываются пачкой до ответа."""
+    settings.NEWS_BUFFERED_COMMENTS = True
+    settings.NEWS_BUFFER_WINDOW_MS = 200
+    writers = 8
+    clients = []
+    for _ in range(writers):
+        client = Client()
+        client.force_login(author)
+        clients.append(client)
+    batches = []
+    write_batch = buffer.write_batch
+
+    def spy(batch):
+        batches.append(len(batch))
+        write_batch(batch)
+
+    def post(client):
+        try:
+            return client.post(news_detail_url, data=FORM_DATA)
+        finally:
+            connections.close_all()
+
+    monkeypatch.setattr(buffer, 'write_batch', spy)
+    try:
+        with ThreadPoolExecutor(max_workers=writers) as executor:
+            responses = list(executor.map(post, clients))
+        for response in responses:
+            assertRedirects(response, news_comment_redirect)
+        assert sum(batches) == writers
+        assert len(batches) < writers
+        assert Comment.objects.count() == writers
+        news.refresh_from_db()
+        assert news.comment_count == writers
+    finally:
+        # Очистка базы после теста не трогает поисковый индекс.
+        News.objects.all().delete()
+
+
+def test_timed_out_comment_is_not_written(
+        settings, monkeypatch, author, news
+):
+    """Комментарий, не дождавшийся писателя, отменяется и не пишется."""
+    settings.NEWS_BUFFER_TIMEOUT = 0.01
+    # Писатель не запускается, а уже работающий ждёт на старой очереди.
+    monkeypatch.setattr(buffer, 'start_writer', lambda: None)
+    monkeypatch.setattr(buffer, '_queue', Queue())
+    with pytest.raises(buffer.BufferTimeout):
+        buffer.save(Comment(news=news, author=author, text='Текст'))
+    buffer.write_batch(buffer.collect_batch())
+    assert not Comment.objects.exists()
+
+
+def test_metrics_middleware(
+        settings, tmp_path, client, admin_client, comment, news_detail_url,
+        metrics_url
+):
+    """Метрики запросов собираются по представлениям и сохраняются."""
+    settings.METRICS_ENABLED = True
+    settings.METRICS_FILE = tmp_path / 'metrics.prom'
+    settings.METRICS_DUMP_SECONDS = 0
+    registry.clear()
+    client.get(news_detail_url)
+    client.get(news_detail_url)
+    queries = registry.histograms['view_db_queries']['news:detail']
+    assert queries.count == 2
+    assert queries.sum > 0
+    assert registry.histograms['view_template_seconds']['news:detail'].sum > 0
+    metrics = admin_client.get(metrics_url).content.decode()
+    assert 'view_request_seconds_count{view="news:detail"} 2' in metrics
+    assert '# TYPE view_db_queries histogram' in metrics
+    assert 'view_db_queries_count{view="news:detail"} 2' in (
+        settings.METRICS_FILE.read_text(encoding='utf-8')
+    )
@@ -0,0 +1,76 @@
+"""Модуль с бюджетами запросов к базе данных для страниц приложения."""
+import pytest
+from django.test import Client
+from pytest_lazyfixture import lazy_fixture
+
+
+CLIENT = lazy_fixture('client')
+AUTHOR_CLIENT = lazy_fixture('author_client')
+HOME_URL = lazy_fixture('news_home_url')
+TRENDING_URL = lazy_fixture('news_trending_url')
+DETAIL_URL = lazy_fixture('news_detail_url')
+COMMENTS_URL = lazy_fixture('news_comments_url')
+EDIT_URL = lazy_fixture('news_edit_url')
+DELETE_URL = lazy_fixture('news_delete_url')
+SEARCH_URL = lazy_fixture('news_search_url')
+FORM_DATA = {'text': 'Текст комментария'}
+
+# Сессия и пользователь стоят два запроса на каждый запрос
+# авторизованного клиента. Точки сохранения появляются только в тестах,
+# где каждый тест выполняется внутри транзакции.
+QUERY_BUDGETS = (
+    ('get', HOME_URL, CLIENT, None, 1),
+    ('get', HOME_URL, AUTHOR_CLIENT, None, 3),
+    ('get', TRENDING_URL, CLIENT, None, 1),
+    ('get', DETAIL_URL, CLIENT, None, 2),
+    ('get', DETAIL_URL, AUTHOR_CLIENT, None, 4),
+    ('get', COMMENTS_URL, CLIENT, None, 2),
+    # Кроме самой записи: строка поискового индекса, место новости
+    # в рейтинге обсуждаемых и статистика за день, автора и новости.
+    ('post', DETAIL_URL, AUTHOR_CLIENT, FORM_DATA, 12),
+    ('get', EDIT_URL, AUTHOR_CLIENT, None, 3),
+    # Кроме самой записи: замена строки поискового индекса, сдвиг
+    # comments_modified новости для ETag и перечитывание статуса
+    # комментария в своей транзакции.
+    ('post', EDIT_URL, AUTHOR_CLIENT, FORM_DATA, 12),
+    ('get', DELETE_URL, AUTHOR_CLIENT, None, 3),
+    # Кроме самого удаления: задача модерации каскадом, строка
+    # поискового индекса и статистика за день, автора и новости.
+    ('post', DELETE_URL, AUTHOR_CLIENT, None, 11),
+    ('get', SEARCH_URL, CLIENT, {'q': 'Текст'}, 2),
+)
+# Сессия в подписанной cookie и пользователь из кэша процесса.
+FAST_AUTH_SAVING = 2
+
+
+@pytest.mark.parametrize(
+    'method, url, clients, data, budget', QUERY_BUDGETS
+)
+def test_query_budget(
+        method, url, clients, data, budget,
+        comment_list, django_assert_max_num_queries
+):
+    """Количество запросов не растёт вместе с числом комментариев."""
+    with django_assert_max_num_queries(budget):
+        getattr(clients, method)(url, data or {})
+
+
+@pytest.mark.parametrize('method, url, data, budget', [
+    (method, url, data, budget)
+    for method, url, clients, data, budget in QUERY_BUDGETS
+    if clients is AUTHOR_CLIENT
+])
+def test_fast_auth_query_budget(
+        method, url, data, budget, settings, author, news_home_url,
+        comment_list, django_assert_max_num_queries
+):
+    """Авторизованный клиент не тратит запросы на сессию и пользователя."""
+    settings.SESSION_ENGINE = (
+        'django.contrib.sessions.backends.signed_cookies'
+    )
+    settings.USER_CACHE_SECONDS = 30
+    client = Client()
+    client.force_login(author)
+    client.get(news_home_url)
+    with django_assert_max_num_queries(budget - FAST_AUTH_SAVING):
+        getattr(client, method)(url, data or {})
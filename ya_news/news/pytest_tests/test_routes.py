@@ -13,7 +13,14 @@ SIGN_UP_URL = lazy_fixture('users_signup_url')
 LOGIN_URL = lazy_fixture('users_login_url')
 LOGOUT_URL = lazy_fixture('users_logout_url')
 HOME_URL = lazy_fixture('news_home_url')
+TRENDING_URL = lazy_fixture('news_trending_url')
 DETAIL_URL = lazy_fixture('news_detail_url')
+COMMENTS_URL = lazy_fixture('news_comments_url')
+SEARCH_URL = lazy_fixture('news_search_url')
+API_NEWS_LIST_URL = lazy_fixture('api_news_list_url')
+API_NEWS_DETAIL_URL = lazy_fixture('api_news_detail_url')
+API_COMMENTS_URL = lazy_fixture('api_comments_url')
+METRICS_URL = lazy_fixture('metrics_url')
 EDIT_URL = lazy_fixture('news_edit_url')
 DELETE_URL = lazy_fixture('news_delete_url')
 EDIT_REDIRECT_URL = lazy_fixture('edit_redirect_url')
@@ -26,23 +33,36 @@ DELETE_REDIRECT_URL = lazy_fixture('delete_redirect_url')
         (LOGIN_URL, ADMIN_CLIENT, HTTPStatus.OK),
         (LOGOUT_URL, ADMIN_CLIENT, HTTPStatus.OK),
         (HOME_URL, ADMIN_CLIENT, HTTPStatus.OK),
+        (TRENDING_URL, ADMIN_CLIENT, HTTPStatus.OK),
         (DETAIL_URL, ADMIN_CLIENT, HTTPStatus.OK),
+        (COMMENTS_URL, ADMIN_CLIENT, HTTPStatus.OK),
+        (SEARCH_URL, ADMIN_CLIENT, HTTPStatus.OK),
+        (API_NEWS_LIST_URL, ADMIN_CLIENT, HTTPStatus.OK),
+        (API_NEWS_DETAIL_URL, ADMIN_CLIENT, HTTPStatus.OK),
+        (API_COMMENTS_URL, ADMIN_CLIENT, HTTPStatus.OK),
         (EDIT_URL, ADMIN_CLIENT, HTTPStatus.NOT_FOUND),
         (DELETE_URL, ADMIN_CLIENT, HTTPStatus.NOT_FOUND),
+        (METRICS_URL, ADMIN_CLIENT, HTTPStatus.OK),
         (SIGN_UP_URL, AUTHOR_CLIENT, HTTPStatus.OK),
         (LOGIN_URL, AUTHOR_CLIENT, HTTPStatus.OK),
         (LOGOUT_URL, AUTHOR_CLIENT, HTTPStatus.OK),
         (HOME_URL, AUTHOR_CLIENT, HTTPStatus.OK),
+        (TRENDING_URL, AUTHOR_CLIENT, HTTPStatus.OK),
         (DETAIL_URL, AUTHOR_CLIENT, HTTPStatus.OK),
+        (COMMENTS_URL, AUTHOR_CLIENT, HTTPStatus.OK),
         (EDIT_URL, AUTHOR_CLIENT, HTTPStatus.OK),
         (DELETE_URL, AUTHOR_CLIENT, HTTPStatus.OK),
+        (METRICS_URL, AUTHOR_CLIENT, HTTPStatus.FOUND),
         (SIGN_UP_URL, CLIENT, HTTPStatus.OK),
         (LOGIN_URL, CLIENT, HTTPStatus.OK),
         (LOGOUT_URL, CLIENT, HTTPStatus.OK),
         (HOME_URL, CLIENT, HTTPStatus.OK),
+        (TRENDING_URL, CLIENT, HTTPStatus.OK),
         (DETAIL_URL, CLIENT, HTTPStatus.OK),
+        (COMMENTS_URL, CLIENT, HTTPStatus.OK),
         (EDIT_URL, CLIENT, HTTPStatus.FOUND),
         (DELETE_URL, CLIENT, HTTPStatus.FOUND),
+        (METRICS_URL, CLIENT, HTTPStatus.FOUND),
     )
 )
 def test_overall_availability(
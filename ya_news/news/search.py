@@ -0,0 +1,200 @@
+"""
+Полнотекстовый поиск по новостям и комментариям.
+
+Индексы - таблицы SQLite FTS5 news_news_fts и news_comment_fts
+(токенизатор trigram, если его поддерживает SQLite, иначе unicode61).
+Подсветку совпадений строит сам FTS5 функциями highlight() и snippet().
+Если FTS5 нет, поиск идёт через icontains и без подсветки.
+"""
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Comment, News
+
+NEWS_TABLE = 'news_news_fts'
+COMMENT_TABLE = 'news_comment_fts'
+TOKEN_RE = re.compile(r'\w+')
+# Маркеры подсветки, которых не бывает в тексте; в HTML они
+# заменяются на <mark> уже после экранирования.
+MARK_START, MARK_END = '\x02', '\x03'
+ELLIPSIS = '…'
+SNIPPET_TOKENS = 16
+# Во сколько раз совпадение в заголовке весомее совпадения в тексте.
+TITLE_WEIGHT = 10.0
+# Триграммы не находят слова короче трёх символов.
+MIN_TRIGRAM_TOKEN = 3
+
+NewsHit = namedtuple('NewsHit', ('pk', 'title', 'snippet'))
+CommentHit = namedtuple(
+    'CommentHit', ('pk', 'news_id', 'news_title', 'snippet')
+)
+
+_features = {}
+
+
+def get_features(using):
+    """(есть ли индексы FTS5, используются ли триграммы) для базы."""
+    if using not in _features:
+        connection = connections[using]
+        sql = None
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT sql FROM sqlite_master WHERE name = %s',
+                    [NEWS_TABLE]
+                )
+                row = cursor.fetchone()
+                sql = row and row[0]
+        _features[using] = (bool(sql), bool(sql) and 'trigram' in sql)
+    return _features[using]
+
+
+def highlight(text):
+    """Экранированный HTML с совпадениями в <mark>."""
+    return mark_safe(
+        escape(text).replace(
+            MARK_START, '<mark>'
+        ).replace(MARK_END, '</mark>')
+    )
+
+
+def build_match(query, trigram):
+    """Запрос FTS5: все слова запроса должны встретиться в документе."""
+    tokens = TOKEN_RE.findall(query.lower())
+    if trigram:
+        return ' '.join(
+            f'"{token}"' for token in tokens
+            if len(token) >= MIN_TRIGRAM_TOKEN
+        )
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def index_news(news, using):
+    if not get_features(using)[0]:
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {NEWS_TABLE} WHERE rowid = %s', [news.pk]
+        )
+        cursor.execute(
+            f'INSERT INTO {NEWS_TABLE} (rowid, title, text) '
+            'VALUES (%s, %s, %s)',
+            [news.pk, news.title, news.text]
+        )
+
+
+def remove_news(pk, using):
+    if not get_features(using)[0]:
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {NEWS_TABLE} WHERE rowid = %s', [pk])
+
+
+def index_comments(rows, using, replace=True):
+    """
+    Добавляет в индекс строки (pk, text, news_id).
+
+    replace=False - строк в индексе заведомо нет, удалять нечего.
+    """
+    if not get_features(using)[0]:
+        return
+    rows = list(rows)
+    with connections[using].cursor() as cursor:
+        if replace:
+            cursor.executemany(
+                f'DELETE FROM {COMMENT_TABLE} WHERE rowid = %s',
+                [(pk,) for pk, _, _ in rows]
+            )
+        cursor.executemany(
+            f'INSERT INTO {COMMENT_TABLE} (rowid, text, news_id) '
+            'VALUES (%s, %s, %s)',
+            rows
+        )
+
+
+def remove_comment(pk, using):
+    if not get_features(using)[0]:
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {COMMENT_TABLE} WHERE rowid = %s', [pk])
+
+
+def rebuild(using):
+    """Перестраивает оба индекса одним запросом на таблицу."""
+    if not get_features(using)[0]:
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {NEWS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {NEWS_TABLE} (rowid, title, text) '
+            f'SELECT id, title, text FROM {News._meta.db_table}'
+        )
+        cursor.execute(f'DELETE FROM {COMMENT_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {COMMENT_TABLE} (rowid, text, news_id) '
+            f'SELECT id, text, news_id FROM {Comment._meta.db_table} '
+            'WHERE status = %s',
+            [Comment.Status.PUBLISHED]
+        )
+
+
+def search(query, limit=None):
+    """Подходящие под запрос новости и комментарии, лучшие первыми."""
+    limit = limit or settings.NEWS_SEARCH_RESULTS
+    using = router.db_for_read(News)
+    has_index, trigram = get_features(using)
+    if not has_index:
+        return search_without_index(query, limit, using)
+    match = build_match(query, trigram)
+    if not match:
+        return [], []
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, '
+            f"highlight({NEWS_TABLE}, 0, %s, %s), "
+            f"snippet({NEWS_TABLE}, 1, %s, %s, %s, %s) "
+            f'FROM {NEWS_TABLE} WHERE {NEWS_TABLE} MATCH %s '
+            f'ORDER BY bm25({NEWS_TABLE}, %s, 1.0) LIMIT %s',
+            [MARK_START, MARK_END, MARK_START, MARK_END, ELLIPSIS,
+             SNIPPET_TOKENS, match, TITLE_WEIGHT, limit]
+        )
+        news_hits = [
+            NewsHit(pk, highlight(title), highlight(snippet))
+            for pk, title, snippet in cursor.fetchall()
+        ]
+        cursor.execute(
+            f'SELECT fts.rowid, fts.news_id, news.title, '
+            f'snippet({COMMENT_TABLE}, 0, %s, %s, %s, %s) '
+            f'FROM {COMMENT_TABLE} AS fts '
+            f'JOIN {News._meta.db_table} AS news ON news.id = fts.news_id '
+            f'WHERE {COMMENT_TABLE} MATCH %s ORDER BY fts.rank LIMIT %s',
+            [MARK_START, MARK_END, ELLIPSIS, SNIPPET_TOKENS, match, limit]
+        )
+        comment_hits = [
+            CommentHit(pk, news_id, title, highlight(snippet))
+            for pk, news_id, title, snippet in cursor.fetchall()
+        ]
+    return news_hits, comment_hits
+
+
+def search_without_index(query, limit, using):
+    """Запасной поиск подстрокой для баз без FTS5."""
+    query = query.strip()
+    if not query:
+        return [], []
+    news = News.objects.using(using).filter(
+        Q(title__icontains=query) | Q(text__icontains=query)
+    ).values_list('pk', 'title', 'text')[:limit]
+    comments = Comment.objects.using(using).published().filter(
+        text__icontains=query
+    ).values_list('pk', 'news_id', 'news__title', 'text')[:limit]
+    return (
+        [NewsHit(pk, title, text) for pk, title, text in news],
+        [CommentHit(*row) for row in comments],
+    )
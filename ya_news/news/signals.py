@@ -0,0 +1,236 @@
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from django.db import router, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from . import cache, search, stats, trending
+from .models import Comment, News
+
+# Отправляется из Comment.objects.bulk_create: comments - список только
+# что созданных комментариев с первичными ключами, using - база.
+comments_bulk_created = Signal()
+# Отправляется модерацией, когда отложенный комментарий опубликован,
+# аргумент comment.
+comment_published = Signal()
+# Новости (база, pk), которые сейчас удаляются вместе с комментариями.
+# Их счётчик и статистика уходят вместе с ними, и каскад не обновляет
+# их построчно - иначе удаление новости стоило бы запросов на каждый
+# комментарий.
+_deleting_news = ContextVar('deleting_news', default=frozenset())
+
+
+def is_deleting_news(comment, using):
+    """Удаляется ли комментарий каскадом вместе со своей новостью."""
+    return (using, comment.news_id) in _deleting_news.get()
+
+
+@receiver(pre_delete, sender=News)
+def start_news_cascade(sender, instance, using, **kwargs):
+    """Каскад комментариев новости начинается после этого сигнала."""
+    _deleting_news.set(_deleting_news.get() | {(using, instance.pk)})
+
+
+@receiver(post_delete, sender=News)
+def finish_news_cascade(sender, instance, using, **kwargs):
+    """Комментарии новости уже удалены."""
+    _deleting_news.set(_deleting_news.get() - {(using, instance.pk)})
+
+
+@receiver(post_save, sender=Comment)
+def increase_comment_count(sender, instance, created, using, **kwargs):
+    """
+    Увеличиваем счётчик комментариев новости.
+
+    Тем же запросом сдвигаем comments_modified - по нему страница
+    новости отвечает 304 клиентам, у которых она уже есть.
+    """
+    news = News.objects.using(using).filter(pk=instance.news_id)
+    if not created:
+        news.update(comments_modified=timezone.now())
+    elif instance.status == Comment.Status.PUBLISHED:
+        news.update(
+            comment_count=F('comment_count') + 1,
+            comments_modified=timezone.now(),
+        )
+
+
+@receiver(comment_published)
+def count_published_comment(sender, comment, **kwargs):
+    """Учитываем в счётчике комментарий, прошедший модерацию."""
+    News.objects.using(router.db_for_write(News)).filter(
+        pk=comment.news_id
+    ).update(
+        comment_count=F('comment_count') + 1,
+        comments_modified=timezone.now(),
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def decrease_comment_count(sender, instance, using, **kwargs):
+    """Уменьшаем счётчик комментариев новости."""
+    if (
+        instance.status != Comment.Status.PUBLISHED
+        or is_deleting_news(instance, using)
+    ):
+        return
+    News.objects.using(using).filter(pk=instance.news_id).update(
+        comment_count=Greatest(F('comment_count') - 1, 0),
+        comments_modified=timezone.now(),
+    )
+
+
+def count_by_news(comments):
+    """Число опубликованных комментариев пачки по новостям."""
+    return Counter(
+        comment.news_id for comment in comments
+        if comment.status == Comment.Status.PUBLISHED
+    )
+
+
+@receiver(comments_bulk_created, sender=Comment)
+def increase_comment_counts(sender, comments, using, **kwargs):
+    """
+    Увеличиваем счётчики новостей пачки.
+
+    Новости с одинаковым числом новых комментариев меняются одним UPDATE.
+    """
+    now = timezone.now()
+    news_ids = defaultdict(list)
+    for news_id, total in count_by_news(comments).items():
+        news_ids[total].append(news_id)
+    for total, pks in news_ids.items():
+        News.objects.using(using).filter(pk__in=pks).update(
+            comment_count=F('comment_count') + total,
+            comments_modified=now,
+        )
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(comments_bulk_created, sender=Comment)
+@receiver(comment_published)
+def invalidate_cache(sender, using=None, **kwargs):
+    """Сбрасываем кэш главной страницы после фиксации изменений."""
+    transaction.on_commit(cache.bump_version, using=using)
+
+
+@receiver(post_save, sender=News)
+def index_news(sender, instance, using, **kwargs):
+    """Обновляем новость в поисковом индексе."""
+    search.index_news(instance, using)
+
+
+@receiver(post_delete, sender=News)
+def remove_news_from_index(sender, instance, using, **kwargs):
+    """Удаляем новость из поискового индекса."""
+    search.remove_news(instance.pk, using)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, created, using, **kwargs):
+    """В индексе только опубликованные комментарии."""
+    if instance.status == Comment.Status.PUBLISHED:
+        search.index_comments(
+            [(instance.pk, instance.text, instance.news_id)],
+            using, replace=not created
+        )
+    elif not created:
+        search.remove_comment(instance.pk, using)
+
+
+@receiver(comment_published)
+def index_published_comment(sender, comment, **kwargs):
+    """Добавляем в индекс комментарий, прошедший модерацию."""
+    search.index_comments(
+        [(comment.pk, comment.text, comment.news_id)],
+        router.db_for_write(Comment), replace=False
+    )
+
+
+@receiver(comments_bulk_created, sender=Comment)
+def index_bulk_comments(sender, comments, using, **kwargs):
+    """Добавляем в индекс массово созданные опубликованные комментарии."""
+    search.index_comments(
+        [
+            (comment.pk, comment.text, comment.news_id)
+            for comment in comments
+            if comment.status == Comment.Status.PUBLISHED
+        ],
+        using, replace=False
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def remove_comment_from_index(sender, instance, using, **kwargs):
+    """Удаляем комментарий из поискового индекса."""
+    search.remove_comment(instance.pk, using)
+
+
+@receiver(post_save, sender=Comment)
+def add_comment_to_trending(sender, instance, created, using, **kwargs):
+    """Новый опубликованный комментарий поднимает новость в рейтинге."""
+    if created and instance.status == Comment.Status.PUBLISHED:
+        trending.add_comments(instance.news_id, instance.created, using)
+
+
+@receiver(comment_published)
+def add_published_comment_to_trending(sender, comment, **kwargs):
+    """Комментарий, прошедший модерацию, учитывается в момент публикации."""
+    trending.add_comments(
+        comment.news_id, timezone.now(), router.db_for_write(Comment)
+    )
+
+
+@receiver(comments_bulk_created, sender=Comment)
+def add_bulk_comments_to_trending(sender, comments, using, **kwargs):
+    """Массово созданные комментарии учитываются пачкой на новость."""
+    trending.add_news_comments(
+        count_by_news(comments), timezone.now(), using
+    )
+
+
+@receiver(post_save, sender=Comment)
+def add_comment_to_stats(sender, instance, created, using, **kwargs):
+    """Учитываем новый опубликованный комментарий в статистике новости."""
+    if created and instance.status == Comment.Status.PUBLISHED:
+        stats.add_comments(
+            instance.news_id, [(instance.author_id, instance.created)], using
+        )
+
+
+@receiver(comment_published)
+def add_published_comment_to_stats(sender, comment, **kwargs):
+    """Учитываем в статистике комментарий, прошедший модерацию."""
+    stats.add_comments(
+        comment.news_id,
+        [(comment.author_id, comment.created)],
+        router.db_for_write(Comment),
+    )
+
+
+@receiver(comments_bulk_created, sender=Comment)
+def add_bulk_comments_to_stats(sender, comments, using, **kwargs):
+    """Учитываем в статистике массово созданные комментарии."""
+    stats.add_comment_objects(comments, using)
+
+
+@receiver(post_delete, sender=Comment)
+def remove_comment_from_stats(sender, instance, using, **kwargs):
+    """
+    Убираем удалённый комментарий из статистики новости.
+
+    При удалении самой новости её строки статистики удаляются каскадом
+    одним запросом на таблицу.
+    """
+    if (
+        instance.status == Comment.Status.PUBLISHED
+        and not is_deleting_news(instance, using)
+    ):
+        stats.remove_comment(instance, using)
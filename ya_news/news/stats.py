@@ -0,0 +1,213 @@
+"""
+Статистика комментариев по новостям для редакторов.
+
+Таблицы NewsStats, NewsDailyStats и NewsCommenter обновляются сигналами
+на каждый опубликованный или удалённый комментарий несколькими UPDATE,
+поэтому админка читает готовые числа, а не агрегирует комментарии.
+Команда rebuild_news_stats пересчитывает таблицы, читая комментарии
+потоком кусками по STATS_CHUNK_SIZE строк.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .bulk import upsert_many
+from .models import Comment, NewsCommenter, NewsDailyStats, NewsStats
+
+STATS_CHUNK_SIZE = 2000
+
+
+def get_day(moment):
+    """День комментария в часовом поясе проекта."""
+    return timezone.localdate(moment)
+
+
+def upsert(model, using, lookups, defaults, changes):
+    """
+    Меняет строку одним UPDATE, а если её нет - создаёт.
+
+    Возвращает True, если строка создана.
+    """
+    rows = model.objects.using(using).filter(**lookups)
+    if rows.update(**changes):
+        return False
+    _, created = model.objects.using(using).get_or_create(
+        **lookups, defaults=defaults
+    )
+    if not created:
+        rows.update(**changes)
+    return created
+
+
+def increase(model, using, lookups, comment_count):
+    """Увеличивает comment_count строки; True, если строка новая."""
+    return upsert(
+        model, using, lookups,
+        defaults={'comment_count': comment_count},
+        changes={'comment_count': F('comment_count') + comment_count},
+    )
+
+
+def add_comments(news_id, comments, using):
+    """Учитывает опубликованные комментарии новости: (author_id, created)."""
+    comments = list(comments)
+    days = Counter(get_day(created) for _, created in comments)
+    for day, total in days.items():
+        increase(
+            NewsDailyStats, using, {'news_id': news_id, 'day': day}, total
+        )
+    authors = Counter(author_id for author_id, _ in comments)
+    new_commenters = sum(
+        increase(
+            NewsCommenter, using,
+            {'news_id': news_id, 'author_id': author_id}, total
+        )
+        for author_id, total in authors.items()
+    )
+    last_comment = max(created for _, created in comments)
+    upsert(
+        NewsStats, using, {'news_id': news_id},
+        defaults={
+            'commenter_count': new_commenters,
+            'last_comment': last_comment,
+        },
+        changes={
+            'commenter_count': F('commenter_count') + new_commenters,
+            'last_comment': Greatest(
+                Coalesce('last_comment', Value(last_comment)),
+                Value(last_comment),
+            ),
+        },
+    )
+
+
+def add_comment_objects(objs, using):
+    """
+    Учитывает опубликованные комментарии из списка объектов.
+
+    Пачка складывается по (новость, день) и (новость, автор) в памяти,
+    и каждая таблица меняется постоянным числом запросов на пачку.
+    """
+    days = Counter()
+    authors = Counter()
+    last_comments = {}
+    # localdate дорог, а комментарии пачки обычно в пределах минут.
+    minute_days = {}
+    for obj in objs:
+        if obj.status != Comment.Status.PUBLISHED:
+            continue
+        minute = obj.created.replace(second=0, microsecond=0)
+        if minute not in minute_days:
+            minute_days[minute] = get_day(minute)
+        days[obj.news_id, minute_days[minute]] += 1
+        authors[obj.news_id, obj.author_id] += 1
+        last = last_comments.get(obj.news_id)
+        if last is None or obj.created > last:
+            last_comments[obj.news_id] = obj.created
+    upsert_counts(NewsDailyStats, using, ('news_id', 'day'), days)
+    new_commenters = Counter(
+        news_id for news_id, _ in upsert_counts(
+            NewsCommenter, using, ('news_id', 'author_id'), authors
+        )
+    )
+    upsert_many(
+        NewsStats, using, ('news_id',),
+        {(news_id,): new_commenters[news_id] for news_id in last_comments},
+        changes=lambda total: {
+            'commenter_count': F('commenter_count') + total,
+            'last_comment': Subquery(get_last_comment()),
+        },
+        defaults=lambda key, total: {
+            'commenter_count': total, 'last_comment': last_comments[key[0]]
+        },
+    )
+
+
+def upsert_counts(model, using, key_fields, counts):
+    """Увеличивает comment_count строк по ключам; ключи новых строк."""
+    return upsert_many(
+        model, using, key_fields, counts,
+        changes=lambda total: {'comment_count': F('comment_count') + total},
+        defaults=lambda key, total: {'comment_count': total},
+    )
+
+
+def get_last_comment():
+    """Время последнего комментария новости - по индексу (news, created)."""
+    return Comment.objects.published().filter(
+        news=OuterRef('news')
+    ).order_by('-created').values('created')[:1]
+
+
+def remove_comment(comment, using):
+    """Убирает удалённый опубликованный комментарий из статистики."""
+    NewsDailyStats.objects.using(using).filter(
+        news_id=comment.news_id, day=get_day(comment.created)
+    ).update(comment_count=Greatest(F('comment_count') - 1, 0))
+    commenters = NewsCommenter.objects.using(using).filter(
+        news_id=comment.news_id, author_id=comment.author_id
+    )
+    changes = {}
+    # Последний комментарий автора убирает его из комментаторов.
+    if commenters.filter(comment_count__lte=1).delete()[0]:
+        changes['commenter_count'] = Greatest(F('commenter_count') - 1, 0)
+    else:
+        commenters.update(comment_count=F('comment_count') - 1)
+    NewsStats.objects.using(using).filter(news_id=comment.news_id).update(
+        last_comment=Subquery(get_last_comment()), **changes
+    )
+
+
+def rebuild(using, chunk_size=STATS_CHUNK_SIZE):
+    """
+    Пересчитывает статистику всех новостей.
+
+    Комментарии читаются потоком, в памяти остаются только счётчики
+    по дням и авторам. Возвращает число новостей со статистикой.
+    """
+    days = Counter()
+    authors = Counter()
+    last_comments = {}
+    rows = Comment.objects.using(using).published().order_by().values_list(
+        'news', 'author', 'created'
+    )
+    for news_id, author_id, created in rows.iterator(chunk_size=chunk_size):
+        days[news_id, get_day(created)] += 1
+        authors[news_id, author_id] += 1
+        if news_id not in last_comments or created > last_comments[news_id]:
+            last_comments[news_id] = created
+    commenter_counts = Counter(news_id for news_id, _ in authors)
+    with transaction.atomic(using=using):
+        for model in (NewsStats, NewsDailyStats, NewsCommenter):
+            model.objects.using(using).all().delete()
+        NewsStats.objects.using(using).bulk_create(
+            (
+                NewsStats(
+                    news_id=news_id,
+                    commenter_count=commenter_counts[news_id],
+                    last_comment=last_comment,
+                )
+                for news_id, last_comment in last_comments.items()
+            ),
+            batch_size=chunk_size,
+        )
+        NewsDailyStats.objects.using(using).bulk_create(
+            (
+                NewsDailyStats(news_id=news_id, day=day, comment_count=total)
+                for (news_id, day), total in days.items()
+            ),
+            batch_size=chunk_size,
+        )
+        NewsCommenter.objects.using(using).bulk_create(
+            (
+                NewsCommenter(
+                    news_id=news_id, author_id=author_id, comment_count=total
+                )
+                for (news_id, author_id), total in authors.items()
+            ),
+            batch_size=chunk_size,
+        )
+    return len(last_comments)
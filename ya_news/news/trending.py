@@ -0,0 +1,113 @@
+"""
+Рейтинг обсуждаемых новостей.
+
+Вес комментария вдвое меньше каждые NEWS_TRENDING_HALF_LIFE_HOURS часов.
+В NewsTrend.score хранится log2 суммы весов комментариев новости,
+отсчитанных не от текущего момента, а от постоянной точки EPOCH: у всех
+новостей веса стареют одинаково, поэтому порядок по score совпадает с
+порядком по текущему весу, и старые обсуждения опускаются сами, без
+пересчёта. Новый комментарий добавляет к score свою точку одним
+UPDATE, а команда rebuild_trending пересчитывает рейтинг по
+комментариям за NEWS_TRENDING_WINDOW_HOURS часов (например, раз в час
+по cron): так из рейтинга уходят удалённые комментарии и новости без
+свежих обсуждений.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Abs, Greatest, Log, Power, TruncHour
+from django.utils import timezone
+
+from .bulk import upsert_many
+from .models import Comment, NewsTrend
+
+EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def get_point(moment, count=1):
+    """Вклад count комментариев, оставленных в moment, в log2 шкале."""
+    half_life = settings.NEWS_TRENDING_HALF_LIFE_HOURS * 3600
+    return (moment - EPOCH).total_seconds() / half_life + math.log2(count)
+
+
+def log2_add(first, second):
+    """log2(2**first + 2**second) без переполнения."""
+    if first is None:
+        return second
+    return max(first, second) + math.log2(1 + 2 ** -abs(first - second))
+
+
+def get_threshold(now=None):
+    """Score одного комментария на краю окна: ниже - уже не в рейтинге."""
+    now = now or timezone.now()
+    return get_point(
+        now - timedelta(hours=settings.NEWS_TRENDING_WINDOW_HOURS)
+    )
+
+
+def add_point(point):
+    """Выражение log2_add(score, point): то же, но в базе."""
+    return Greatest(F('score'), Value(point)) + Log(
+        2, 1 + Power(2, -Abs(F('score') - Value(point)))
+    )
+
+
+def add_comments(news_id, moment, using, count=1):
+    """Добавляет к рейтингу новости count комментариев из moment."""
+    point = get_point(moment, count)
+    trends = NewsTrend.objects.using(using).filter(news_id=news_id)
+    score = add_point(point)
+    if trends.update(score=score):
+        return
+    _, created = NewsTrend.objects.using(using).get_or_create(
+        news_id=news_id, defaults={'score': point}
+    )
+    if not created:
+        trends.update(score=score)
+
+
+def add_news_comments(counts, moment, using):
+    """
+    Добавляет к рейтингу комментарии из moment: counts - число по новостям.
+
+    Все новости пачки меняются постоянным числом запросов.
+    """
+    upsert_many(
+        NewsTrend, using, ('news_id',),
+        {(news_id,): get_point(moment, count)
+         for news_id, count in counts.items()},
+        changes=lambda point: {'score': add_point(point)},
+        defaults=lambda key, point: {'score': point},
+    )
+
+
+def rebuild(using, now=None):
+    """
+    Пересчитывает рейтинг по опубликованным комментариям окна.
+
+    Комментарии складываются по часам в базе, и вес часа считается
+    от его середины. Возвращает число новостей в рейтинге.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(hours=settings.NEWS_TRENDING_WINDOW_HOURS)
+    hours = Comment.objects.using(using).published().filter(
+        created__gte=since
+    ).annotate(hour=TruncHour('created')).order_by().values(
+        'news', 'hour'
+    ).annotate(total=Count('pk'))
+    scores = {}
+    for row in hours:
+        scores[row['news']] = log2_add(
+            scores.get(row['news']),
+            get_point(row['hour'] + timedelta(minutes=30), row['total'])
+        )
+    with transaction.atomic(using=using):
+        NewsTrend.objects.using(using).all().delete()
+        NewsTrend.objects.using(using).bulk_create(
+            NewsTrend(news_id=news_id, score=score)
+            for news_id, score in scores.items()
+        )
+    return len(scores)
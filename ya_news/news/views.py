@@ -1,17 +1,27 @@
+import hashlib
+
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseRedirect
+from django.middleware.csrf import get_token
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
 from django.views import generic
 
+from . import buffer, cache, moderation, search, trending
 from .forms import CommentForm
 from .models import Comment, News
+from .pagination import get_comment_page
 
 
 class NewsList(generic.ListView):
     """Список новостей."""
     model = News
     template_name = 'news/home.html'
+    cache_key = 'home'
 
     def get_queryset(self):
         """
@@ -19,21 +29,106 @@ class NewsList(generic.ListView):
 
         Их количество определяется в настройках проекта.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
+        return self.model.objects.with_comment_count(
         )[:settings.NEWS_COUNT_ON_HOME_PAGE]
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['news_version'] = cache.get_version()
+        context['news_cache_alias'] = settings.NEWS_CACHE_ALIAS
+        context['news_cache_timeout'] = settings.NEWS_CACHE_TIMEOUT
+        return context
+
+    def get(self, request, *args, **kwargs):
+        """Анонимным пользователям отдаём страницу целиком из кэша."""
+        if request.user.is_authenticated:
+            return super().get(request, *args, **kwargs)
+        render_page = super().get
+        response = None
+
+        def build():
+            nonlocal response
+            response = render_page(request, *args, **kwargs).render()
+            return response.content
+
+        content = cache.get_or_build(cache.make_key(self.cache_key), build)
+        return response or HttpResponse(content)
+
+
+class NewsTrending(NewsList):
+    """Обсуждаемые новости из заранее посчитанного рейтинга."""
+    cache_key = 'trending'
+
+    def get_queryset(self):
+        """Новости с комментариями за последние часы, по убыванию веса."""
+        return self.model.objects.with_comment_count().filter(
+            trend__score__gte=trending.get_threshold()
+        ).order_by('-trend__score')[:settings.NEWS_COUNT_ON_HOME_PAGE]
+
+
+def get_news_validators(request, news):
+    """
+    Валидаторы ETag и Last-Modified страницы новости.
+
+    Страница зависит от пользователя (шапка, форма комментария),
+    поэтому ETag слабый и содержит его id. CSRF-токен формы меняется
+    при каждом входе, и в ETag пользователя входит хэш токена: иначе
+    после повторного входа браузер показал бы форму со старым токеном.
+    """
+    last_modified = news.last_modified
+    etag = f'{news.pk}-{last_modified.timestamp():.6f}-{request.user.pk or 0}'
+    if request.user.is_authenticated:
+        # get_token заводит токен сразу, чтобы ETag первого ответа
+        # совпал со следующим запросом, пришедшим уже с cookie.
+        get_token(request)
+        csrf_cookie = request.META['CSRF_COOKIE']
+        etag += '-' + hashlib.sha256(csrf_cookie.encode()).hexdigest()[:16]
+    return f'W/"{etag}"', last_modified
 
-class NewsDetail(generic.DetailView):
+
+def not_modified(request, etag, last_modified):
+    """Ответ 304, если страница с этими валидаторами у клиента не устарела."""
+    return get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp())
+    )
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+class CommentPageMixin:
+    """Добавляет в контекст первую страницу комментариев новости."""
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['comments'], context['next_cursor'] = get_comment_page(
+            self.object.pk
+        )
+        return context
+
+
+class NewsDetail(CommentPageMixin, generic.DetailView):
     model = News
     template_name = 'news/detail.html'
 
-    def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
+    def get(self, request, *args, **kwargs):
+        """
+        Отвечает 304, если страница у клиента не устарела.
+
+        Проверка идёт по полям уже загруженной новости, до тяжёлых
+        запросов и отрисовки шаблона.
+        """
+        self.object = self.get_object()
+        etag, last_modified = get_news_validators(request, self.object)
+        response = not_modified(
+            request, etag, last_modified
+        ) or self.render_to_response(
+            self.get_context_data(object=self.object)
         )
-        return obj
+        return set_validators(response, etag, last_modified)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -44,6 +139,7 @@ class NewsDetail(generic.DetailView):
 
 class NewsComment(
         LoginRequiredMixin,
+        CommentPageMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
@@ -55,16 +151,31 @@ class NewsComment(
         self.object = self.get_object()
         return super().post(request, *args, **kwargs)
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['moderate'] = not settings.NEWS_ASYNC_MODERATION
+        return kwargs
+
     def form_valid(self, form):
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
-        comment.save()
+        if not settings.NEWS_ASYNC_MODERATION:
+            if settings.NEWS_BUFFERED_COMMENTS:
+                buffer.save(comment)
+            else:
+                comment.save()
+            return super().form_valid(form)
+        comment.status = Comment.Status.PENDING
+        with transaction.atomic():
+            comment.save()
+            moderation.enqueue(comment)
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return reverse(
+            'news:detail', kwargs={'pk': self.object.pk}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
@@ -78,19 +189,53 @@ class NewsDetailView(generic.View):
         return view(request, *args, **kwargs)
 
 
+class CommentList(generic.TemplateView):
+    """
+    Следующая страница комментариев новости ("Показать ещё").
+
+    Скрипт страницы новости запрашивает её через fetch и дописывает
+    фрагмент к списку. Переход по ссылке без скрипта получает целую
+    страницу с тем же списком.
+    """
+    template_name = 'news/comment_page.html'
+    fragment_template_name = 'news/comments.html'
+
+    def get_template_names(self):
+        if self.request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return [self.fragment_template_name]
+        return [self.template_name]
+
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        patch_vary_headers(response, ('X-Requested-With',))
+        return response
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        news = get_object_or_404(
+            News.objects.only('pk', 'title'), pk=self.kwargs['pk']
+        )
+        context['news'] = news
+        context['comments'], context['next_cursor'] = get_comment_page(
+            news.pk, self.request.GET.get('cursor')
+        )
+        return context
+
+
 class CommentBase(LoginRequiredMixin):
     """Базовый класс для работы с комментариями."""
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
         """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        return self.model.objects.filter(
+            author=self.request.user
+        ).select_related('news')
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
@@ -98,7 +243,36 @@ class CommentUpdate(CommentBase, generic.UpdateView):
     template_name = 'news/edit.html'
     form_class = CommentForm
 
+    def form_valid(self, form):
+        """
+        Сохраняем только текст.
+
+        Пока шла правка, модерация могла опубликовать или отклонить
+        комментарий: статус перечитывается в транзакции записи, чтобы
+        сигналы видели текущий, а старый статус не вернулся в базу.
+        """
+        self.object = form.save(commit=False)
+        with transaction.atomic():
+            self.object.refresh_from_db(fields=['status'])
+            self.object.save(update_fields=['text'])
+        return HttpResponseRedirect(self.get_success_url())
+
 
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+
+class NewsSearch(generic.TemplateView):
+    """Поиск по новостям и комментариям."""
+    template_name = 'news/search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '')
+        context['query'] = query
+        if query.strip():
+            context['news_hits'], context['comment_hits'] = search.search(
+                query
+            )
+        return context
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -21,6 +22,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanews.metrics.metrics_middleware',
+    'yanews.routers.pin_primary_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -34,7 +37,7 @@ ROOT_URLCONF = 'yanews.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yanews.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -58,6 +61,68 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения - копии основной базы. Пути к их файлам
+# перечисляются в переменной окружения через os.pathsep.
+DATABASES.update({
+    f'replica{number}': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+    }
+    for number, path in enumerate(
+        filter(None, os.getenv('DATABASE_REPLICAS', '').split(os.pathsep)),
+        start=1
+    )
+})
+
+DATABASE_ROUTERS = ['yanews.routers.PrimaryReplicaRouter']
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# Приложения, чтение моделей которых уходит на реплики.
+DATABASE_REPLICA_APPS = {'news'}
+# Сколько секунд после записи клиент читает из основной базы.
+DATABASE_PIN_SECONDS = 5
+
+NEWS_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'news',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    },
+    # Общий для всех воркеров кэш на локальной машине.
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': os.getenv('NEWS_CACHE_LOCATION', '127.0.0.1:11211'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'news': NEWS_CACHE_BACKENDS[os.getenv('NEWS_CACHE_BACKEND', 'locmem')],
+}
+
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    # Сессия целиком в подписанной cookie, без обращений к базе.
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.getenv('SESSION_BACKEND', 'db')]
+
+# ModelBackend остаётся для сессий, созданных до CachedModelBackend:
+# в них записан его путь.
+AUTHENTICATION_BACKENDS = [
+    'yanews.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+# Сколько секунд пользователь живёт в кэше, 0 - без кэша.
+USER_CACHE_SECONDS = 0
+USER_CACHE_ALIAS = 'default'
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -80,3 +145,62 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+
+# Брать количество комментариев из счётчика News.comment_count,
+# а не агрегировать комментарии при каждом запросе.
+NEWS_COMMENT_COUNT_DENORMALIZED = True
+
+COMMENT_COUNT_ON_DETAIL_PAGE = 50
+
+NEWS_CACHE_ALIAS = 'news'
+NEWS_CACHE_TIMEOUT = 300
+# Сколько секунд остальные воркеры ждут, пока один строит страницу.
+NEWS_CACHE_LOCK_TIMEOUT = 10
+
+# Сколько строк JSON Lines проверяется и записывается одной транзакцией.
+COMMENT_INGEST_BATCH_SIZE = 5000
+
+# Движок поиска запрещённых слов и необязательный файл с дополнительными
+# словами (по одному в строке), который перечитывается при изменении.
+NEWS_BAD_WORDS_ENGINE = 'news.profanity.RegexFilter'
+NEWS_BAD_WORDS_FILE = None
+
+# Проверять комментарии в фоне после сохранения (см. news.moderation).
+NEWS_ASYNC_MODERATION = False
+NEWS_MODERATION_WORKERS = 2
+NEWS_MODERATION_CHECKS = [
+    'news.forms.validate_comment_text',
+]
+
+NEWS_SEARCH_RESULTS = 20
+
+# Рейтинг обсуждаемых новостей (см. news.trending): вес комментария
+# вдвое меньше каждые HALF_LIFE часов, в рейтинг попадают новости с
+# комментариями за последние WINDOW часов.
+NEWS_TRENDING_HALF_LIFE_HOURS = 6
+NEWS_TRENDING_WINDOW_HOURS = 72
+
+# Групповая запись комментариев (см. news.buffer): вставки, пришедшие
+# за окно в миллисекундах, сохраняются одной транзакцией. Работает без
+# отложенной модерации, которой нужен первичный ключ каждого комментария.
+NEWS_BUFFERED_COMMENTS = False
+NEWS_BUFFER_WINDOW_MS = 5
+NEWS_BUFFER_MAX_BATCH = 500
+# Сколько секунд запрос ждёт записи своего комментария.
+NEWS_BUFFER_TIMEOUT = 10
+
+# Асинхронные главная страница и страница новости для запуска под ASGI.
+NEWS_ASYNC_VIEWS = False
+
+# Сколько строк JSON API читает из базы и отдаёт клиенту за раз.
+NEWS_API_CHUNK_SIZE = 2000
+
+# Метрики запросов по представлениям (см. yanews.metrics): включаются
+# переменной окружения, отдаются администраторам по адресу /metrics/ и,
+# если задан файл, сохраняются в него раз в METRICS_DUMP_SECONDS секунд.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED') == '1'
+METRICS_FILE = os.getenv('METRICS_FILE')
+METRICS_DUMP_SECONDS = 60
+
+# Компилировать все шаблоны при запуске WSGI/ASGI-приложения.
+TEMPLATES_WARM_UP = False
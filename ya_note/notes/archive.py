@@ -0,0 +1,180 @@
+"""
+Выгрузка и загрузка заметок пользователя.
+
+Выгрузка читает строки через values() кусками по ключу (created, id) и
+отдаётся потоком: JSON Lines или zip с заметками в Markdown. Загрузка
+принимает JSON Lines и пишет пачками через bulk_create; slug всей пачки
+проверяются одним запросом, занятые получают числовой суффикс.
+"""
+import json
+import zipfile
+from collections import namedtuple
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, router, transaction
+from django.db.models import Q
+
+from .models import SLUG_ATTEMPTS, Note
+from .search import get_backend
+from .slugs import allocate_slugs
+
+ImportReport = namedtuple('ImportReport', ('created', 'renamed', 'errors'))
+RowError = namedtuple('RowError', ('line', 'error'))
+
+EXPORT_FIELDS = ('title', 'text', 'slug', 'created')
+NOT_AN_OBJECT = 'Ожидается JSON-объект с полями title и text.'
+BAD_JSON = 'Некорректный JSON: {error}'
+MARKDOWN = '# {title}\n\n{text}\n'
+
+
+def get_export_chunks(author, chunk_size):
+    """
+    Заметки автора словарями, от старых к новым, кусками по chunk_size.
+
+    Каждый кусок - отдельный запрос по индексу (author, created),
+    начиная с последней строки предыдущего куска.
+    """
+    notes = Note.objects.filter(author=author).order_by(
+        'created', 'pk'
+    ).values('pk', *EXPORT_FIELDS)
+    chunk = list(notes[:chunk_size])
+    while chunk:
+        created, pk = chunk[-1]['created'], chunk[-1]['pk']
+        for row in chunk:
+            del row['pk']
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        # Лишнее условие created >= created даёт SQLite переход по
+        # индексу сразу к курсору: по одному OR он читает заметки с начала.
+        chunk = list(notes.filter(
+            Q(created__gt=created) | Q(created=created, pk__gt=pk),
+            created__gte=created,
+        )[:chunk_size])
+
+
+def export_jsonl(author, chunk_size=None):
+    """Заметки автора в JSON Lines, кусками по chunk_size строк."""
+    chunk_size = chunk_size or settings.NOTE_ARCHIVE_CHUNK_SIZE
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for chunk in get_export_chunks(author, chunk_size):
+        yield ''.join(encoder.encode(row) + '\n' for row in chunk)
+
+
+class ChunkWriter:
+    """Файл только для записи, из которого zipfile забирают кусками."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def export_markdown_zip(author, chunk_size=None):
+    """
+    Zip-архив с файлом <slug>.md на каждую заметку, кусками.
+
+    Поток не поддерживает seek, поэтому zipfile пишет размеры файлов
+    после их данных, и архив можно отдавать по мере записи.
+    """
+    chunk_size = chunk_size or settings.NOTE_ARCHIVE_CHUNK_SIZE
+    writer = ChunkWriter()
+    with zipfile.ZipFile(writer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for chunk in get_export_chunks(author, chunk_size):
+            for row in chunk:
+                archive.writestr(f'{row["slug"]}.md', MARKDOWN.format(**row))
+            yield writer.drain()
+    yield writer.drain()
+
+
+def parse_row(line, author):
+    """Разбирает строку JSON Lines в несохранённую заметку."""
+    try:
+        row = json.loads(line)
+    except ValueError as error:
+        raise ValidationError(BAD_JSON.format(error=error))
+    if not isinstance(row, dict) or not {'title', 'text'} <= row.keys():
+        raise ValidationError(NOT_AN_OBJECT)
+    note = Note(
+        title=row['title'],
+        text=row['text'],
+        slug=row.get('slug') or '',
+        author=author,
+    )
+    # Только проверки полей: уникальность slug решается для всей пачки.
+    note.full_clean(exclude=('author',), validate_unique=False)
+    return note
+
+
+def save_batch(notes, using):
+    """
+    Записывает пачку заметок и возвращает, сколько slug пришлось сменить.
+
+    Если slug успел занять параллельный запрос, пачка подбирает slug
+    заново, как Note.save.
+    """
+    wanted = [note.slug for note in notes]
+    for attempt in range(1, SLUG_ATTEMPTS + 1):
+        allocate_slugs(notes, resolve_conflicts=True, using=using)
+        try:
+            with transaction.atomic(using=using):
+                Note.objects.using(using).bulk_create(notes)
+                # bulk_create не отправляет post_save, индекс поиска
+                # пополняем сами.
+                get_backend(using).index_many(
+                    Note.objects.using(using).filter(
+                        slug__in=[note.slug for note in notes]
+                    ).values_list('pk', 'author_id', 'title', 'text'),
+                    using
+                )
+            break
+        except IntegrityError:
+            for note, slug in zip(notes, wanted):
+                note.slug = slug
+            if attempt == SLUG_ATTEMPTS:
+                raise
+    return sum(
+        1 for note, slug in zip(notes, wanted) if slug and note.slug != slug
+    )
+
+
+def import_notes(author, lines, batch_size=None):
+    """
+    Загружает заметки автора из строк JSON Lines.
+
+    Ошибочные строки пропускаются и попадают в отчёт с номером строки.
+    """
+    batch_size = batch_size or settings.NOTE_ARCHIVE_CHUNK_SIZE
+    using = router.db_for_write(Note)
+    numbered_lines = enumerate(lines, start=1)
+    created = renamed = 0
+    errors = []
+    while True:
+        batch = list(islice(numbered_lines, batch_size))
+        if not batch:
+            break
+        notes = []
+        for number, line in batch:
+            if not line.strip():
+                continue
+            try:
+                notes.append(parse_row(line, author))
+            except ValidationError as error:
+                errors.append(RowError(number, ' '.join(error.messages)))
+        if notes:
+            renamed += save_batch(notes, using)
+            created += len(notes)
+    return ImportReport(created, renamed, errors)
@@ -0,0 +1,64 @@
+"""
+Асинхронные страницы чтения заметок для запуска под ASGI.
+
+В Django 3.2 нет асинхронных представлений-классов и асинхронного ORM,
+поэтому здесь функции, а обращения к базе идут через sync_to_async в
+потоке, за которым закреплены соединения. Включаются настройкой
+NOTES_ASYNC_VIEWS.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import HttpResponseNotAllowed
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+
+from .models import Note
+from .pagination import get_note_page
+from .views import get_note_validators, not_modified, set_validators
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def login_required(view):
+    """Как LoginRequiredMixin, но для асинхронной функции."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return HttpResponseNotAllowed(SAFE_METHODS)
+        # Пользователь загружается из базы в её потоке один раз, дальше
+        # request.user читается без запросов.
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@login_required
+async def notes_list(request):
+    """Список всех заметок пользователя."""
+    notes = Note.objects.filter(author=request.user).only(
+        'id', 'title', 'slug', 'created'
+    )
+    object_list, next_cursor = await sync_to_async(get_note_page)(
+        notes, request.GET.get('cursor')
+    )
+    return TemplateResponse(request, 'notes/list.html', {
+        'object_list': object_list,
+        'note_list': object_list,
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+async def note_detail(request, slug):
+    """Заметка подробно."""
+    note = await sync_to_async(get_object_or_404)(
+        Note, author=request.user, slug=slug
+    )
+    etag, last_modified = get_note_validators(request, note)
+    response = not_modified(request, etag, last_modified) or TemplateResponse(
+        request, 'notes/detail.html', {'note': note, 'object': note}
+    )
+    return set_validators(response, etag, last_modified)
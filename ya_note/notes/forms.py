@@ -1,5 +1,3 @@
-from pytils.translit import slugify
-
 from django import forms
 from django.core.exceptions import ValidationError
 
@@ -15,15 +13,19 @@ class NoteForm(forms.ModelForm):
         model = Note
         fields = ('title', 'text', 'slug')
 
-    def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
-        if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
-                slug=slug
-        ).exclude(id=self.instance.pk).exists():
-            raise ValidationError(slug + WARNING)
-        return slug
+    def validate_unique(self):
+        """
+        Уникальность slug проверяет уникальный индекс при сохранении.
+
+        Отдельный запрос на проверку не защищает от гонки параллельных
+        запросов, поэтому его не делаем (см. add_slug_error).
+        """
+        exclude = self._get_validation_exclusions() + ['slug']
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except ValidationError as error:
+            self._update_errors(error)
+
+    def add_slug_error(self):
+        """Ошибка формы для slug, который оказался занят."""
+        self.add_error('slug', self.cleaned_data['slug'] + WARNING)
@@ -0,0 +1,42 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.archive import export_jsonl, export_markdown_zip
+
+
+class Command(BaseCommand):
+    help = 'Выгружает заметки пользователя в JSON Lines или zip с Markdown.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help='Путь к файлу или "-" для stdout.')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'zip'), default='jsonl'
+        )
+
+    def handle(self, *args, username, path, format, **options):
+        try:
+            author = get_user_model().objects.get(username=username)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'Пользователь {username} не найден.')
+        if format == 'zip':
+            chunks = export_markdown_zip(author)
+            if path == '-':
+                self.write_chunks(chunks, sys.stdout.buffer)
+                return
+            with open(path, 'wb') as output:
+                self.write_chunks(chunks, output)
+            return
+        chunks = export_jsonl(author)
+        if path == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(path, 'w', encoding='utf-8') as output:
+            self.write_chunks(chunks, output)
+
+    def write_chunks(self, chunks, output):
+        for chunk in chunks:
+            output.write(chunk)
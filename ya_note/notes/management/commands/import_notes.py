@@ -0,0 +1,33 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.archive import import_notes
+
+
+class Command(BaseCommand):
+    help = 'Загружает заметки пользователя из файла JSON Lines (или stdin).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help='Путь к файлу или "-" для stdin.')
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, username, path, batch_size, **options):
+        try:
+            author = get_user_model().objects.get(username=username)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'Пользователь {username} не найден.')
+        if path == '-':
+            report = import_notes(author, sys.stdin, batch_size)
+        else:
+            with open(path, encoding='utf-8') as lines:
+                report = import_notes(author, lines, batch_size)
+        for error in report.errors:
+            self.stderr.write(f'Строка {error.line}: {error.error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено заметок: {report.created}, '
+            f'сменили slug: {report.renamed}, '
+            f'ошибок: {len(report.errors)}'
+        ))
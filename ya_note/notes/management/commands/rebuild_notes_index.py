@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from notes.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс заметок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, database, **options):
+        backend = get_backend(database)
+        backend.rebuild(database)
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс перестроен ({type(backend).__name__}).'
+        ))
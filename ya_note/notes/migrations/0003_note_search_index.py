@@ -0,0 +1,43 @@
+# Generated by Django 3.2.15 on 2026-10-18 17:20
+
+from django.db import migrations
+
+FTS_TABLE = 'notes_note_fts'
+
+
+def has_fts5(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return ('ENABLE_FTS5',) in cursor.fetchall()
+
+
+def create_search_table(apps, schema_editor):
+    if not has_fts5(schema_editor.connection):
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+        'title, text, author_id UNINDEXED, '
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        f'INSERT INTO {FTS_TABLE} (rowid, title, text, author_id) '
+        'SELECT id, title, text, author_id FROM notes_note'
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if has_fts5(schema_editor.connection):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0002_note_created'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
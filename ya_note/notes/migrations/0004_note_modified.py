@@ -0,0 +1,24 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0003_note_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='modified',
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                verbose_name='Дата изменения'
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -1,7 +1,19 @@
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
 
-from pytils.translit import slugify
+from .slugs import allocate_slugs
+
+# Сколько раз Note.save подбирает slug заново, если его успели занять.
+SLUG_ATTEMPTS = 10
+
+
+class NoteQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Заметкам без slug подбираются уникальные slug до вставки."""
+        objs = list(objs)
+        allocate_slugs(objs, using=self.db)
+        return super().bulk_create(objs, *args, **kwargs)
 
 
 class Note(models.Model):
@@ -27,12 +39,37 @@ class Note(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+    modified = models.DateTimeField('Дата изменения', auto_now=True)
+
+    objects = NoteQuerySet.as_manager()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('author', 'created'),
+                name='note_author_created_idx',
+            ),
+        )
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        """
+        Пустой slug заполняется уникальным значением из заголовка.
+
+        Если между подбором и вставкой slug занял параллельный запрос,
+        уникальный индекс вернёт IntegrityError и slug подбирается снова.
+        """
+        if self.slug:
+            return super().save(*args, **kwargs)
+        for attempt in range(1, SLUG_ATTEMPTS + 1):
+            allocate_slugs([self], using=kwargs.get('using'))
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                self.slug = ''
+                if attempt == SLUG_ATTEMPTS:
+                    raise
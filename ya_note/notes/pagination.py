@@ -0,0 +1,48 @@
+"""Постраничный вывод заметок по ключу (created, id), от новых к старым."""
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from django.db.models import Q
+
+
+def encode_cursor(note):
+    """Курсор, указывающий на последнюю показанную заметку."""
+    raw = f'{note.created.isoformat()}|{note.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор обратно в пару (created, id)."""
+    try:
+        raw = base64.urlsafe_b64decode(
+            cursor + '=' * (-len(cursor) % 4)
+        ).decode()
+        created, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created), int(pk)
+    except (ValueError, UnicodeDecodeError) as error:
+        raise BadRequest('Некорректный курсор.') from error
+
+
+def get_note_page(notes, cursor=None):
+    """
+    Возвращает страницу заметок и курсор следующей страницы.
+
+    Выборка идёт по индексу (author, created), поэтому глубина
+    пролистывания не влияет на стоимость запроса.
+    """
+    size = settings.NOTE_COUNT_ON_LIST_PAGE
+    notes = notes.order_by('-created', '-pk')
+    if cursor:
+        created, pk = decode_cursor(cursor)
+        # Лишнее условие created <= created даёт SQLite переход по
+        # индексу сразу к курсору: по одному OR он читает заметки с начала.
+        notes = notes.filter(
+            Q(created__lt=created) | Q(created=created, pk__lt=pk),
+            created__lte=created,
+        )
+    notes = list(notes[:size + 1])
+    if len(notes) > size:
+        return notes[:size], encode_cursor(notes[size - 1])
+    return notes, None
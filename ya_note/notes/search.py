@@ -0,0 +1,244 @@
+"""
+Полнотекстовый поиск по заметкам.
+
+Основной движок - виртуальная таблица SQLite FTS5 notes_note_fts,
+запасной для разработки и тестов - инвертированный индекс в памяти
+процесса. Оба обновляются сигналами post_save/post_delete модели Note
+(см. notes.signals) в базе записи, поэтому и поиск идёт туда, а не на
+реплику.
+"""
+import bisect
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import connections, router
+from django.dispatch import receiver
+
+from .models import Note
+
+FTS_TABLE = 'notes_note_fts'
+TOKEN_RE = re.compile(r'\w+')
+# Во сколько раз совпадение в заголовке весомее совпадения в тексте.
+TITLE_WEIGHT = 10.0
+
+
+def tokenize(text):
+    """Слова текста в нижнем регистре."""
+    return TOKEN_RE.findall(text.lower())
+
+
+def fts5_available(using):
+    """Есть ли в базе using поддержка FTS5."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return ('ENABLE_FTS5',) in cursor.fetchall()
+
+
+class Fts5Backend:
+    """Поиск через SQLite FTS5 с ранжированием bm25."""
+
+    def index(self, note, using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [note.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, text, author_id) '
+                'VALUES (%s, %s, %s, %s)',
+                [note.pk, note.title, note.text, note.author_id]
+            )
+
+    def index_many(self, rows, using):
+        """Добавляет новые заметки строками (pk, author_id, title, text)."""
+        with connections[using].cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, author_id, title, text) '
+                'VALUES (%s, %s, %s, %s)',
+                list(rows)
+            )
+
+    def remove(self, pk, using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+
+    def rebuild(self, using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, text, author_id) '
+                f'SELECT id, title, text, author_id '
+                f'FROM {Note._meta.db_table}'
+            )
+
+    def search(self, author_id, query, limit, using):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # Каждое слово запроса ищется как префикс.
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND author_id = %s '
+                f'ORDER BY bm25({FTS_TABLE}, %s, 1.0) LIMIT %s',
+                [match, author_id, TITLE_WEIGHT, limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class InvertedIndexBackend:
+    """
+    Инвертированный индекс в памяти процесса.
+
+    Строится из базы при первом поиске и дальше обновляется сигналами
+    этого процесса: правки из других воркеров он не видит, поэтому
+    подходит только для разработки и тестов в одном процессе.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        self._terms = []
+        self._loaded = False
+
+    def _add(self, pk, author_id, title, text):
+        weights = Counter()
+        for token in tokenize(title):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(text):
+            weights[token] += 1
+        for term, weight in weights.items():
+            if term not in self._postings:
+                bisect.insort(self._terms, term)
+            self._postings[term][pk] = weight
+        self._documents[pk] = (author_id, tuple(weights))
+
+    def _remove(self, pk):
+        _, terms = self._documents.pop(pk, (None, ()))
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(pk, None)
+            # Слова без заметок не копятся в словаре и префиксном поиске.
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect.bisect_left(self._terms, term)]
+
+    def _ensure_loaded(self, using):
+        if not self._loaded:
+            self.rebuild(using)
+
+    def index(self, note, using):
+        with self._lock:
+            if self._loaded:
+                self._remove(note.pk)
+                self._add(note.pk, note.author_id, note.title, note.text)
+
+    def index_many(self, rows, using):
+        with self._lock:
+            if self._loaded:
+                for pk, author_id, title, text in rows:
+                    self._remove(pk)
+                    self._add(pk, author_id, title, text)
+
+    def remove(self, pk, using):
+        with self._lock:
+            self._remove(pk)
+
+    def rebuild(self, using):
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._terms.clear()
+            notes = Note.objects.using(using).values_list(
+                'pk', 'author_id', 'title', 'text'
+            )
+            for pk, author_id, title, text in notes.iterator():
+                self._add(pk, author_id, title, text)
+            self._loaded = True
+
+    def _prefix_terms(self, prefix):
+        start = bisect.bisect_left(self._terms, prefix)
+        for term in self._terms[start:]:
+            if not term.startswith(prefix):
+                break
+            yield term
+
+    def search(self, author_id, query, limit, using):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self._lock:
+            self._ensure_loaded(using)
+            total = len(self._documents) or 1
+            scores = None
+            for token in tokens:
+                token_scores = Counter()
+                for term in self._prefix_terms(token):
+                    postings = self._postings[term]
+                    idf = math.log(1 + total / (len(postings) or 1))
+                    for pk, weight in postings.items():
+                        if self._documents[pk][0] == author_id:
+                            token_scores[pk] += weight * idf
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = Counter({
+                        pk: score + token_scores[pk]
+                        for pk, score in scores.items() if pk in token_scores
+                    })
+            return [pk for pk, _ in scores.most_common(limit)]
+
+
+BACKENDS = {
+    'fts5': Fts5Backend,
+    'memory': InvertedIndexBackend,
+}
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(using):
+    """Движок поиска для базы using согласно NOTES_SEARCH_BACKEND."""
+    with _backends_lock:
+        if using not in _backends:
+            name = settings.NOTES_SEARCH_BACKEND
+            if name == 'auto':
+                name = 'fts5' if fts5_available(using) else 'memory'
+            elif name == 'fts5' and not fts5_available(using):
+                raise ImproperlyConfigured(
+                    f'NOTES_SEARCH_BACKEND = "fts5", но в базе {using} '
+                    'нет FTS5.'
+                )
+            _backends[using] = BACKENDS[name]()
+        return _backends[using]
+
+
+@receiver(setting_changed)
+def reset_backends(setting, **kwargs):
+    """Сбрасываем выбранные движки при смене настройки в тестах."""
+    if setting == 'NOTES_SEARCH_BACKEND':
+        with _backends_lock:
+            _backends.clear()
+
+
+def search_notes(author, query, limit=None):
+    """Заметки автора, подходящие под запрос, от лучших к худшим."""
+    # Сигналы обновляют индекс только в базе записи: индекс реплики
+    # в памяти отстал бы навсегда.
+    using = router.db_for_write(Note)
+    pks = get_backend(using).search(
+        author.pk, query, limit or settings.NOTE_SEARCH_RESULTS, using
+    )
+    notes = Note.objects.using(using).only(
+        'id', 'title', 'slug'
+    ).in_bulk(pks)
+    return [notes[pk] for pk in pks if pk in notes]
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Note
+from .search import get_backend
+
+
+@receiver(post_save, sender=Note)
+def index_note(sender, instance, using, **kwargs):
+    """Обновляем заметку в поисковом индексе."""
+    get_backend(using).index(instance, using)
+
+
+@receiver(post_delete, sender=Note)
+def remove_note_from_index(sender, instance, using, **kwargs):
+    """Удаляем заметку из поискового индекса."""
+    get_backend(using).remove(instance.pk, using)
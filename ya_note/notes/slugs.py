@@ -0,0 +1,95 @@
+"""Подбор уникальных slug для заметок."""
+from collections import Counter
+from itertools import chain
+from string import ascii_lowercase, digits
+
+from django.db import router
+from django.utils.crypto import get_random_string
+from pytils.translit import slugify
+
+DEFAULT_SLUG = 'note'
+# Сколько вариантов с суффиксом проверяется на основу сверх заметок
+# пачки с этой основой.
+SLUG_CANDIDATES = 10
+# Сколько slug проверяется одним запросом: SQLite ограничивает число
+# параметров.
+SLUGS_PER_QUERY = 900
+RANDOM_SUFFIX_LENGTH = 8
+
+
+def get_base_slug(note):
+    """Желаемый slug: указанный пользователем или из заголовка."""
+    max_length = note._meta.get_field('slug').max_length
+    return (note.slug or slugify(note.title) or DEFAULT_SLUG)[:max_length]
+
+
+def add_suffix(base, number, max_length):
+    """Вариант slug с суффиксом, не длиннее max_length."""
+    suffix = f'-{number}'
+    return base[:max_length - len(suffix)] + suffix
+
+
+def get_candidates(base, count, max_length):
+    """Основа и варианты base-2 ... base-(count + 1)."""
+    return [base] + [
+        add_suffix(base, number, max_length)
+        for number in range(2, count + 2)
+    ]
+
+
+def get_taken_slugs(model, slugs, exclude_pks=(), using=None):
+    """
+    Какие из slug уже заняты.
+
+    Проверяются только точные значения через slug__in по уникальному
+    индексу, поэтому число прочитанных строк не больше числа slug,
+    сколько бы заметок ни начиналось с той же основы.
+    """
+    slugs = sorted(set(slugs))
+    taken = set()
+    for start in range(0, len(slugs), SLUGS_PER_QUERY):
+        taken.update(
+            model.objects.using(using).filter(
+                slug__in=slugs[start:start + SLUGS_PER_QUERY]
+            ).exclude(pk__in=exclude_pks).values_list('slug', flat=True)
+        )
+    return taken
+
+
+def allocate_slugs(notes, resolve_conflicts=False, using=None):
+    """
+    Назначает заметкам уникальные slug.
+
+    Slug получают заметки без slug, а при resolve_conflicts и заметки,
+    чей slug уже занят: к основе добавляется первый свободный суффикс
+    из SLUG_CANDIDATES вариантов, а если заняты все - случайный.
+    Совпадение случайного суффикса ловит уникальный индекс, и вызывающий
+    код подбирает slug заново. Варианты всей пачки проверяются одним
+    запросом (на каждые SLUGS_PER_QUERY slug) к базе для записи, чтобы
+    не опираться на отстающую реплику.
+    """
+    notes = [note for note in notes if resolve_conflicts or not note.slug]
+    if not notes:
+        return
+    model = type(notes[0])
+    using = using or router.db_for_write(model)
+    max_length = model._meta.get_field('slug').max_length
+    bases = [get_base_slug(note) for note in notes]
+    candidates = {
+        base: get_candidates(base, total + SLUG_CANDIDATES, max_length)
+        for base, total in Counter(bases).items()
+    }
+    taken = get_taken_slugs(
+        model, list(chain.from_iterable(candidates.values())),
+        [note.pk for note in notes if note.pk], using
+    )
+    for note, base in zip(notes, bases):
+        slug = next(
+            (slug for slug in candidates[base] if slug not in taken), None
+        )
+        if slug is None:
+            slug = add_suffix(base, get_random_string(
+                RANDOM_SUFFIX_LENGTH, ascii_lowercase + digits
+            ), max_length)
+        taken.add(slug)
+        note.slug = slug
@@ -0,0 +1,139 @@
+"""
+Генераторы больших наборов данных и замеры адресов с базовой линией.
+
+Базовая линия хранится в baselines.json рядом и перезаписывается при
+BENCH_UPDATE_BASELINES=1; замер хуже базовой линии больше чем на
+BENCH_THRESHOLD считается регрессией.
+"""
+import json
+import os
+import random
+import statistics
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from notes.models import Note
+
+User = get_user_model()
+
+NOTES_PER_USER = int(os.getenv('NOTES_BENCH_SIZE', 50000))
+BATCH_SIZE = 5000
+TEXT = 'Текст заметки, достаточно длинный, чтобы его было дорого читать. ' * 20
+ALPHABET = 'абвгдежзиклмнопрстуфхцчшщэюя'
+
+BASELINES = Path(__file__).with_name('baselines.json')
+REQUESTS = int(os.getenv('BENCH_REQUESTS', 200))
+WARMUP = 10
+THRESHOLD = float(os.getenv('BENCH_THRESHOLD', 0.25))
+UPDATE_BASELINES = os.getenv('BENCH_UPDATE_BASELINES') == '1'
+
+
+def make_vocabulary(size, seed=0):
+    """Словарь случайных слов для текстов заметок."""
+    rng = random.Random(seed)
+    return [
+        ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(3, 9)))
+        for _ in range(size)
+    ]
+
+
+def create_notes(author, count, prefix=None, vocabulary=None, seed=0):
+    """
+    Массово создаёт count заметок пользователя.
+
+    С vocabulary заголовки и тексты составляются из случайных слов
+    словаря, иначе все заметки получают одинаковый текст.
+    """
+    prefix = prefix or f'{author.username}-note'
+    rng = random.Random(seed)
+
+    def words(count):
+        return ' '.join(rng.choices(vocabulary, k=count))
+
+    for start in range(0, count, BATCH_SIZE):
+        Note.objects.bulk_create(
+            Note(
+                title=words(4) if vocabulary else f'Заметка {index}',
+                text=words(40) if vocabulary else TEXT,
+                author=author,
+                slug=f'{prefix}-{index}',
+            )
+            for index in range(start, min(start + BATCH_SIZE, count))
+        )
+
+
+class LargeNoteSetCase(TestCase):
+    """Пользователь с NOTES_PER_USER заметками и его сосед."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание данных на уровне класса."""
+        cls.author = User.objects.create(username='power-user')
+        cls.neighbour = User.objects.create(username='neighbour')
+        create_notes(cls.author, NOTES_PER_USER)
+        create_notes(cls.neighbour, NOTES_PER_USER // 10)
+
+
+def measure(send, requests=REQUESTS):
+    """Запросов в секунду, медиана и p99 задержки последовательных вызовов."""
+    for _ in range(WARMUP):
+        send()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        sent = time.perf_counter()
+        send()
+        latencies.append(time.perf_counter() - sent)
+    total = time.perf_counter() - start
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        'rps': round(requests / total, 1),
+        'p50_ms': round(quantiles[49] * 1000, 2),
+        'p99_ms': round(quantiles[98] * 1000, 2),
+    }
+
+
+def check_baselines(size, results):
+    """
+    Сравнивает замеры с базовой линией и возвращает регрессии.
+
+    Сравниваются запросы в секунду и медиана: p99 на сотнях запросов
+    слишком шумный. Базовая линия другого размера набора не сравнивается.
+    """
+    if UPDATE_BASELINES:
+        BASELINES.write_text(
+            json.dumps(
+                {'size': size, 'urls': results}, indent=2, ensure_ascii=False
+            ) + '\n',
+            encoding='utf-8'
+        )
+        return []
+    if not BASELINES.exists():
+        return []
+    baselines = json.loads(BASELINES.read_text(encoding='utf-8'))
+    if baselines['size'] != size:
+        return []
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines['urls'].get(name)
+        if baseline is None:
+            continue
+        if (
+            result['p50_ms'] > baseline['p50_ms'] * (1 + THRESHOLD)
+            or result['rps'] < baseline['rps'] / (1 + THRESHOLD)
+        ):
+            regressions.append(f'{name}: {result}, было {baseline}')
+    return regressions
+
+
+def report(size, results):
+    """Таблица замеров в вывод теста."""
+    print(f'\n{size} заметок, {REQUESTS} запросов на адрес')
+    for name, result in results.items():
+        print(
+            f'{name:<16} {result["rps"]:>8} rps  '
+            f'p50 {result["p50_ms"]:>8} мс  p99 {result["p99_ms"]:>8} мс'
+        )
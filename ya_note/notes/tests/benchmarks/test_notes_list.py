@@ -0,0 +1,45 @@
+"""Замеры списка заметок на большом наборе данных."""
+import timeit
+
+import pytest
+from django.test import Client
+
+from notes.models import Note
+from notes.pagination import encode_cursor
+from ..core import NOTE_LIST_URL
+from .core import LargeNoteSetCase, NOTES_PER_USER
+
+REPEAT = 5
+# Во сколько раз глубокая страница может быть дороже первой.
+DEEP_PAGE_TOLERANCE = 2
+
+
+@pytest.mark.benchmark
+class NotesListBenchmark(LargeNoteSetCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def measure(self, action):
+        return min(timeit.repeat(action, number=1, repeat=REPEAT))
+
+    def test_list_pages(self):
+        """Первая и глубокая страницы не дороже друг друга."""
+        deep_note = Note.objects.filter(author=self.author).order_by(
+            'created', 'pk'
+        )[100]
+        deep_cursor = encode_cursor(deep_note)
+        first_page = self.measure(lambda: self.client.get(NOTE_LIST_URL))
+        deep_page = self.measure(
+            lambda: self.client.get(NOTE_LIST_URL, {'cursor': deep_cursor})
+        )
+        full_list = self.measure(
+            lambda: list(Note.objects.filter(author=self.author))
+        )
+        print(
+            f'\n{NOTES_PER_USER} заметок: первая страница {first_page:.4f} с, '
+            f'глубокая {deep_page:.4f} с, весь список {full_list:.4f} с'
+        )
+        self.assertLess(first_page, full_list)
+        self.assertLess(deep_page, first_page * DEEP_PAGE_TOLERANCE)
@@ -0,0 +1,87 @@
+"""Замеры поиска по заметкам на большом наборе данных."""
+import os
+import random
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.test import TestCase
+
+from notes.search import Fts5Backend, InvertedIndexBackend
+from .core import create_notes, make_vocabulary
+
+User = get_user_model()
+
+NOTES_COUNT = int(os.getenv('NOTES_SEARCH_BENCH_SIZE', 1000000))
+# Индекс в памяти рассчитан на небольшие базы, больше не меряем.
+MEMORY_NOTES_LIMIT = 100000
+VOCABULARY_SIZE = 50000
+QUERIES = 200
+LIMIT = 50
+
+
+def percentile(timings, share):
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(len(timings) * share))]
+
+
+@pytest.mark.benchmark
+class SearchBenchmark(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание данных на уровне класса."""
+        cls.vocabulary = make_vocabulary(VOCABULARY_SIZE)
+        cls.authors = [
+            User.objects.create(username=f'user-{index}')
+            for index in range(10)
+        ]
+        per_author = NOTES_COUNT // len(cls.authors)
+        for author in cls.authors:
+            create_notes(
+                author, per_author, vocabulary=cls.vocabulary,
+                seed=author.pk
+            )
+
+    def measure(self, backend):
+        rng = random.Random(1)
+        timings = []
+        for _ in range(QUERIES):
+            author = rng.choice(self.authors)
+            query = ' '.join(
+                word[:rng.randint(3, len(word))]
+                for word in rng.sample(self.vocabulary, rng.randint(1, 2))
+            )
+            start = time.perf_counter()
+            backend.search(author.pk, query, LIMIT, DEFAULT_DB_ALIAS)
+            timings.append(time.perf_counter() - start)
+        return percentile(timings, 0.5), percentile(timings, 0.99)
+
+    def test_fts5_latency(self):
+        """Поиск через FTS5 на полном наборе."""
+        backend = Fts5Backend()
+        start = time.perf_counter()
+        backend.rebuild(DEFAULT_DB_ALIAS)
+        rebuild = time.perf_counter() - start
+        p50, p99 = self.measure(backend)
+        print(
+            f'\nFTS5, {NOTES_COUNT} заметок: перестроение {rebuild:.1f} с, '
+            f'p50 {p50 * 1000:.1f} мс, p99 {p99 * 1000:.1f} мс'
+        )
+
+    @pytest.mark.skipif(
+        NOTES_COUNT > MEMORY_NOTES_LIMIT,
+        reason='индекс в памяти меряется до 100 000 заметок'
+    )
+    def test_memory_latency(self):
+        """Поиск через индекс в памяти."""
+        backend = InvertedIndexBackend()
+        start = time.perf_counter()
+        backend.rebuild(DEFAULT_DB_ALIAS)
+        rebuild = time.perf_counter() - start
+        p50, p99 = self.measure(backend)
+        print(
+            f'\nПамять, {NOTES_COUNT} заметок: перестроение {rebuild:.1f} с, '
+            f'p50 {p50 * 1000:.1f} мс, p99 {p99 * 1000:.1f} мс'
+        )
@@ -0,0 +1,38 @@
+"""Подбор slug, когда основу разделяет большой набор заметок."""
+import timeit
+
+import pytest
+from django.db import transaction
+
+from notes.models import Note
+from .core import LargeNoteSetCase, NOTES_PER_USER
+
+REPEAT = 5
+# Во сколько раз заметка с занятой основой может быть дороже новой.
+SHARED_PREFIX_TOLERANCE = 2
+
+
+@pytest.mark.benchmark
+class SlugBenchmark(LargeNoteSetCase):
+
+    def measure(self, title):
+        """Создание заметки без slug, откатываемое после замера."""
+        def create():
+            with transaction.atomic():
+                Note.objects.create(
+                    title=title, text='Текст', author=self.author
+                )
+                transaction.set_rollback(True)
+
+        return min(timeit.repeat(create, number=1, repeat=REPEAT))
+
+    def test_shared_prefix(self):
+        """Занятая основа не заставляет читать все заметки с ней."""
+        # Все заметки автора - power-user-note-<n>.
+        shared = self.measure(f'{self.author.username}-note')
+        unique = self.measure('Совсем новая заметка')
+        print(
+            f'\n{NOTES_PER_USER} заметок с общей основой: '
+            f'{shared * 1000:.2f} мс, новая основа {unique * 1000:.2f} мс'
+        )
+        self.assertLess(shared, unique * SHARED_PREFIX_TOLERANCE)
@@ -0,0 +1,81 @@
+"""Пропускная способность и задержка всех адресов notes.urls."""
+import json
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+
+from notes.models import Note
+from notes.urls import app_name, urlpatterns
+from .core import (
+    LargeNoteSetCase, NOTES_PER_USER, check_baselines, measure, report
+)
+
+# Выгрузка читает все заметки пользователя, её меряем на соседе и реже.
+EXPORT_REQUESTS = 20
+
+
+@pytest.mark.benchmark
+class UrlsBenchmark(LargeNoteSetCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание данных на уровне класса."""
+        super().setUpTestData()
+        call_command('rebuild_notes_index', verbosity=0)
+        cls.note = Note.objects.filter(author=cls.author).latest('pk')
+
+    def get_requests(self):
+        """Запрос к каждому адресу: клиент, метод, адрес и параметры."""
+        client = Client()
+        client.force_login(self.author)
+        neighbour_client = Client()
+        neighbour_client.force_login(self.neighbour)
+        slug = (self.note.slug,)
+        return {
+            'home': (Client().get, reverse('notes:home'), {}),
+            'add': (client.get, reverse('notes:add'), {}),
+            'edit': (client.get, reverse('notes:edit', args=slug), {}),
+            'detail': (client.get, reverse('notes:detail', args=slug), {}),
+            'delete': (client.get, reverse('notes:delete', args=slug), {}),
+            'list': (client.get, reverse('notes:list'), {}),
+            'success': (client.get, reverse('notes:success'), {}),
+            'search': (
+                client.get, reverse('notes:search'),
+                {'data': {'q': 'заметка'}}
+            ),
+            'export': (
+                neighbour_client.get, reverse('notes:export'),
+                {'data': {'format': 'jsonl'}}
+            ),
+            'import': (
+                client.post, reverse('notes:import'), {
+                    'data': json.dumps({'title': 'Загружена', 'text': 'Т'}),
+                    'content_type': 'application/x-ndjson',
+                }
+            ),
+        }
+
+    def test_urls_throughput(self):
+        """Каждый адрес на большом наборе не хуже базовой линии."""
+        requests = self.get_requests()
+        self.assertEqual(
+            set(requests), {pattern.name for pattern in urlpatterns},
+            f'У каждого адреса {app_name}.urls должен быть замер'
+        )
+        results = {}
+        for name, (method, url, kwargs) in requests.items():
+            def send():
+                response = method(url, **kwargs)
+                self.assertEqual(response.status_code, HTTPStatus.OK, name)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            if name == 'export':
+                results[f'{app_name}:{name}'] = measure(send, EXPORT_REQUESTS)
+            else:
+                results[f'{app_name}:{name}'] = measure(send)
+        report(NOTES_PER_USER, results)
+        regressions = check_baselines(NOTES_PER_USER, results)
+        self.assertFalse(regressions, '\n'.join(regressions))
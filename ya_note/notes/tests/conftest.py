@@ -0,0 +1,95 @@
+"""Общая тестовая база для запуска через pytest и pytest-xdist."""
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import django
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+
+TEMPLATE_ALIAS = 'test_template'
+
+# Продакшен-настройки без ключа не загружаются, а тесты их импортируют.
+os.environ.setdefault('DJANGO_SECRET_KEY', 'test-secret-key')
+
+
+def get_template_path():
+    """
+    Файл шаблона тестовой базы.
+
+    Имя зависит от миграций проекта и версий Django и SQLite, поэтому
+    новая миграция сама приводит к новому шаблону.
+    """
+    digest = hashlib.sha256(
+        f'{django.get_version()} {sqlite3.sqlite_version}'.encode()
+    )
+    for path in sorted(Path(settings.BASE_DIR).glob('*/migrations/*.py')):
+        digest.update(path.read_bytes())
+    return Path(tempfile.gettempdir()) / (
+        f'yanote-test-{digest.hexdigest()[:16]}.sqlite3'
+    )
+
+
+def build_template(path):
+    """Применяет миграции к отдельному файлу и атомарно кладёт его в path."""
+    building = path.with_suffix(f'.{os.getpid()}.tmp')
+    connections.databases[TEMPLATE_ALIAS] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': building,
+    }
+    try:
+        call_command('migrate', database=TEMPLATE_ALIAS, verbosity=0)
+    finally:
+        connections[TEMPLATE_ALIAS].close()
+        del connections[TEMPLATE_ALIAS]
+        del connections.databases[TEMPLATE_ALIAS]
+    os.replace(building, path)
+
+
+def create_database(alias, path):
+    """Подключает под alias новую базу в файле path, копию шаблона."""
+    shutil.copyfile(get_template_path(), path)
+    connections.databases[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+    }
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(request, django_test_environment, django_db_blocker):
+    """
+    Тестовая база в памяти, скопированная из шаблона.
+
+    Миграции применяются один раз к файлу шаблона, который переживает
+    запуски и общий у процессов pytest-xdist, а каждый процесс только
+    копирует его в свою базу в памяти через backup SQLite.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    template = get_template_path()
+    with django_db_blocker.unblock():
+        if not template.exists():
+            build_template(template)
+        old_name = connection.settings_dict['NAME']
+        old_settings_name = settings.DATABASES[DEFAULT_DB_ALIAS]['NAME']
+        test_name = connection.creation._get_test_db_name()
+        connection.close()
+        settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'] = test_name
+        connection.settings_dict['NAME'] = test_name
+        connection.ensure_connection()
+        source = sqlite3.connect(template)
+        try:
+            source.backup(connection.connection)
+        finally:
+            source.close()
+    yield
+    with django_db_blocker.unblock():
+        connection.close()
+        connection.creation._destroy_test_db(test_name, verbosity=0)
+        # Имя базы меняли вручную в двух местах - в обоих и возвращаем.
+        settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'] = old_settings_name
+        connection.settings_dict['NAME'] = old_name
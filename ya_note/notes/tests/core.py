@@ -1,5 +1,13 @@
 """Модуль с общими данными для тестов."""
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+from urllib.parse import urlencode
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
 from django.contrib.auth import get_user_model
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connections
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -19,14 +27,89 @@ LOGOUT_URL = reverse('users:logout')
 NOTE_LIST_URL = reverse('notes:list')
 NOTES_ADD_URL = reverse('notes:add')
 NOTE_SUCCESS = reverse('notes:success')
+NOTES_SEARCH_URL = reverse('notes:search')
+NOTES_EXPORT_URL = reverse('notes:export')
+NOTES_IMPORT_URL = reverse('notes:import')
+METRICS_URL = reverse('metrics')
 ADD_REDIRECT_URL = f'{LOGIN_URL}?next={NOTES_ADD_URL}'
 SUCCESS_REDIRECT_URL = f'{LOGIN_URL}?next={NOTE_SUCCESS}'
 LIST_REDIRECT_URL = f'{LOGIN_URL}?next={NOTE_LIST_URL}'
+SEARCH_REDIRECT_URL = f'{LOGIN_URL}?next={NOTES_SEARCH_URL}'
+EXPORT_REDIRECT_URL = f'{LOGIN_URL}?next={NOTES_EXPORT_URL}'
 DETAIL_REDIRECT_URL = f'{LOGIN_URL}?next={NOTES_DETAIL_URL}'
 EDIT_REDIRECT_URL = f'{LOGIN_URL}?next={NOTES_EDIT_URL}'
 DELETE_REDIRECT_URL = f'{LOGIN_URL}?next={NOTES_DELETE_URL}'
 
 
+def get_query_plan(sql):
+    """План SQLite для уже выполненного запроса."""
+    with connections['default'].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return ' '.join(row[-1] for row in cursor.fetchall())
+
+
+def write_at_once(alias, writers, write):
+    """
+    Запускает write(number) в writers потоках разом.
+
+    Каждый поток закрывает своё соединение с alias. Возвращает список
+    результатов write.
+    """
+    barrier = Barrier(writers)
+
+    def writer(number):
+        barrier.wait()
+        try:
+            return write(number)
+        finally:
+            connections[alias].close()
+
+    with ThreadPoolExecutor(max_workers=writers) as executor:
+        return list(executor.map(writer, range(writers)))
+
+
+def asgi_get(client, path, data=None):
+    """
+    GET через ASGI-приложение проекта с cookie клиента.
+
+    Возвращает статус и тело ответа. Как и тестовый клиент, не даёт
+    сигналам запроса закрыть соединение с базой, в транзакции которой
+    идёт тест.
+    """
+    from yanote.asgi import application
+
+    cookies = '; '.join(
+        f'{name}={morsel.value}' for name, morsel in client.cookies.items()
+    )
+
+    async def get():
+        communicator = ApplicationCommunicator(application, {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': urlencode(data or {}).encode(),
+            'headers': [
+                (b'host', b'testserver'), (b'cookie', cookies.encode())
+            ],
+        })
+        await communicator.send_input({'type': 'http.request'})
+        start = await communicator.receive_output()
+        body = []
+        while True:
+            message = await communicator.receive_output()
+            body.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return start['status'], b''.join(body)
+
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    try:
+        return async_to_sync(get)()
+    finally:
+        request_started.connect(close_old_connections)
+        request_finished.connect(close_old_connections)
+
+
 class ClientNoteCreation(TestCase):
     """Базовый класс для тестов."""
 
@@ -61,5 +144,3 @@ class ClientNoteCreation(TestCase):
                 )
                 for index in range(10)
             )
-
-    
@@ -1,12 +1,27 @@
 """Модуль проверки контента приложения."""
 from http import HTTPStatus
+from importlib import import_module, reload
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches
 
 from notes.forms import NoteForm
+from notes.models import Note
+from notes.pagination import encode_cursor, get_note_page
+from notes.search import get_backend
 from .core import (
-    ClientNoteCreation, NOTES_ADD_URL,
-    NOTES_EDIT_URL, NOTE_LIST_URL
+    ClientNoteCreation, LIST_REDIRECT_URL, NOTES_ADD_URL, NOTES_DETAIL_URL,
+    NOTES_EDIT_URL, NOTE_LIST_URL, NOTES_SEARCH_URL, get_query_plan
 )
 
+SEARCH_BACKENDS = ('fts5', 'memory')
+
 
 class SingleNoteTests(ClientNoteCreation):
     """Проверки отображения."""
@@ -25,13 +40,32 @@ class SingleNoteTests(ClientNoteCreation):
     def test_author_client_note_list_display(self):
         """Авторизованый пользователь может видеть свои  заметки."""
         response = self.author_client.get(NOTE_LIST_URL)
-        note = response.context['object_list'].get(pk=self.note.pk)
+        note = next(
+            note for note in response.context['object_list']
+            if note.pk == self.note.pk
+        )
         self.assertEqual(response.status_code, HTTPStatus.OK)
         self.assertEqual(self.note.text, note.text)
         self.assertEqual(self.note.title, note.title)
         self.assertEqual(self.note.slug, note.slug)
         self.assertEqual(self.note.author, note.author)
 
+    def test_detail_not_modified(self):
+        """Страница заметки отвечает 304, пока заметка не изменилась."""
+        etag = self.author_client.get(NOTES_DETAIL_URL)['ETag']
+        with self.assertNumQueries(3):
+            response = self.author_client.get(
+                NOTES_DETAIL_URL, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.note.text = 'Новый текст'
+        self.note.save()
+        response = self.author_client.get(
+            NOTES_DETAIL_URL, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
     def test_authorized_client_has_form(self):
         """Проверка формы авторизованного пользователя."""
         for url in (NOTES_ADD_URL, NOTES_EDIT_URL):
@@ -39,3 +73,171 @@ class SingleNoteTests(ClientNoteCreation):
                 response = self.author_client.get(url)
                 self.assertIn('form', response.context)
                 self.assertIsInstance(response.context['form'], NoteForm)
+
+
+class NoteListTests(ClientNoteCreation):
+    """Проверки постраничного списка заметок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Переопределение данных класса."""
+        super().setUpTestData(note_list_creation=True)
+
+    @override_settings(NOTE_COUNT_ON_LIST_PAGE=3)
+    def test_note_list_is_paginated(self):
+        """Список выводится страницами от новых заметок к старым."""
+        context = self.author_client.get(NOTE_LIST_URL).context
+        notes = list(context['object_list'])
+        self.assertEqual(len(notes), 3)
+        while context['next_cursor']:
+            context = self.author_client.get(
+                NOTE_LIST_URL, {'cursor': context['next_cursor']}
+            ).context
+            notes += context['object_list']
+        self.assertEqual(
+            [note.pk for note in notes],
+            list(Note.objects.order_by('-created', '-pk').values_list(
+                'pk', flat=True
+            ))
+        )
+
+    def test_note_page_seeks_to_cursor(self):
+        """Страница по курсору начинается переходом по индексу к курсору."""
+        note = Note.objects.order_by('created', 'pk').first()
+        with CaptureQueriesContext(connection) as context:
+            get_note_page(
+                Note.objects.filter(author=self.author), encode_cursor(note)
+            )
+        plan = get_query_plan(context.captured_queries[-1]['sql'])
+        self.assertIn(
+            'note_author_created_idx (author_id=? AND created<?)', plan
+        )
+
+    def test_note_list_bad_cursor(self):
+        """Испорченный курсор не ломает список."""
+        response = self.author_client.get(NOTE_LIST_URL, {'cursor': '!'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+
+class NoteSearchTests(ClientNoteCreation):
+    """Проверки поиска по заметкам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Переопределение данных класса."""
+        super().setUpTestData()
+        cls.title_match = Note.objects.create(
+            title='Список покупок', text='Хлеб', author=cls.author
+        )
+        cls.text_match = Note.objects.create(
+            title='Дела', text='Купить список книг', author=cls.author
+        )
+        cls.other_note = Note.objects.create(
+            title='Список чужой', text='Текст', author=cls.reader
+        )
+
+    def search(self, query):
+        return list(self.author_client.get(
+            NOTES_SEARCH_URL, {'q': query}
+        ).context['object_list'])
+
+    def test_search(self):
+        """Поиск по префиксу, совпадения в заголовке выше."""
+        for backend in SEARCH_BACKENDS:
+            with self.subTest(backend=backend), override_settings(
+                NOTES_SEARCH_BACKEND=backend
+            ):
+                self.assertEqual(
+                    self.search('спис'), [self.title_match, self.text_match]
+                )
+                self.assertEqual(self.search('книг купить'), [self.text_match])
+                self.assertEqual(self.search('чужой'), [])
+
+    def test_search_index_follows_changes(self):
+        """Индекс обновляется при изменении и удалении заметок."""
+        for backend in SEARCH_BACKENDS:
+            with self.subTest(backend=backend), override_settings(
+                NOTES_SEARCH_BACKEND=backend
+            ):
+                self.search('спис')
+                note = Note.objects.create(
+                    title='Молоко', text='Текст', author=self.author
+                )
+                self.assertEqual(self.search('молоко'), [note])
+                note.title = 'Кефир'
+                note.save()
+                self.assertEqual(self.search('молоко'), [])
+                self.assertEqual(self.search('кефир'), [note])
+                note.delete()
+                self.assertEqual(self.search('кефир'), [])
+
+    @override_settings(NOTES_SEARCH_BACKEND='memory')
+    def test_memory_index_drops_unused_terms(self):
+        """Слова удалённых и изменённых заметок уходят из индекса в памяти."""
+        self.search('спис')
+        backend = get_backend(connection.alias)
+        note = Note.objects.create(
+            title='Молоко', text='Текст', author=self.author
+        )
+        note.title = 'Кефир'
+        note.save()
+        self.assertNotIn('молоко', backend._postings)
+        self.assertNotIn('молоко', backend._terms)
+        note.delete()
+        self.assertNotIn('кефир', backend._postings)
+        self.assertNotIn('кефир', backend._terms)
+
+    def test_rebuild_index(self):
+        """Команда перестраивает индекс."""
+        for backend in SEARCH_BACKENDS:
+            with self.subTest(backend=backend), override_settings(
+                NOTES_SEARCH_BACKEND=backend
+            ):
+                call_command('rebuild_notes_index', stdout=StringIO())
+                self.assertEqual(
+                    self.search('спис'), [self.title_match, self.text_match]
+                )
+
+
+def reload_urlconf():
+    """Перечитывает маршруты после смены NOTES_ASYNC_VIEWS."""
+    reload(import_module('notes.urls'))
+    reload(import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+class AsyncViewsTests(ClientNoteCreation):
+    """Асинхронные список заметок и страница заметки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Переопределение данных класса."""
+        super().setUpTestData(note_creation=True)
+
+    def setUp(self):
+        async_views = override_settings(NOTES_ASYNC_VIEWS=True)
+        async_views.enable()
+        self.addCleanup(reload_urlconf)
+        self.addCleanup(async_views.disable)
+        reload_urlconf()
+
+    def get(self, url, **headers):
+        async def get():
+            return await self.async_client.get(url, **headers)
+        return async_to_sync(get)()
+
+    def test_async_pages(self):
+        """Автор видит свои заметки, аноним уходит на вход."""
+        response = self.get(NOTE_LIST_URL)
+        self.assertRedirects(
+            response, LIST_REDIRECT_URL, fetch_redirect_response=False
+        )
+        self.async_client.force_login(self.author)
+        response = self.get(NOTE_LIST_URL)
+        self.assertEqual(list(response.context['object_list']), [self.note])
+        response = self.get(NOTES_DETAIL_URL)
+        self.assertEqual(response.context['note'], self.note)
+        response = self.get(
+            NOTES_DETAIL_URL, **{'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
@@ -1,14 +1,47 @@
 """Модуль проверки логики приложения."""
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import zipfile
+from importlib import reload
 from http import HTTPStatus
+from pathlib import Path
+from unittest import mock
 
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connections
+from django.template import engines
+from django.test.utils import CaptureQueriesContext
+from django.test import (
+    Client, SimpleTestCase, TransactionTestCase, override_settings
+)
 from pytils.translit import slugify
 
+from notes.archive import BAD_JSON, NOT_AN_OBJECT, import_notes
 from notes.forms import WARNING
 from notes.models import Note
+from notes.search import get_backend, search_notes
+from notes.slugs import SLUG_CANDIDATES, get_taken_slugs
+from yanote.auth import CachedModelBackend
+from yanote.metrics import registry
+from yanote.routers import PIN_COOKIE
+from yanote import settings_production
+from yanote.settings_production import SQLITE_PROFILE, TEMPLATES
+from yanote.warmup import warm_up_templates
 from .core import (
-    ClientNoteCreation, NOTES_ADD_URL, NOTE_SUCCESS,
-    NOTES_EDIT_URL, ADD_REDIRECT_URL, NOTES_DELETE_URL
+    ClientNoteCreation, NOTES_ADD_URL, NOTE_SUCCESS, NOTE_LIST_URL,
+    NOTES_DETAIL_URL, NOTES_EDIT_URL, ADD_REDIRECT_URL, NOTES_DELETE_URL,
+    NOTES_EXPORT_URL, NOTES_IMPORT_URL, METRICS_URL, HOMEPAGE_URL, User,
+    asgi_get, get_query_plan, write_at_once
 )
+from .conftest import create_database
+
+WRITERS = 8
 
 
 class TestNoteCreation(ClientNoteCreation):
@@ -65,6 +98,82 @@ class TestNoteCreation(ClientNoteCreation):
             expected_slug=slugify(self.form_data['title'])
         )
 
+    def test_slug_from_taken_title_gets_suffix(self):
+        """Slug из заголовка получает суффикс, если уже занят."""
+        form = {'title': 'Новая заметка', 'text': 'Текст', 'slug': ''}
+        for _ in range(2):
+            self.author_client.post(NOTES_ADD_URL, form)
+        slug = slugify(form['title'])
+        self.assertEqual(
+            set(Note.objects.filter(title=form['title']).values_list(
+                'slug', flat=True
+            )),
+            {slug, f'{slug}-2'}
+        )
+
+    def test_taken_slugs_use_unique_index(self):
+        """Занятые slug ищутся по уникальному индексу, без обхода таблицы."""
+        with CaptureQueriesContext(connections['default']) as context:
+            Note.objects.create(
+                title='Новая заметка', text='Текст', author=self.author
+            )
+        plan = get_query_plan(next(
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT "notes_note"."slug"')
+        ))
+        self.assertIn('sqlite_autoindex_notes_note_1 (slug=?)', plan)
+        self.assertNotIn('SCAN', plan)
+
+    def test_shared_prefix_reads_bounded_slugs(self):
+        """Подбор slug не читает все заметки с той же основой."""
+        base = slugify('Заметка')
+        Note.objects.bulk_create(
+            Note(
+                title='Заметка', text='Текст', author=self.author,
+                slug=base if number == 1 else f'{base}-{number}'
+            )
+            for number in range(1, 1000)
+        )
+        with mock.patch(
+            'notes.slugs.get_taken_slugs', wraps=get_taken_slugs
+        ) as taken_slugs:
+            note = Note.objects.create(
+                title='Заметка', text='Текст', author=self.author
+            )
+        _, slugs, *_ = taken_slugs.call_args.args
+        self.assertEqual(len(slugs), SLUG_CANDIDATES + 2)
+        self.assertRegex(note.slug, rf'^{base}-[a-z0-9]+$')
+        self.assertFalse(
+            Note.objects.filter(slug=note.slug).exclude(pk=note.pk).exists()
+        )
+
+    def test_slug_allocation_retries_after_race(self):
+        """Если slug заняли между подбором и вставкой, подбор повторяется."""
+        Note.objects.create(title='Гонка', text='Текст', author=self.author)
+        with mock.patch(
+            'notes.slugs.get_taken_slugs',
+            side_effect=[set(), {slugify('Гонка')}]
+        ):
+            note = Note.objects.create(
+                title='Гонка', text='Текст', author=self.author
+            )
+        self.assertEqual(note.slug, f'{slugify("Гонка")}-2')
+
+    def test_bulk_create_allocates_slugs(self):
+        """Массовое создание подбирает slug одним запросом."""
+        with self.assertNumQueries(2):
+            Note.objects.bulk_create(
+                Note(title='Новая заметка', text='Текст', author=self.author)
+                for _ in range(3)
+            )
+        slug = slugify('Новая заметка')
+        self.assertEqual(
+            set(Note.objects.filter(title='Новая заметка').values_list(
+                'slug', flat=True
+            )),
+            {slug, f'{slug}-2', f'{slug}-3'}
+        )
+
     def test_anonym_client_cant_delete_note(self):
         """Не авторизованный пользователь не может удалять заметки."""
         notes = set(Note.objects.all())
@@ -101,3 +210,371 @@ class TestNoteCreation(ClientNoteCreation):
         self.assertEqual(self.note.title, note.title)
         self.assertEqual(self.note.slug, note.slug)
         self.assertEqual(self.note.author, note.author)
+
+
+class TestNoteArchive(ClientNoteCreation):
+    """Выгрузка и загрузка заметок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Переопределение данных класса."""
+        super().setUpTestData(note_creation=True, note_list_creation=True)
+
+    def export(self, client, export_format):
+        return b''.join(client.get(
+            NOTES_EXPORT_URL, {'format': export_format}
+        ).streaming_content)
+
+    def test_export_import_roundtrip(self):
+        """Выгрузка автора загружается читателю, занятые slug меняются."""
+        notes = self.export(self.author_client, 'jsonl')
+        count = Note.objects.filter(author=self.author).count()
+        response = self.reader_client.post(
+            NOTES_IMPORT_URL, notes, content_type='application/x-ndjson'
+        )
+        self.assertEqual(
+            response.json(), {'created': count, 'renamed': count, 'errors': []}
+        )
+        self.assertEqual(
+            sorted(Note.objects.filter(author=self.reader).values_list(
+                'title', flat=True
+            )),
+            sorted(Note.objects.filter(author=self.author).values_list(
+                'title', flat=True
+            ))
+        )
+        self.assertEqual(
+            len(search_notes(self.reader, 'Заголовок')), count
+        )
+
+    def test_export_markdown_zip(self):
+        """Архив содержит по файлу Markdown на заметку."""
+        archive = zipfile.ZipFile(
+            io.BytesIO(self.export(self.author_client, 'zip'))
+        )
+        self.assertEqual(
+            set(archive.namelist()),
+            {f'{note.slug}.md' for note in Note.objects.all()}
+        )
+        self.assertEqual(
+            archive.read(f'{self.note.slug}.md').decode(),
+            f'# {self.note.title}\n\n{self.note.text}\n'
+        )
+
+    def test_export_under_asgi(self):
+        """Выгрузка работает и под ASGI-приложением."""
+        for export_format in ('jsonl', 'zip'):
+            with self.subTest(export_format=export_format):
+                status, body = asgi_get(
+                    self.author_client, NOTES_EXPORT_URL,
+                    {'format': export_format}
+                )
+                self.assertEqual(status, HTTPStatus.OK)
+                self.assertEqual(
+                    body, self.export(self.author_client, export_format)
+                )
+
+    def test_import_reports_bad_lines(self):
+        """Ошибочные строки пропускаются и попадают в отчёт."""
+        lines = ['{', '[]', '', json.dumps(self.form_data)]
+        report = import_notes(self.reader, lines)
+        self.assertEqual(report.created, 1)
+        self.assertEqual([error.line for error in report.errors], [1, 2])
+        self.assertTrue(report.errors[0].error.startswith(
+            BAD_JSON.split('{')[0]
+        ))
+        self.assertEqual(report.errors[1].error, NOT_AN_OBJECT)
+
+    def test_import_queries_do_not_depend_on_size(self):
+        """На пачку заметок уходит постоянное число запросов."""
+        lines = [
+            json.dumps({'title': 'Заголовок', 'text': 'Текст'})
+            for _ in range(50)
+        ]
+        with self.assertNumQueries(6):
+            report = import_notes(self.reader, lines)
+        self.assertEqual(report.created, len(lines))
+        self.assertEqual(Note.objects.filter(
+            author=self.reader, slug__startswith=slugify('Заголовок')
+        ).count(), len(lines))
+
+    def test_import_resolves_slugs_by_index(self):
+        """Конфликты slug пачки проверяются по уникальному индексу."""
+        lines = [
+            json.dumps({'title': f'Заголовок {index}', 'text': 'Текст'})
+            for index in range(3)
+        ]
+        with CaptureQueriesContext(connections['default']) as context:
+            import_notes(self.reader, lines)
+        plan = get_query_plan(next(
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT "notes_note"."slug"')
+        ))
+        self.assertIn('sqlite_autoindex_notes_note_1 (slug=?)', plan)
+        self.assertNotIn('SCAN', plan)
+
+    def test_export_import_commands(self):
+        """Команды выгрузки и загрузки."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'notes.jsonl'
+            call_command('export_notes', self.author.username, path)
+            output = io.StringIO()
+            call_command(
+                'import_notes', self.reader.username, path, stdout=output
+            )
+        self.assertEqual(
+            Note.objects.filter(author=self.reader).count(),
+            Note.objects.filter(author=self.author).count()
+        )
+
+
+class TestMetrics(ClientNoteCreation):
+    """Метрики запросов по представлениям."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Переопределение данных класса."""
+        super().setUpTestData(note_creation=True)
+        cls.admin = User.objects.create(
+            username='Администратор', is_staff=True
+        )
+
+    def test_metrics_by_view(self):
+        """Запросы заметок попадают в гистограммы своего представления."""
+        registry.clear()
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'metrics.prom'
+            with override_settings(
+                METRICS_ENABLED=True, METRICS_FILE=path,
+                METRICS_DUMP_SECONDS=0
+            ):
+                self.client.force_login(self.author)
+                self.client.get(NOTES_DETAIL_URL)
+                self.client.post(NOTES_ADD_URL, data=self.form_data)
+                self.client.force_login(self.admin)
+                metrics = self.client.get(METRICS_URL).content.decode()
+            dumped = path.read_text(encoding='utf-8')
+        self.assertGreater(
+            registry.histograms['view_db_queries']['notes:add'].sum, 0
+        )
+        self.assertGreater(
+            registry.histograms['view_template_seconds']['notes:detail'].sum,
+            0
+        )
+        for line in (
+            'view_request_seconds_count{view="notes:detail"} 1',
+            'view_db_queries_count{view="notes:add"} 1',
+        ):
+            with self.subTest(line=line):
+                self.assertIn(line, metrics)
+                self.assertIn(line, dumped)
+
+
+class TestFastAuth(ClientNoteCreation):
+    """Сессия в cookie и пользователь из кэша процесса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Переопределение данных класса."""
+        super().setUpTestData(note_creation=True)
+
+    def count_queries(self, url):
+        client = Client()
+        client.force_login(self.author)
+        client.get(HOMEPAGE_URL)
+        with CaptureQueriesContext(connections['default']) as queries:
+            client.get(url)
+        return len(queries)
+
+    def test_fast_auth_saves_two_queries(self):
+        """Авторизованный запрос дешевле на сессию и пользователя."""
+        for url in (NOTE_LIST_URL, NOTES_ADD_URL, NOTES_DETAIL_URL):
+            with self.subTest(url=url):
+                default = self.count_queries(url)
+                with override_settings(
+                    SESSION_ENGINE=(
+                        'django.contrib.sessions.backends.signed_cookies'
+                    ),
+                    USER_CACHE_SECONDS=30,
+                ):
+                    fast = self.count_queries(url)
+                self.assertEqual(default - fast, 2)
+
+    @override_settings(USER_CACHE_SECONDS=30)
+    def test_user_cache_forgets_saved_user(self):
+        """Пользователь берётся из кэша, пока его не сохранят."""
+        backend = CachedModelBackend()
+        backend.get_user(self.author.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(self.author.pk), self.author)
+        self.author.username = 'Новое имя'
+        self.author.save()
+        self.assertEqual(
+            backend.get_user(self.author.pk).username, 'Новое имя'
+        )
+        self.author.is_active = False
+        self.author.save()
+        self.assertIsNone(backend.get_user(self.author.pk))
+
+    def test_user_cache_receivers_connect_on_setup(self):
+        """Снимок сбрасывается и в процессе, где ещё никто не входил."""
+        # Свежий интерпретатор: модуль бэкенда ещё не импортирован.
+        script = (
+            'import django; django.setup(); '
+            'from django.contrib.auth import get_user_model; '
+            'from django.db.models.signals import post_delete, post_save; '
+            'user = get_user_model(); '
+            'print(all(any(getattr(receiver, "__module__", None) == '
+            '"yanote.auth" for receiver in signal._live_receivers(user)) '
+            'for signal in (post_save, post_delete)))'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'yanote.settings'},
+            capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip(), 'True')
+
+
+class TestConcurrentSlugs(TransactionTestCase):
+    """Параллельное создание заметок с одинаковым заголовком."""
+
+    def setUp(self):
+        # Общая in-memory база тестов не выдерживает параллельной записи
+        # из потоков, поэтому писатели работают с отдельным файлом SQLite.
+        self.directory = tempfile.TemporaryDirectory()
+        create_database(
+            'writers', Path(self.directory.name) / 'writers.sqlite3'
+        )
+        self.author = User.objects.db_manager('writers').create(
+            username='Автор'
+        )
+
+    def tearDown(self):
+        connections['writers'].close()
+        del connections['writers']
+        del connections.databases['writers']
+        self.directory.cleanup()
+
+    def test_parallel_writers_get_unique_slugs(self):
+        """Ни один из параллельных писателей не падает на slug."""
+        def create_note(_):
+            Note(
+                title='Одинаковый заголовок',
+                text='Текст',
+                author=self.author,
+            ).save(using='writers')
+
+        write_at_once('writers', WRITERS, create_note)
+        slugs = list(
+            Note.objects.using('writers').values_list('slug', flat=True)
+        )
+        self.assertEqual(len(slugs), WRITERS)
+        self.assertEqual(len(set(slugs)), WRITERS)
+
+
+class TestReplicaRouting(ClientNoteCreation):
+    """Чтение с реплики и чтение своих записей из основной базы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Переопределение данных класса."""
+        super().setUpTestData(note_creation=True)
+
+    def setUp(self):
+        # Пустая реплика в отдельном файле изображает сильно отставшую
+        # копию основной базы.
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        create_database('replica', Path(directory.name) / 'replica.sqlite3')
+        self.addCleanup(connections.databases.pop, 'replica')
+        self.addCleanup(connections.__delitem__, 'replica')
+        self.addCleanup(lambda: connections['replica'].close())
+        replicas = override_settings(DATABASE_REPLICAS=['replica'])
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+        # Клиент класса хранит cookie между тестами, здесь нужен свой.
+        self.client.force_login(self.author)
+
+    def test_reads_go_to_replica(self):
+        """Заметки читаются с реплики, где их ещё нет."""
+        response = self.client.get(NOTE_LIST_URL)
+        self.assertEqual(list(response.context['object_list']), [])
+        response = self.client.get(NOTES_DETAIL_URL)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_author_reads_own_writes(self):
+        """После записи автор читает из основной базы."""
+        response = self.client.post(NOTES_ADD_URL, data=self.form_data)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertFalse(Note.objects.using('replica').exists())
+        response = self.client.get(NOTE_LIST_URL)
+        self.assertEqual(
+            {note.slug for note in response.context['object_list']},
+            {self.note.slug, self.form_data['slug']}
+        )
+
+    def test_search_uses_primary_index(self):
+        """Поиск видит заметки, которых ещё нет на реплике."""
+        with override_settings(NOTES_SEARCH_BACKEND='memory'):
+            self.assertEqual(
+                search_notes(self.author, self.note.title), [self.note]
+            )
+            note = Note.objects.create(
+                title='Кефир', text='Текст', slug='kefir', author=self.author
+            )
+            self.assertEqual(search_notes(self.author, 'кефир'), [note])
+
+
+class TestProductionProfile(SimpleTestCase):
+    """Профиль SQLite для продакшена."""
+
+    def test_pragmas_and_health_checks(self):
+        """Прагмы применяются, сломанное соединение заменяется."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        connections.databases['tuned'] = {
+            **SQLITE_PROFILE,
+            'NAME': Path(directory.name) / 'tuned.sqlite3',
+        }
+        self.addCleanup(connections.databases.pop, 'tuned')
+        self.addCleanup(connections.__delitem__, 'tuned')
+        self.addCleanup(lambda: connections['tuned'].close())
+        connection = connections['tuned']
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone(), ('wal',))
+        broken = connection.connection
+        broken.close()
+        connection.close_if_unusable_or_obsolete()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertIsNot(connection.connection, broken)
+
+    def test_secret_key_required(self):
+        """Без DJANGO_SECRET_KEY продакшен-настройки не загружаются."""
+        with mock.patch.dict(os.environ):
+            del os.environ['DJANGO_SECRET_KEY']
+            with self.assertRaises(ImproperlyConfigured):
+                reload(settings_production)
+        reload(settings_production)
+
+    def test_search_requires_fts5(self):
+        """Продакшен ищет только через FTS5 и без него не запускает поиск."""
+        self.assertEqual(settings_production.NOTES_SEARCH_BACKEND, 'fts5')
+        with override_settings(NOTES_SEARCH_BACKEND='fts5'), mock.patch(
+            'notes.search.fts5_available', return_value=False
+        ):
+            with self.assertRaises(ImproperlyConfigured):
+                get_backend('default')
+
+    @override_settings(TEMPLATES=TEMPLATES)
+    def test_templates_warm_up(self):
+        """Прогрев кладёт все шаблоны проекта в кэширующий загрузчик."""
+        templates = settings.BASE_DIR / 'templates'
+        self.assertEqual(
+            warm_up_templates(), len(list(templates.rglob('*.html')))
+        )
+        loader = engines.all()[0].engine.template_loaders[0]
+        self.assertIn('notes/detail.html', loader.get_template_cache)
+        self.assertIn('includes/header.html', loader.get_template_cache)
@@ -9,7 +9,8 @@ from .core import (
     LOGOUT_URL, SIGNUP_URL, NOTES_ADD_URL, NOTE_SUCCESS,
     NOTES_EDIT_URL, ADD_REDIRECT_URL, SUCCESS_REDIRECT_URL,
     LIST_REDIRECT_URL, DETAIL_REDIRECT_URL,
-    EDIT_REDIRECT_URL, DELETE_REDIRECT_URL
+    EDIT_REDIRECT_URL, DELETE_REDIRECT_URL, NOTES_SEARCH_URL,
+    SEARCH_REDIRECT_URL, NOTES_EXPORT_URL, EXPORT_REDIRECT_URL, METRICS_URL
 )
 
 User = get_user_model()
@@ -33,6 +34,9 @@ class TestRoutes(ClientNoteCreation):
             (self.reader_client, NOTE_LIST_URL, HTTPStatus.OK),
             (self.reader_client, NOTES_ADD_URL, HTTPStatus.OK),
             (self.reader_client, NOTE_SUCCESS, HTTPStatus.OK),
+            (self.reader_client, NOTES_SEARCH_URL, HTTPStatus.OK),
+            (self.reader_client, NOTES_EXPORT_URL, HTTPStatus.OK),
+            (self.reader_client, METRICS_URL, HTTPStatus.FOUND),
             (self.reader_client, NOTES_DETAIL_URL, HTTPStatus.NOT_FOUND),
             (self.reader_client, NOTES_EDIT_URL, HTTPStatus.NOT_FOUND),
             (self.reader_client, NOTES_DELETE_URL, HTTPStatus.NOT_FOUND),
@@ -53,6 +57,8 @@ class TestRoutes(ClientNoteCreation):
             (NOTES_DETAIL_URL, DETAIL_REDIRECT_URL),
             (NOTES_DELETE_URL, DELETE_REDIRECT_URL),
             (NOTES_EDIT_URL, EDIT_REDIRECT_URL),
+            (NOTES_SEARCH_URL, SEARCH_REDIRECT_URL),
+            (NOTES_EXPORT_URL, EXPORT_REDIRECT_URL),
         )
         for url, redirect in adress:
             with self.subTest(url=url, redirect=redirect):
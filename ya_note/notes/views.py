@@ -1,9 +1,36 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse, StreamingHttpResponse
 from django.urls import reverse_lazy
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.views import generic
 
+from .archive import export_jsonl, export_markdown_zip, import_notes
 from .forms import NoteForm
 from .models import Note
+from .pagination import get_note_page
+from .search import search_notes
+
+
+def get_note_validators(request, note):
+    """Валидаторы ETag и Last-Modified страницы заметки."""
+    etag = f'W/"{note.pk}-{note.modified.timestamp():.6f}-{request.user.pk}"'
+    return etag, note.modified
+
+
+def not_modified(request, etag, last_modified):
+    """Ответ 304, если страница с этими валидаторами у клиента не устарела."""
+    return get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp())
+    )
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
 
 
 class Home(generic.TemplateView):
@@ -26,19 +53,29 @@ class NoteBase(LoginRequiredMixin):
         return self.model.objects.filter(author=self.request.user)
 
 
-class NoteCreate(NoteBase, generic.CreateView):
+class NoteSaveMixin:
+    """Сохранение формы заметки с обработкой занятого slug."""
+
+    def form_valid(self, form):
+        try:
+            with transaction.atomic():
+                return super().form_valid(form)
+        except IntegrityError:
+            form.add_slug_error()
+            return self.form_invalid(form)
+
+
+class NoteCreate(NoteBase, NoteSaveMixin, generic.CreateView):
     """Добавление заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteUpdate(NoteBase, NoteSaveMixin, generic.UpdateView):
     """Редактирование заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
@@ -53,7 +90,88 @@ class NotesList(NoteBase, generic.ListView):
     """Список всех заметок пользователя."""
     template_name = 'notes/list.html'
 
+    def get_queryset(self):
+        """Текст заметок в списке не выводится, его не загружаем."""
+        return super().get_queryset().only('id', 'title', 'slug', 'created')
+
+    def get_context_data(self, **kwargs):
+        object_list, next_cursor = get_note_page(
+            self.object_list, self.request.GET.get('cursor')
+        )
+        return super().get_context_data(
+            object_list=object_list, next_cursor=next_cursor, **kwargs
+        )
+
 
 class NoteDetail(NoteBase, generic.DetailView):
-    """Заметка подробно."""
+    """Заметка подробно; 304, если заметка у клиента не устарела."""
     template_name = 'notes/detail.html'
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        etag, last_modified = get_note_validators(request, self.object)
+        response = not_modified(
+            request, etag, last_modified
+        ) or self.render_to_response(
+            self.get_context_data(object=self.object)
+        )
+        return set_validators(response, etag, last_modified)
+
+
+class NoteSearch(LoginRequiredMixin, generic.ListView):
+    """Поиск по заголовкам и текстам заметок пользователя."""
+    template_name = 'notes/search.html'
+
+    def get_queryset(self):
+        query = self.request.GET.get('q', '').strip()
+        if not query:
+            return []
+        return search_notes(self.request.user, query)
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(
+            query=self.request.GET.get('q', ''), **kwargs
+        )
+
+
+class NoteExport(LoginRequiredMixin, generic.View):
+    """
+    Выгрузка всех заметок пользователя: ?format=jsonl или zip.
+
+    Под ASGI Django 3.2 перебирает потоковый ответ в цикле событий, где
+    ORM недоступен, поэтому там куски читаются ещё в представлении.
+    """
+    formats = {
+        'jsonl': (export_jsonl, 'application/x-ndjson', 'notes.jsonl'),
+        'zip': (export_markdown_zip, 'application/zip', 'notes.zip'),
+    }
+
+    def get(self, request, *args, **kwargs):
+        export, content_type, filename = self.formats.get(
+            request.GET.get('format'), self.formats['jsonl']
+        )
+        content = export(request.user)
+        if isinstance(request, ASGIRequest):
+            content = list(content)
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{filename}"'
+        )
+        return response
+
+
+class NoteImport(LoginRequiredMixin, generic.View):
+    """
+    Загрузка заметок из JSON Lines.
+
+    Файл передаётся полем archive формы или телом запроса.
+    """
+
+    def post(self, request, *args, **kwargs):
+        lines = request.FILES.get('archive') or request
+        report = import_notes(request.user, lines)
+        return JsonResponse({
+            'created': report.created,
+            'renamed': report.renamed,
+            'errors': [error._asdict() for error in report.errors],
+        })
@@ -0,0 +1,58 @@
+"""
+Проверка входа без запроса пользователя на каждый запрос.
+
+CachedModelBackend кладёт снимок полей пользователя в кэш
+USER_CACHE_ALIAS на USER_CACHE_SECONDS секунд. Сохранение или удаление
+пользователя удаляет снимок из этого кэша, поэтому с общим для воркеров
+кэшем изменение сразу видят все процессы.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+
+def get_cache():
+    return caches[settings.USER_CACHE_ALIAS]
+
+
+def make_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend с кэшем пользователей."""
+
+    def get_user(self, user_id):
+        if not settings.USER_CACHE_SECONDS:
+            return super().get_user(user_id)
+        cached = get_cache().get(make_key(user_id))
+        if cached is not None:
+            # Каждому запросу - свой объект, общий только снимок полей.
+            user = get_user_model().from_db(*cached)
+            return user if self.user_can_authenticate(user) else None
+        user = super().get_user(user_id)
+        if user is not None:
+            field_names = [
+                field.attname for field in user._meta.concrete_fields
+            ]
+            get_cache().set(
+                make_key(user_id),
+                (
+                    user._state.db,
+                    field_names,
+                    [getattr(user, name) for name in field_names],
+                ),
+                settings.USER_CACHE_SECONDS,
+            )
+        return user
+
+
+def forget_user(sender, instance, **kwargs):
+    """
+    Убирает изменённого пользователя из кэша.
+
+    Подключается в ready() приложения: сам модуль импортируется только
+    при первой проверке входа, а пользователя могут сохранить раньше.
+    """
+    get_cache().delete(make_key(instance.pk))
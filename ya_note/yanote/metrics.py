@@ -0,0 +1,253 @@
+"""
+Метрики запросов по представлениям.
+
+Промежуточный слой metrics_middleware включается настройкой
+METRICS_ENABLED и для каждого запроса записывает в гистограммы процесса
+общее время ответа, число и время SQL-запросов (через execute_wrapper
+соединений) и время отрисовки шаблонов (через бэкенд
+TimedDjangoTemplates). Гистограммы отдаются администраторам в текстовом
+формате Prometheus и, если задан METRICS_FILE, периодически и при
+завершении процесса сохраняются в файл.
+"""
+import asyncio
+import atexit
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils.decorators import sync_and_async_middleware
+
+SECONDS_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+METRICS = {
+    'view_request_seconds': ('Время ответа', SECONDS_BUCKETS),
+    'view_db_queries': ('Число SQL-запросов', QUERIES_BUCKETS),
+    'view_db_seconds': ('Время SQL-запросов', SECONDS_BUCKETS),
+    'view_template_seconds': ('Время отрисовки шаблонов', SECONDS_BUCKETS),
+}
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+UNRESOLVED = '<unresolved>'
+
+_stats = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """Счётчики одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+
+
+class Histogram:
+    """Накопительная гистограмма в формате Prometheus."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+
+class Registry:
+    """Гистограммы процесса по метрикам и представлениям."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.histograms = {name: {} for name in METRICS}
+
+    def observe(self, view, stats, seconds):
+        values = {
+            'view_request_seconds': seconds,
+            'view_db_queries': stats.queries,
+            'view_db_seconds': stats.db_seconds,
+            'view_template_seconds': stats.template_seconds,
+        }
+        with self.lock:
+            for name, value in values.items():
+                views = self.histograms[name]
+                if view not in views:
+                    views[view] = Histogram(METRICS[name][1])
+                views[view].observe(value)
+
+    def render(self):
+        """Все гистограммы в текстовом формате Prometheus."""
+        lines = []
+        with self.lock:
+            for name, (help_text, _) in METRICS.items():
+                lines += [
+                    f'# HELP {name} {help_text}',
+                    f'# TYPE {name} histogram',
+                ]
+                for view, histogram in sorted(self.histograms[name].items()):
+                    label = view.replace('\\', '\\\\').replace('"', '\\"')
+                    lines += [
+                        f'{name}_bucket{{view="{label}",le="{bound}"}} {count}'
+                        for bound, count in zip(
+                            histogram.buckets, histogram.counts
+                        )
+                    ]
+                    lines += [
+                        f'{name}_bucket{{view="{label}",le="+Inf"}} '
+                        f'{histogram.count}',
+                        f'{name}_sum{{view="{label}"}} {histogram.sum}',
+                        f'{name}_count{{view="{label}"}} {histogram.count}',
+                    ]
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        """Атомарно записывает метрики в файл."""
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            file.write(self.render())
+        os.replace(temporary, path)
+
+
+registry = Registry()
+
+
+def record_query(execute, sql, params, many, context):
+    """Обёртка выполнения SQL: считает запросы и их время."""
+    stats = _stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - start
+
+
+def install_query_hook(connection, **kwargs):
+    """Ставит обёртку на соединение один раз."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedTemplate(Template):
+    """Шаблон, который учитывает время своей отрисовки."""
+
+    def render(self, context=None, request=None):
+        stats = _stats.get()
+        if stats is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_seconds += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Бэкенд шаблонов Django с учётом времени отрисовки.
+
+    Вложенные шаблоны ({% include %}, {% extends %}) отрисовываются
+    движком внутри внешнего и отдельно не учитываются.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def get_view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else UNRESOLVED
+
+
+class Dumper:
+    """Сохраняет метрики в METRICS_FILE не чаще METRICS_DUMP_SECONDS."""
+
+    def __init__(self):
+        self.dumped = time.monotonic()
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        now = time.monotonic()
+        if now - self.dumped < settings.METRICS_DUMP_SECONDS:
+            return
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            self.dumped = now
+            registry.dump(settings.METRICS_FILE)
+        finally:
+            self.lock.release()
+
+
+@atexit.register
+def dump_at_exit():
+    """Последний снимок метрик при завершении процесса."""
+    if settings.METRICS_ENABLED and settings.METRICS_FILE:
+        registry.dump(settings.METRICS_FILE)
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Записывает метрики каждого запроса."""
+    if not settings.METRICS_ENABLED:
+        raise MiddlewareNotUsed
+    connection_created.connect(install_query_hook)
+    for connection in connections.all():
+        install_query_hook(connection)
+    dump = Dumper() if settings.METRICS_FILE else None
+
+    def finish(request, token, start):
+        stats = _stats.get()
+        _stats.reset(token)
+        registry.observe(
+            get_view_name(request), stats, time.perf_counter() - start
+        )
+        if dump:
+            dump()
+
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            start = time.perf_counter()
+            token = _stats.set(RequestStats())
+            try:
+                return await get_response(request)
+            finally:
+                finish(request, token, start)
+    else:
+        def middleware(request):
+            start = time.perf_counter()
+            token = _stats.set(RequestStats())
+            try:
+                return get_response(request)
+            finally:
+                finish(request, token, start)
+    return middleware
+
+
+@staff_member_required
+def metrics(request):
+    """Метрики процесса для сборщика Prometheus."""
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
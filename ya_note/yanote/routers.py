@@ -0,0 +1,86 @@
+"""
+Разделение чтения и записи между основной базой и репликами.
+
+Чтение моделей приложений из DATABASE_REPLICA_APPS уходит на случайную
+реплику из DATABASE_REPLICAS, запись - всегда в основную базу. Запросы,
+меняющие данные, целиком работают с основной базой и выставляют cookie:
+пока она жива, чтение этого клиента тоже идёт в основную базу, и он
+сразу видит то, что записал, несмотря на отставание реплик.
+"""
+import asyncio
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.decorators import sync_and_async_middleware
+
+PIN_COOKIE = 'db_pinned'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_pinned = ContextVar('db_pinned', default=False)
+
+
+class PrimaryReplicaRouter:
+    """Роутер основной базы и реплик."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            _pinned.get()
+            or not settings.DATABASE_REPLICAS
+            or model._meta.app_label not in settings.DATABASE_REPLICA_APPS
+        ):
+            return DEFAULT_DB_ALIAS
+        # Связанные объекты читаем из той же базы, что и сам объект.
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии основной базы, связи между ними допустимы.
+        return True
+
+
+def pin_primary(request):
+    """Закрепляет чтение запроса за основной базой, если нужно."""
+    return _pinned.set(
+        request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES
+    )
+
+
+def set_pin_cookie(request, response):
+    """После записи клиент ещё какое-то время читает из основной базы."""
+    if request.method not in SAFE_METHODS:
+        response.set_cookie(
+            PIN_COOKIE, '1',
+            max_age=settings.DATABASE_PIN_SECONDS,
+            httponly=True,
+            samesite='Lax',
+        )
+    return response
+
+
+@sync_and_async_middleware
+def pin_primary_middleware(get_response):
+    """Направляет чтение в основную базу после записи."""
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = pin_primary(request)
+            try:
+                response = await get_response(request)
+            finally:
+                _pinned.reset(token)
+            return set_pin_cookie(request, response)
+    else:
+        def middleware(request):
+            token = pin_primary(request)
+            try:
+                response = get_response(request)
+            finally:
+                _pinned.reset(token)
+            return set_pin_cookie(request, response)
+    return middleware
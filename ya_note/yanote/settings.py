@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -22,6 +23,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanote.metrics.metrics_middleware',
+    'yanote.routers.pin_primary_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -35,7 +38,7 @@ ROOT_URLCONF = 'yanote.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yanote.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -59,6 +62,51 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения - копии основной базы. Пути к их файлам
+# перечисляются в переменной окружения через os.pathsep.
+DATABASES.update({
+    f'replica{number}': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+    }
+    for number, path in enumerate(
+        filter(None, os.getenv('DATABASE_REPLICAS', '').split(os.pathsep)),
+        start=1
+    )
+})
+
+DATABASE_ROUTERS = ['yanote.routers.PrimaryReplicaRouter']
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# Приложения, чтение моделей которых уходит на реплики.
+DATABASE_REPLICA_APPS = {'notes'}
+# Сколько секунд после записи клиент читает из основной базы.
+DATABASE_PIN_SECONDS = 5
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    # Сессия целиком в подписанной cookie, без обращений к базе.
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.getenv('SESSION_BACKEND', 'db')]
+
+# ModelBackend остаётся для сессий, созданных до CachedModelBackend:
+# в них записан его путь.
+AUTHENTICATION_BACKENDS = [
+    'yanote.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+# Сколько секунд пользователь живёт в кэше, 0 - без кэша.
+USER_CACHE_SECONDS = 0
+USER_CACHE_ALIAS = 'default'
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -87,3 +135,26 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTE_COUNT_ON_LIST_PAGE = 50
+
+# Движок поиска: 'fts5', 'memory' или 'auto' (FTS5, если он есть в SQLite).
+# Индекс 'memory' живёт в одном процессе и годится только для разработки.
+NOTES_SEARCH_BACKEND = 'auto'
+NOTE_SEARCH_RESULTS = 50
+
+# Сколько заметок выгрузка читает и загрузка пишет за раз.
+NOTE_ARCHIVE_CHUNK_SIZE = 2000
+
+# Асинхронные список заметок и страница заметки для запуска под ASGI.
+NOTES_ASYNC_VIEWS = False
+
+# Метрики запросов по представлениям (см. yanote.metrics): включаются
+# переменной окружения, отдаются администраторам по адресу /metrics/ и,
+# если задан файл, сохраняются в него раз в METRICS_DUMP_SECONDS секунд.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED') == '1'
+METRICS_FILE = os.getenv('METRICS_FILE')
+METRICS_DUMP_SECONDS = 60
+
+# Компилировать все шаблоны при запуске WSGI/ASGI-приложения.
+TEMPLATES_WARM_UP = False
@@ -0,0 +1,82 @@
+"""
+Настройки для запуска под gunicorn с несколькими воркерами.
+
+DJANGO_SETTINGS_MODULE=yanote.settings_production
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401, F403
+from .settings import CACHES, DATABASES, SESSION_ENGINES, TEMPLATES
+
+DEBUG = False
+
+# Ключ из settings.py опубликован вместе с кодом: с ним можно подделать
+# подписанную cookie сессии любого пользователя.
+SECRET_KEY = os.getenv('DJANGO_SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured(
+        'Задайте секретный ключ в переменной окружения DJANGO_SECRET_KEY.'
+    )
+
+SQLITE_PROFILE = {
+    'ENGINE': 'yanote.sqlite3',
+    # Соединение живёт между запросами воркера и проверяется
+    # перед повторным использованием.
+    'CONN_MAX_AGE': 600,
+    'HEALTH_CHECKS': True,
+    'TRANSACTION_MODE': 'IMMEDIATE',
+    # Сколько секунд ждать блокировку записи, прежде чем сдаться.
+    'OPTIONS': {'timeout': 20},
+    'PRAGMAS': {
+        # Читатели не блокируют писателя и наоборот.
+        'journal_mode': 'WAL',
+        # В режиме WAL fsync нужен только при checkpoint.
+        'synchronous': 'NORMAL',
+        # Отрицательное значение - размер в КиБ, здесь 64 МиБ.
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    },
+}
+
+DATABASES = {
+    alias: {**database, **SQLITE_PROFILE}
+    for alias, database in DATABASES.items()
+}
+
+# Шаблоны разбираются один раз на процесс и прогреваются при запуске
+# (см. yanote.warmup), а не перечитываются при каждой отрисовке.
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+TEMPLATES_WARM_UP = True
+
+# Сессии в подписанной cookie (SESSION_BACKEND=signed_cookies) экономят
+# запрос, но включаются явно: их подлинность держится только на
+# DJANGO_SECRET_KEY.
+SESSION_ENGINE = SESSION_ENGINES[os.getenv('SESSION_BACKEND', 'db')]
+# Пользователь кэшируется, только если кэш общий для воркеров: в кэше
+# процесса выключенный пользователь входил бы в других воркерах ещё
+# USER_CACHE_SECONDS секунд.
+USER_CACHE_ALIAS = 'default'
+USER_CACHE_SECONDS = (
+    0 if CACHES[USER_CACHE_ALIAS]['BACKEND'].endswith('LocMemCache') else 30
+)
+
+# Индекс в памяти у каждого воркера свой и не видит правок других
+# воркеров, поэтому в продакшене поиск только через FTS5.
+NOTES_SEARCH_BACKEND = 'fts5'
@@ -0,0 +1,42 @@
+"""
+Бэкенд SQLite для нескольких процессов сервера.
+
+Поверх стандартного бэкенда понимает ключи настроек базы:
+PRAGMAS - прагмы, выполняемые на каждом новом соединении;
+TRANSACTION_MODE - режим BEGIN для transaction.atomic;
+HEALTH_CHECKS - проверять постоянное соединение перед новым запросом.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict.get('PRAGMAS', {}).items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        # Отложенная транзакция берёт блокировку записи только на первом
+        # изменении, и если её уже держит другой процесс, SQLite сразу
+        # отвечает "database is locked", не дожидаясь timeout. IMMEDIATE
+        # берёт блокировку в начале транзакции и ждёт её в очереди.
+        mode = self.settings_dict.get('TRANSACTION_MODE', 'DEFERRED')
+        self.cursor().execute(f'BEGIN {mode}')
+
+    def is_usable(self):
+        try:
+            self.connection.execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        return True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        if (
+            self.connection is not None
+            and self.settings_dict.get('HEALTH_CHECKS')
+            and not self.is_usable()
+        ):
+            self.close()